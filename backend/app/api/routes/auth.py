@@ -1,11 +1,15 @@
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel, EmailStr
 from sqlalchemy.orm import Session
 from typing import Optional, Literal
 from app.db.database import get_db
 from app.db import crud, models
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.core import password_pool
+from app.services import rate_limit
 from app.api.deps import get_current_user
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -21,15 +25,9 @@ class TokenOut(BaseModel):
     access_token: str
     token_type: str = "bearer"
 
-@router.post("/register", status_code=status.HTTP_201_CREATED)
-def register(data: RegisterIn, db: Session = Depends(get_db)):
-    normalized_email = data.email.lower()
-    exists = crud.get_user_by_email(db, normalized_email)
-    if exists:
+def _check_new_user(db: Session, data: RegisterIn, email: str, role: str) -> None:
+    if crud.get_user_by_email(db, email):
         raise HTTPException(status_code=409, detail="E-mail já cadastrado")
-    role = data.role or "operator"
-    pwd_hash = hash_password(data.password)
-
     # Validação: setor obrigatório para manager/operator
     if role in ("manager", "operator"):
         if not data.sector_id:
@@ -39,7 +37,8 @@ def register(data: RegisterIn, db: Session = Depends(get_db)):
             raise HTTPException(status_code=404, detail="Setor não encontrado")
     # Para admin, ignora sector_id
 
-    user = crud.create_user(db, data.name, normalized_email, pwd_hash, role=role)
+def _create_user(db: Session, data: RegisterIn, email: str, role: str, pwd_hash: str) -> models.User:
+    user = crud.create_user(db, data.name, email, pwd_hash, role=role)
 
     if role in ("manager", "operator"):
         sector_member = models.SectorMember(
@@ -50,7 +49,22 @@ def register(data: RegisterIn, db: Session = Depends(get_db)):
         db.add(sector_member)
         db.commit()
         db.refresh(sector_member)
+    return user
 
+@router.post("/register", status_code=status.HTTP_201_CREATED)
+async def register(data: RegisterIn, db: Session = Depends(get_db)):
+    normalized_email = data.email.lower()
+    role = data.role or "operator"
+    await run_in_threadpool(_check_new_user, db, data, normalized_email, role)
+    try:
+        pwd_hash = await password_pool.hash_password(data.password)
+    except password_pool.HashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente.",
+            headers={"Retry-After": "2"},
+        )
+    user = await run_in_threadpool(_create_user, db, data, normalized_email, role, pwd_hash)
     return {"ok": True, "user_id": str(user.id)}
 
 class LoginIn(BaseModel):
@@ -58,13 +72,38 @@ class LoginIn(BaseModel):
     password: str
 
 @router.post("/login", response_model=TokenOut)
-def login(data: LoginIn, db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, data.email.lower())
-    if not user or not verify_password(data.password, user.password):
+async def login(data: LoginIn, request: Request, db: Session = Depends(get_db)):
+    email = data.email.lower()
+    ip = request.client.host if request.client else "desconhecido"
+    allowed, retry_after = await run_in_threadpool(
+        rate_limit.take,
+        rate_limit.login_keys(ip, email),
+        settings.LOGIN_RATE_PER_MIN / 60.0,
+        settings.LOGIN_BURST,
+    )
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas de login. Tente novamente em instantes.",
+            headers={"Retry-After": str(max(1, retry_after))},
+        )
+    user = await run_in_threadpool(crud.get_user_by_email, db, email)
+    try:
+        ok, new_hash = await password_pool.verify_and_update(data.password, user.password if user else None)
+    except password_pool.HashingBusy:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente.",
+            headers={"Retry-After": "2"},
+        )
+    if not user or not ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Acesso Não Autorizado"
         )
+    if new_hash:
+        user.password = new_hash
+        await run_in_threadpool(db.commit)
     token = create_access_token({"sub": str(user.id)})
     return TokenOut(access_token=token)
 
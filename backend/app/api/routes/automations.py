@@ -1,17 +1,28 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, Field
-from typing import Optional, Literal
+from typing import Optional, Literal, List
 from uuid import UUID
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from importlib import import_module
+from app.core import registry
+from app.core.automation_loader import get_dispatch
 from app.db.database import get_db
 from app.db import crud, models
 from app.api.deps import get_current_user
 from app.scheduler import add_automation_job, remove_automation_job
+from app.services.retry import DEFAULT_MAX_ATTEMPTS
 
 router = APIRouter(prefix="/automations", tags=["automations"])
 
+class RetryPolicyIn(BaseModel):
+    max_attempts: int = Field(DEFAULT_MAX_ATTEMPTS, ge=1, le=20)
+    backoff_sec: float = Field(30, ge=0, description="Espera antes da 2ª tentativa.")
+    backoff_factor: float = Field(2.0, ge=1, description="Multiplicador da espera a cada nova tentativa.")
+    max_backoff_sec: float = Field(900, ge=0)
+    jitter: float = Field(0.2, ge=0, le=1, description="Variação aleatória relativa da espera (0.2 = ±20%).")
+    retry_on: List[str] = Field(default_factory=list, description="Classes de exceção retentáveis, ex: ['TimeoutError'].")
+    retry_codes: List[str] = Field(default_factory=list, description="error_code retentáveis retornados pela automação.")
+
 class AutomationIn(BaseModel):
     name: str
     description: Optional[str] = None
@@ -21,6 +32,12 @@ class AutomationIn(BaseModel):
     owner_id: Optional[UUID] = None
     default_payload: Optional[dict] = Field(None, description="Payload padrão para a automação, usado como configuração.")
     config_schema: Optional[dict] = Field(None, description="Schema JSON para o formulário de configuração no frontend.")
+    max_concurrent: Optional[int] = Field(None, ge=1, description="Máximo de execuções simultâneas desta automação.")
+    exclusive_resource: Optional[str] = Field(None, description="Recurso exclusivo exigido pela automação, ex: 'delphos_desktop'.")
+    cache_ttl_sec: Optional[int] = Field(None, ge=1, description="Reaproveita o resultado de execuções idênticas por este tempo (s).")
+    cache_key_fields: Optional[List[str]] = Field(None, description="Chaves do payload consideradas no cache (padrão: todas).")
+    retry_policy: Optional[RetryPolicyIn] = None
+    timeout_sec: Optional[int] = Field(None, ge=10, le=86400, description="Tempo limite de cada execução (s).")
 
 class CronScheduleIn(BaseModel):
     enabled: bool = True
@@ -48,22 +65,19 @@ def _assert_sector_membership(db: Session, current: models.User, sector_id: UUID
     if sector_uuid not in allowed:
         raise HTTPException(status_code=403, detail="Usuario não é um membro desse setor")
 
-def _load_callable(module_path: str, func_name: str):
-    try:
-        mod = import_module(module_path)
-        fn = getattr(mod, func_name)
-    except Exception as e:
-        raise RuntimeError(f"Falha ao importar {module_path}.{func_name}: {e}")
-    return fn
+def _lazy_callback(module_path: str, func_name: str, payload: dict):
+    # O módulo só é importado quando o job dispara, não ao agendar.
+    def _run():
+        return get_dispatch(module_path, func_name)(payload)
+    return _run
 
 def _schedule_job_for_automation(db: Session, automation: models.Automation, cron: CronScheduleIn):
-    fn = _load_callable(automation.module_path, automation.func_name)
     add_automation_job(
         automation_id=str(automation.id),
         days_of_week=cron.days_of_week,
         hour=cron.hour,
         minute=cron.minute,
-        callback=lambda: fn(), 
+        callback=_lazy_callback(automation.module_path, automation.func_name, dict(automation.default_payload or {})),
     )
 
 @router.post("")
@@ -81,6 +95,12 @@ def create_automation(
     else:
         owner_id = current.id
 
+    error = registry.validate_target(data.module_path, data.func_name)
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    spec = registry.find(data.module_path, data.func_name)
+    resources = spec.resources if spec else {}
+
     a = crud.create_automation(
         db,
         data.name,
@@ -90,44 +110,66 @@ def create_automation(
         owner_type,
         owner_id,
         data.default_payload,
-        data.config_schema,
+        data.config_schema if data.config_schema is not None else (spec.config_schema if spec else None),
+        max_concurrent=data.max_concurrent or resources.get("max_concurrent"),
+        exclusive_resource=data.exclusive_resource or resources.get("exclusive_resource"),
+        cache_ttl_sec=data.cache_ttl_sec,
+        cache_key_fields=data.cache_key_fields,
+        retry_policy=data.retry_policy.model_dump() if data.retry_policy else None,
+        timeout_sec=data.timeout_sec,
     )
     return a
 
+@router.get("/catalog")
+def automation_catalog(current: models.User = Depends(get_current_user)):
+    return [spec.to_dict() for spec in registry.all_specs()]
+
 @router.get("")
 def list_automations(
     grouped: bool = Query(False),
     db: Session = Depends(get_db),
     current: models.User = Depends(get_current_user),
 ):
+    # uma consulta só: setores vêm no mesmo SELECT (contains_eager), sem lazy load por item
     autos = crud.list_automations_for_user(db, current.id)
-    items = [
-        {
-            "id": str(getattr(a, "id", "")),
+    me = str(current.id)
+    items = []
+    mine = []
+    sectors = {}
+    for a in autos:
+        owner_id = str(a.owner_id)
+        is_sector = a.owner_type == "sector"
+        it = {
+            "id": str(a.id),
             "name": a.name,
-            "description": getattr(a, "description", None),
+            "description": a.description,
             "owner_type": a.owner_type,
-            "owner_id": str(getattr(a, "owner_id", "")),
-            "created_at": getattr(a, "created_at", None),
-            "sector_id": str(getattr(a, "owner_id", "")) if a.owner_type == "sector" else None,
-            "sector": a.sector.name if a.sector else None, 
+            "owner_id": owner_id,
+            "created_at": a.created_at,
+            "sector_id": owner_id if is_sector else None,
+            "sector": a.sector.name if a.sector else None,
         }
-        for a in autos
-    ]
+        items.append(it)
+        if not grouped:
+            continue
+        if is_sector:
+            group = sectors.get(owner_id)
+            if group is None:
+                group = sectors[owner_id] = {
+                    "group": "sector",
+                    "sector_id": owner_id,
+                    "title": it["sector"] or "Setor Desconhecido",
+                    "automations": [],
+                }
+            group["automations"].append(it)
+        elif owner_id == me:
+            mine.append(it)
     if not grouped:
         return items
-    grouped_map = {}
-    for it in items:
-        key = ("user", it["owner_id"]) if it["owner_type"] == "user" else ("sector", it["sector_id"])
-        grouped_map.setdefault(key, []).append(it)
     out = []
-    mine = [x for x in items if x["owner_type"] == "user" and x["owner_id"] == str(current.id)]
     if mine:
         out.append({"group": "mine", "title": "Minhas automações", "automations": mine})
-    for (otype, oid), arr in grouped_map.items():
-        if otype == "sector":
-            sector_name = arr[0].get("sector") if arr and arr[0].get("sector") else "Setor Desconhecido"
-            out.append({"group": "sector", "sector_id": oid, "title": sector_name, "automations": arr})
+    out.extend(sectors.values())
     return out
 
 @router.post("/{automation_id}/schedule/cron")
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel, Field
 from app.db.database import get_db
 from app.db import crud, models
 from app.api.deps import get_current_user
+from app.services import response_cache
 import uuid
 
 router = APIRouter(prefix="/dashboards", tags=["dashboards"])
@@ -57,37 +58,44 @@ class DashboardConfigResponse(BaseModel):
     class Config:
         from_attributes = True
 
+def _to_response(d: models.DashboardConfig) -> DashboardConfigResponse:
+    return DashboardConfigResponse(
+        id=str(d.id),
+        name=d.name,
+        display_name=d.display_name,
+        description=d.description,
+        menu_path=d.menu_path,
+        search_text=d.search_text,
+        search_image=d.search_image,
+        click_coords=d.click_coords,
+        menu_coords=d.menu_coords,
+        screenshot_region=d.screenshot_region,
+        has_period_selector=d.has_period_selector,
+        available_periodicities=d.available_periodicities,
+        is_active=d.is_active,
+        created_at=d.created_at.isoformat(),
+        updated_at=d.updated_at.isoformat()
+    )
+
 # --------- Endpoints ---------
 @router.get("", response_model=List[DashboardConfigResponse])
 def list_dashboards(
+    request: Request,
     is_active: Optional[bool] = None,
     skip: int = 0,
     limit: int = 100,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    dashboards = crud.list_dashboard_configs(db, is_active=is_active, skip=skip, limit=limit)
-    
-    return [
-        DashboardConfigResponse(
-            id=str(d.id),
-            name=d.name,
-            display_name=d.display_name,
-            description=d.description,
-            menu_path=d.menu_path,
-            search_text=d.search_text,
-            search_image=d.search_image,
-            click_coords=d.click_coords,
-            menu_coords=d.menu_coords,
-            screenshot_region=d.screenshot_region,
-            has_period_selector=d.has_period_selector,
-            available_periodicities=d.available_periodicities,
-            is_active=d.is_active,
-            created_at=d.created_at.isoformat(),
-            updated_at=d.updated_at.isoformat()
-        )
-        for d in dashboards
-    ]
+    return response_cache.cached_json(
+        request,
+        "dashboards",
+        lambda: [
+            _to_response(d)
+            for d in crud.list_dashboard_configs(db, is_active=is_active, skip=skip, limit=limit)
+        ],
+        variant=f"{is_active}:{skip}:{limit}",
+    )
 
 @router.get("/{dashboard_id}", response_model=DashboardConfigResponse)
 def get_dashboard(
@@ -103,23 +111,7 @@ def get_dashboard(
             detail="Dashboard não encontrado"
         )
     
-    return DashboardConfigResponse(
-        id=str(dashboard.id),
-        name=dashboard.name,
-        display_name=dashboard.display_name,
-        description=dashboard.description,
-        menu_path=dashboard.menu_path,
-        search_text=dashboard.search_text,
-        search_image=dashboard.search_image,
-        click_coords=dashboard.click_coords,
-        menu_coords=dashboard.menu_coords,
-        screenshot_region=dashboard.screenshot_region,
-        has_period_selector=dashboard.has_period_selector,
-        available_periodicities=dashboard.available_periodicities,
-        is_active=dashboard.is_active,
-        created_at=dashboard.created_at.isoformat(),
-        updated_at=dashboard.updated_at.isoformat()
-    )
+    return _to_response(dashboard)
 
 @router.get("/by-name/{name}", response_model=DashboardConfigResponse)
 def get_dashboard_by_name(
@@ -133,23 +125,7 @@ def get_dashboard_by_name(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Dashboard '{name}' não encontrado"
         )
-    return DashboardConfigResponse(
-        id=str(dashboard.id),
-        name=dashboard.name,
-        display_name=dashboard.display_name,
-        description=dashboard.description,
-        menu_path=dashboard.menu_path,
-        search_text=dashboard.search_text,
-        search_image=dashboard.search_image,
-        click_coords=dashboard.click_coords,
-        menu_coords=dashboard.menu_coords,
-        screenshot_region=dashboard.screenshot_region,
-        has_period_selector=dashboard.has_period_selector,
-        available_periodicities=dashboard.available_periodicities,
-        is_active=dashboard.is_active,
-        created_at=dashboard.created_at.isoformat(),
-        updated_at=dashboard.updated_at.isoformat()
-    )
+    return _to_response(dashboard)
 
 @router.post("", response_model=DashboardConfigResponse, status_code=status.HTTP_201_CREATED)
 def create_dashboard(
@@ -185,23 +161,7 @@ def create_dashboard(
         is_active=data.is_active
     )
     
-    return DashboardConfigResponse(
-        id=str(dashboard.id),
-        name=dashboard.name,
-        display_name=dashboard.display_name,
-        description=dashboard.description,
-        menu_path=dashboard.menu_path,
-        search_text=dashboard.search_text,
-        search_image=dashboard.search_image,
-        click_coords=dashboard.click_coords,
-        menu_coords=dashboard.menu_coords,
-        screenshot_region=dashboard.screenshot_region,
-        has_period_selector=dashboard.has_period_selector,
-        available_periodicities=dashboard.available_periodicities,
-        is_active=dashboard.is_active,
-        created_at=dashboard.created_at.isoformat(),
-        updated_at=dashboard.updated_at.isoformat()
-    )
+    return _to_response(dashboard)
 
 @router.put("/{dashboard_id}", response_model=DashboardConfigResponse)
 def update_dashboard(
@@ -225,23 +185,7 @@ def update_dashboard(
             detail="Dashboard não encontrado"
         )
     
-    return DashboardConfigResponse(
-        id=str(dashboard.id),
-        name=dashboard.name,
-        display_name=dashboard.display_name,
-        description=dashboard.description,
-        menu_path=dashboard.menu_path,
-        search_text=dashboard.search_text,
-        search_image=dashboard.search_image,
-        click_coords=dashboard.click_coords,
-        menu_coords=dashboard.menu_coords,
-        screenshot_region=dashboard.screenshot_region,
-        has_period_selector=dashboard.has_period_selector,
-        available_periodicities=dashboard.available_periodicities,
-        is_active=dashboard.is_active,
-        created_at=dashboard.created_at.isoformat(),
-        updated_at=dashboard.updated_at.isoformat()
-    )
+    return _to_response(dashboard)
 
 @router.delete("/{dashboard_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_dashboard(
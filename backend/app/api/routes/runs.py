@@ -1,9 +1,11 @@
+import os
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
 from uuid import UUID
 from enum import Enum
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
 from sqlalchemy.orm import Session
 
@@ -11,6 +13,8 @@ from app.api.deps import get_current_user
 from app.db.database import get_db
 from app.db import crud, models
 from app.services.queue import queue
+from app.services import artifacts, cancellation, dedup, result_store, run_archive, secret_cache, template_assets
+from app.core.config import settings
 from app.core.executor import run_sync 
 
 router = APIRouter(prefix="/runs", tags=["runs"])
@@ -24,6 +28,7 @@ class RunRequest(BaseModel):
     payload: Optional[Dict[str, Any]] = Field(default_factory=dict)
     mode: RunMode = Field(RunMode.ASYNC, description="Modo de execução: 'async' (fila) ou 'sync' (imediato)")
     timeout_sec: int = Field(default=900, ge=10, le=7200, description="Timeout da execução em segundos (apenas para mode='sync')")
+    dedup_window_sec: Optional[int] = Field(default=None, ge=1, description="Janela (s) em que submissões idênticas são anexadas ao run pendente (apenas para mode='async')")
 
 @router.post("")
 def create_run(
@@ -46,23 +51,32 @@ def create_run(
     if not allowed:
         raise HTTPException(status_code=403, detail="Sem permissão para executar essa automação.")
 
+    if data.mode == RunMode.ASYNC:
+        run, created = dedup.submit_run(
+            db,
+            automation_id=automation.id,
+            user_id=current.id,
+            payload=data.payload or {},
+            window_sec=data.dedup_window_sec,
+        )
+        if created:
+            queue.enqueue(
+                "app.worker.process_run",
+                {"run_id": str(run.id), "user_id": str(current.id)},
+            )
+        return run
+
     run = crud.create_run(
         db,
         automation_id=automation.id,          
         user_id=current.id,            
-        status="queued" if data.mode == RunMode.ASYNC else "running",
+        status="running",
         payload=data.payload or {},
-        started_at=None if data.mode == RunMode.ASYNC else datetime.now(timezone.utc),
+        started_at=datetime.now(timezone.utc),
     )
     
-    if data.mode == RunMode.ASYNC:
-        queue.enqueue(
-            "app.worker.process_run",
-            {"run_id": str(run.id), "user_id": str(current.id)},
-        )
-        return run
+    if data.mode == RunMode.SYNC:
     
-    elif data.mode == RunMode.SYNC:
         module_path = automation.module_path
         func_name = automation.func_name
         command = None
@@ -79,12 +93,21 @@ def create_run(
                 module_path=module_path,
                 func_name=func_name,
                 command=command,
-                payload=data.payload or {},
+                payload={
+                    **(data.payload or {}),
+                    "_secrets": secret_cache.secrets_for_run(db, automation, current.id),
+                    "_templates": template_assets.templates_for_run(db),
+                },
                 timeout_sec=data.timeout_sec,
                 cwd=None,
+                automation=automation,
+                run_id=run.id,
+                cache_scope=secret_cache.cache_scope(db, automation, current.id),
             )
             
             status_val = "success" if getattr(result, "ok", False) else "failed"
+            if (getattr(result, "result", None) or {}).get("cancelled"):
+                status_val = "cancelled"
             stdout_str = result.stdout if isinstance(result.stdout, str) or result.stdout is None else str(result.stdout)
             stderr_str = result.stderr if isinstance(result.stderr, str) or result.stderr is None else str(result.stderr)
             
@@ -100,6 +123,7 @@ def create_run(
                     "stderr": stderr_str,
                     "payload_result": getattr(result, "result", None),
                     "error": getattr(result, "error", None),
+                    "cache_hit": getattr(result, "cache_hit", False),
                 },
             )
             
@@ -121,6 +145,7 @@ def create_run(
                 "stdout": stdout_str,
                 "stderr": stderr_str,
                 "result": getattr(result, "result", None),
+                "cache_hit": getattr(result, "cache_hit", False),
             }
             
         except HTTPException:
@@ -151,7 +176,184 @@ def create_run(
 @router.get("")
 def list_runs(
     automation_id: Optional[UUID] = None,
+    since: Optional[datetime] = Query(None, description="Só runs criados a partir desta data (padrão: janela de retenção)"),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    include_archived: bool = Query(False, description="Inclui o histórico já arquivado (resumo, sem payload/result)"),
     db: Session = Depends(get_db),
     current: models.User = Depends(get_current_user),
 ):
-    return crud.list_runs_for_user(db, current.id, automation_id)
+    # sem `since`, lê só as partições dentro da retenção; o que é mais antigo está (ou vai
+    # estar) no arquivo e aparece com include_archived
+    runs = crud.list_runs_for_user(
+        db, current.id, automation_id, since=since or run_archive.retention_cutoff(), limit=limit
+    )
+    if not include_archived or (limit and len(runs) >= limit):
+        return runs
+    archived = crud.list_archived_runs_for_user(
+        db, current.id, automation_id, since=since, limit=(limit - len(runs)) if limit else None
+    )
+    return [*runs, *(run_archive.describe_entry(e) for e in archived)]
+
+@router.get("/archived/{run_id}")
+def get_archived_run(
+    run_id: UUID,
+    full: bool = Query(True, description="Carrega o resultado completo quando ele foi externalizado"),
+    db: Session = Depends(get_db),
+    current: models.User = Depends(get_current_user),
+):
+    entry = db.get(models.RunArchiveEntry, run_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Run não encontrado no histórico arquivado.")
+    automation = crud.get_automation_by_id(db, entry.automation_id)
+    if not automation or not crud.user_can_execute_automation(db, current.id, automation):
+        raise HTTPException(status_code=403, detail="Sem permissão para acessar esse run.")
+    record = run_archive.get_archived_run(db, run_id, full)
+    if record is None:
+        raise HTTPException(status_code=410, detail="Arquivo do histórico indisponível.")
+    return record
+
+@router.get("/{run_id}")
+def get_run(
+    run_id: UUID,
+    full: bool = Query(True, description="Carrega o resultado completo quando ele foi externalizado"),
+    db: Session = Depends(get_db),
+    current: models.User = Depends(get_current_user),
+):
+    if not crud.get_run(db, run_id) and db.get(models.RunArchiveEntry, run_id):
+        return get_archived_run(run_id, full, db, current)
+    run = _readable_run(db, run_id, current)
+    result = run.result or {}
+    return {
+        "id": run.id,
+        "automation_id": run.automation_id,
+        "user_id": run.user_id,
+        "status": run.status,
+        "attempt": run.attempt,
+        "parent_run_id": run.parent_run_id,
+        "created_at": run.created_at,
+        "started_at": run.started_at,
+        "finished_at": run.finished_at,
+        "payload": run.payload,
+        "result": result_store.load(result) if full else result,
+        "result_external": result.get(result_store.EXTERNAL_KEY),
+    }
+
+@router.post("/{run_id}/cancel")
+def cancel_run(
+    run_id: UUID,
+    db: Session = Depends(get_db),
+    current: models.User = Depends(get_current_user),
+):
+    run = crud.get_run(db, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run não encontrado.")
+    automation = crud.get_automation_by_id(db, run.automation_id)
+    if not automation or not crud.user_can_execute_automation(db, current.id, automation):
+        raise HTTPException(status_code=403, detail="Sem permissão para cancelar esse run.")
+    status_val = (run.status or "").lower()
+    if status_val not in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Run já finalizado (status '{run.status}').")
+    if status_val == "running" and (settings.RUN_ISOLATION or "").lower() == "inline":
+        # sem processo supervisionado ninguém lê o pedido de cancelamento
+        raise HTTPException(
+            status_code=409,
+            detail="Cancelamento de run em execução não é suportado com RUN_ISOLATION=inline.",
+        )
+    cancellation.request_cancel(run.id)
+    if status_val == "queued":
+        crud.set_run_status_final(
+            db,
+            run.id,
+            "cancelled",
+            {"ok": False, "cancelled": True, "error": "Cancelado antes de iniciar"},
+        )
+        return {"run_id": str(run.id), "status": "cancelled"}
+    return {"run_id": str(run.id), "status": "cancelling"}
+
+def _readable_run(db: Session, run_id: UUID, user: models.User) -> models.Run:
+    run = crud.get_run(db, run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run não encontrado.")
+    automation = crud.get_automation_by_id(db, run.automation_id)
+    if not automation or not crud.user_can_execute_automation(db, user.id, automation):
+        raise HTTPException(status_code=403, detail="Sem permissão para acessar esse run.")
+    return run
+
+@router.get("/{run_id}/artifacts")
+def list_run_artifacts(
+    run_id: UUID,
+    db: Session = Depends(get_db),
+    current: models.User = Depends(get_current_user),
+):
+    run = _readable_run(db, run_id, current)
+    return [artifacts.describe(a) for a in artifacts.list_for_run(db, run.id)]
+
+@router.get("/{run_id}/deliveries")
+def list_run_deliveries(
+    run_id: UUID,
+    db: Session = Depends(get_db),
+    current: models.User = Depends(get_current_user),
+):
+    run = _readable_run(db, run_id, current)
+    return [
+        {
+            "id": str(d.id),
+            "group": d.group_name,
+            "channel": d.channel,
+            "backend": d.backend,
+            "status": d.status,
+            "recipients": d.recipients,
+            "attempts": d.attempts,
+            "results": d.results,
+            "error": d.error,
+            "created_at": d.created_at,
+            "started_at": d.started_at,
+            "finished_at": d.finished_at,
+        }
+        for d in crud.list_deliveries_for_run(db, run.id)
+    ]
+
+@router.get("/{run_id}/artifacts/{name}")
+def download_run_artifact(
+    run_id: UUID,
+    name: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current: models.User = Depends(get_current_user),
+):
+    run = _readable_run(db, run_id, current)
+    art = artifacts.get_for_run(db, run.id, name)
+    path = artifacts.blob_path(art.sha256) if art else None
+    if not art or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Artefato não encontrado.")
+
+    etag = f'"{art.sha256}"'
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, max-age=86400, immutable",
+        "Content-Disposition": f'inline; filename="{art.name}"',
+    }
+    if request.headers.get("if-none-match") in (etag, art.sha256):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        byte_range = artifacts.parse_range(request.headers.get("range"), art.size)
+    except ValueError:
+        raise HTTPException(
+            status_code=416,
+            detail="Intervalo inválido.",
+            headers={"Content-Range": f"bytes */{art.size}"},
+        )
+    if byte_range is None:
+        headers["Content-Length"] = str(art.size)
+        return StreamingResponse(artifacts.iter_file(path), media_type=art.content_type, headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{art.size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(
+        artifacts.iter_file(path, start, end),
+        status_code=206,
+        media_type=art.content_type,
+        headers=headers,
+    )
@@ -8,6 +8,7 @@ from app.api.deps import get_current_user
 from app.db.database import get_db
 from app.db import crud, models
 from app.core.executor import run_sync
+from app.services import secret_cache, template_assets
 
 router = APIRouter(prefix="/runs", tags=["runs-sync"])
 
@@ -55,11 +56,20 @@ def run_automation_sync(
             module_path=module_path,
             func_name=func_name,
             command=command,
-            payload=data.payload or {},
+            payload={
+                **(data.payload or {}),
+                "_secrets": secret_cache.secrets_for_run(db, automation, current.id),
+                "_templates": template_assets.templates_for_run(db),
+            },
             timeout_sec=data.timeout_sec,
             cwd=None,
+            automation=automation,
+            run_id=run.id,
+            cache_scope=secret_cache.cache_scope(db, automation, current.id),
         )
         status_val = "success" if getattr(result, "ok", False) else "failed"
+        if (getattr(result, "result", None) or {}).get("cancelled"):
+            status_val = "cancelled"
         stdout_str = result.stdout if isinstance(result.stdout, str) or result.stdout is None else str(result.stdout)
         stderr_str = result.stderr if isinstance(result.stderr, str) or result.stderr is None else str(result.stderr)
         crud.finish_run(
@@ -74,6 +84,7 @@ def run_automation_sync(
                 "stderr": stderr_str,
                 "payload_result": getattr(result, "result", None),
                 "error": getattr(result, "error", None),
+                "cache_hit": getattr(result, "cache_hit", False),
             },
         )
         if not getattr(result, "ok", False):
@@ -93,6 +104,7 @@ def run_automation_sync(
             "stdout": stdout_str,
             "stderr": stderr_str,
             "result": getattr(result, "result", None),
+            "cache_hit": getattr(result, "cache_hit", False),
         }
     except HTTPException:
         raise
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from pydantic import BaseModel, field_validator
 from typing import Optional, Literal
 from datetime import datetime, timezone
@@ -86,39 +86,40 @@ def create_schedule(
 @router.get("")
 def list_schedules(
     automation_id: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+    offset: int = Query(0, ge=0),
     db: Session = Depends(get_db),
     current: models.User = Depends(get_current_user),
 ):
-    items = crud.list_schedules(db, automation_id=automation_id)
-    out = []
-    for sc in items:
-        auto = crud.get_automation_by_id(db, sc.automation_id)
-        if not auto:
-            continue
-        allowed = False
-        if current.role == "admin":
-            allowed = True
-        elif auto.owner_type == "sector":
-            roles = _normalize_roles_map(crud.get_user_roles_by_sector(db, current.id))
-            allowed = (roles.get(str(auto.owner_id)) or "").lower() in ("manager",)
-        else:
-            allowed = str(auto.owner_id) == str(current.id)
-        if allowed:
-            out.append(
-                {
-                    "id": sc.id,
-                    "automation_id": sc.automation_id,
-                    "type": sc.type,
-                    "enabled": sc.enabled,
-                    "run_at": sc.run_at,
-                    "interval_seconds": sc.interval_seconds,
-                    "next_run_at": sc.next_run_at,
-                    "last_run_at": sc.last_run_at,
-                    "owner_type": sc.owner_type,
-                    "owner_id": sc.owner_id,
-                }
-            )
-    return out
+    rows = crud.list_schedules_for_user(
+        db,
+        current.id,
+        is_admin=current.role == "admin",
+        automation_id=automation_id,
+        limit=limit,
+        offset=offset,
+    )
+    return [
+        {
+            "id": sc.id,
+            "automation_id": sc.automation_id,
+            "automation": {
+                "id": sc.automation_id,
+                "name": auto_name,
+                "owner_type": auto_owner_type,
+                "owner_id": auto_owner_id,
+            },
+            "type": sc.type,
+            "enabled": sc.enabled,
+            "run_at": sc.run_at,
+            "interval_seconds": sc.interval_seconds,
+            "next_run_at": sc.next_run_at,
+            "last_run_at": sc.last_run_at,
+            "owner_type": sc.owner_type,
+            "owner_id": sc.owner_id,
+        }
+        for sc, auto_name, auto_owner_type, auto_owner_id in rows
+    ]
 
 class SchedulePatch(BaseModel):
     enabled: Optional[bool] = None
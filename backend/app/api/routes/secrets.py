@@ -6,6 +6,7 @@ from app.api.deps import get_current_user
 from app.db.database import get_db
 from app.db import crud, models
 from app.core.security import encrypt_secret, decrypt_secret
+from app.services import secret_cache
 
 router = APIRouter(prefix="/secrets", tags=["secrets"])
 
@@ -49,6 +50,7 @@ def upsert(
         key=body.key,
         value_ciphertext=ct,
     )
+    secret_cache.invalidate(s.owner_type, s.owner_id)
     return SecretOut(
         id=str(s.id),
         owner_type=s.owner_type,
@@ -107,4 +109,21 @@ def delete_secret(
         return
     _ensure_access(current, s.owner_type, s.owner_id, db)
     crud.delete_secret(db, secret_id)
+    secret_cache.invalidate(s.owner_type, s.owner_id)
     return
+
+@router.post("/rotate", status_code=202)
+def rotate_secrets(
+    restart: bool = Query(False),
+    current: models.User = Depends(get_current_user),
+):
+    """Enfileira a recifragem de todos os segredos com a chave primária atual (ver secret_rotation)."""
+    if current.role != "admin":
+        raise HTTPException(status_code=403, detail="Apenas administradores podem rotacionar a chave")
+    from app.services.queue import queue
+    job = queue.enqueue(
+        "app.services.secret_rotation.run_rotation_job",
+        {"restart": restart},
+        job_timeout=6 * 3600,
+    )
+    return {"job_id": job.id, "status": "queued"}
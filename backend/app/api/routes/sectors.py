@@ -1,11 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from app.db.database import get_db
 from app.db import crud
+from app.services import response_cache
 
 router = APIRouter(prefix="/sectors", tags=["sectors"])
 
 @router.get("/")
-def list_sectors(db: Session = Depends(get_db)):
-    items = crud.list_sectors(db)
-    return [{"id": str(s.id), "name": s.name} for s in items]
+def list_sectors(request: Request, db: Session = Depends(get_db)):
+    return response_cache.cached_json(
+        request,
+        "sectors",
+        lambda: [{"id": str(s.id), "name": s.name} for s in crud.list_sectors(db)],
+    )
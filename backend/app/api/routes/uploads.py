@@ -1,9 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+import asyncio
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
-import uuid
-import shutil
-from typing import List
+from typing import List, Optional
+from sqlalchemy.orm import Session
 from app.api.deps import get_current_user
+from app.db.database import get_db
+from app.db import crud
+from app.core.config import settings
+from app.services import image_uploads, template_assets
 
 router = APIRouter(prefix="/uploads", tags=["uploads"])
 
@@ -17,81 +22,138 @@ ALLOWED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".webp"}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
 def validate_image(file: UploadFile) -> None:
-    file_ext = Path(file.filename).suffix.lower()
+    file_ext = Path(file.filename or "").suffix.lower()
     if file_ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(
             status_code=400,
             detail=f"Extensão não permitida. Use: {', '.join(ALLOWED_EXTENSIONS)}"
         )
-    
-    if not file.content_type.startswith("image/"):
+
+def _store(file: UploadFile) -> dict:
+    """Bloqueante (roda no threadpool): grava em blocos e já deixa o template decodificado."""
+    try:
+        saved = image_uploads.save_stream(file.file, DASHBOARD_DIR, MAX_FILE_SIZE)
+    except image_uploads.UploadTooLarge:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Arquivo '{file.filename}' excede o limite de {MAX_FILE_SIZE // (1024 * 1024)}MB"
+        )
+    except image_uploads.NotAnImage:
+        raise HTTPException(status_code=400, detail=f"O arquivo '{file.filename}' deve ser uma imagem")
+    try:
+        image_uploads.precompute_template(saved["path"], settings.TEMPLATE_MAX_PIXELS)
+    except image_uploads.NotAnImage:
+        image_uploads.remove(saved["path"])
+        raise HTTPException(status_code=400, detail=f"Imagem '{file.filename}' corrompida ou ilegível")
+    except image_uploads.ImageTooLarge:
+        image_uploads.remove(saved["path"])
         raise HTTPException(
             status_code=400,
-            detail="O arquivo deve ser uma imagem"
+            detail=f"Imagem '{file.filename}' excede o limite de {settings.TEMPLATE_MAX_PIXELS} pixels"
         )
+    unique_filename = saved["filename"]
+    return {
+        "original_name": file.filename,
+        "filename": unique_filename,
+        "path": f"uploads/dashboards/{unique_filename}",
+        "url": f"/uploads/dashboards/{unique_filename}",
+        "size": saved["size"],
+        "sha256": saved["sha256"],
+    }
+
+async def _save_upload(file: UploadFile) -> dict:
+    validate_image(file)
+    try:
+        return await run_in_threadpool(_store, file)
+    finally:
+        await file.close()
+
+async def _register(db: Session, saved: dict, name: Optional[str], user_id, created: Optional[list] = None) -> dict:
+    """Indexa o upload como template (nome lógico ou o próprio arquivo) para os workers.
+
+    As versões novas entram em `created` para que o chamador possa desfazê-las.
+    """
+    asset, is_new = await run_in_threadpool(
+        template_assets.register,
+        db,
+        name or saved["filename"],
+        DASHBOARD_DIR / saved["filename"],
+        uploaded_by=user_id,
+    )
+    if is_new and created is not None:
+        created.append(asset.id)
+    return {**saved, "template": {"name": asset.name, "version": asset.version, "sha256": asset.sha256}}
 
 @router.post("/dashboard-image")
 async def upload_dashboard_image(
     file: UploadFile = File(...),
+    name: Optional[str] = Form(None, description="Nome do template (search_image); cada upload vira nova versão"),
+    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     try:
-        validate_image(file)
-        
-        file_ext = Path(file.filename).suffix.lower()
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = DASHBOARD_DIR / unique_filename
-        
-        with file_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        
-        relative_path = f"uploads/dashboards/{unique_filename}"
-        
-        return {
-            "filename": unique_filename,
-            "path": relative_path,
-            "url": f"/uploads/dashboards/{unique_filename}"
-        }
-    
+        saved = await _save_upload(file)
+        try:
+            saved = await _register(db, saved, name, current_user.id)
+        except Exception:
+            image_uploads.remove(DASHBOARD_DIR / saved["filename"])
+            raise
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro ao fazer upload: {str(e)}")
+    saved.pop("original_name")
+    return saved
 
 @router.post("/dashboard-images")
 async def upload_multiple_dashboard_images(
     files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db),
     current_user: dict = Depends(get_current_user)
 ):
     if len(files) > 5:
         raise HTTPException(status_code=400, detail="Máximo de 5 imagens por vez")
-    
-    uploaded_files = []
-    
-    for file in files:
-        try:
-            validate_image(file)
-            
-            file_ext = Path(file.filename).suffix.lower()
-            unique_filename = f"{uuid.uuid4()}{file_ext}"
-            file_path = DASHBOARD_DIR / unique_filename
-            
-            with file_path.open("wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
-            
-            uploaded_files.append({
-                "original_name": file.filename,
-                "filename": unique_filename,
-                "path": f"uploads/dashboards/{unique_filename}",
-                "url": f"/uploads/dashboards/{unique_filename}"
-            })
-        
-        except HTTPException as e:
-            for uploaded in uploaded_files:
-                try:
-                    (DASHBOARD_DIR / uploaded["filename"]).unlink()
-                except:
-                    pass
-            raise e
-    
-    return {"files": uploaded_files}
+
+    results = await asyncio.gather(*(_save_upload(f) for f in files), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, BaseException)]
+    created: list = []
+    if not failures:
+        # a sessão não é thread-safe: indexa um por vez depois de gravar tudo
+        for i, saved in enumerate(results):
+            try:
+                results[i] = await _register(db, saved, None, current_user.id, created)
+            except Exception as e:
+                failures.append(e)
+                break
+    if failures:
+        # tudo ou nada: remove as versões criadas nesta requisição e o que já tinha sido gravado
+        if created:
+            db.rollback()
+            await run_in_threadpool(crud.delete_template_assets, db, created)
+        for r in results:
+            if isinstance(r, dict):
+                image_uploads.remove(DASHBOARD_DIR / r["filename"])
+        error = failures[0]
+        if isinstance(error, HTTPException):
+            raise error
+        raise HTTPException(status_code=500, detail=f"Erro ao fazer upload: {str(error)}")
+
+    return {"files": results}
+
+@router.get("/templates")
+def list_templates(
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    return [template_assets.describe(a) for a in crud.list_latest_template_assets(db)]
+
+@router.get("/templates/{name}/versions")
+def list_template_versions(
+    name: str,
+    db: Session = Depends(get_db),
+    current_user: dict = Depends(get_current_user)
+):
+    versions = crud.list_template_versions(db, name)
+    if not versions:
+        raise HTTPException(status_code=404, detail="Template não encontrado.")
+    return [template_assets.describe(a) for a in versions]
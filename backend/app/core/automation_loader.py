@@ -1,31 +1,128 @@
+import asyncio
 import importlib
 import inspect
+import sys
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
 from types import ModuleType
+from typing import Any, Callable, Dict, Optional, Tuple
 
-def load_callable(module_path: str):
+# Convenções de chamada suportadas para funções de automação
+NO_ARGS = "no_args"          # def main()
+PAYLOAD = "payload"          # def run(payload, ...)
+KWARGS = "kwargs"            # def run(**payload)
+CTX = "ctx"                  # def run(ctx)
+CTX_KWARGS = "ctx_kwargs"    # def run(ctx, **payload)
+
+_POSITIONAL = (
+    inspect.Parameter.POSITIONAL_ONLY,
+    inspect.Parameter.POSITIONAL_OR_KEYWORD,
+    inspect.Parameter.VAR_POSITIONAL,
+)
+
+@lru_cache(maxsize=512)
+def resolve_convention(fn: Callable) -> str:
+    try:
+        params = list(inspect.signature(fn).parameters.values())
+    except (TypeError, ValueError):
+        return PAYLOAD
+    if not params:
+        return NO_ARGS
+    positional = [p for p in params if p.kind in _POSITIONAL]
+    if not positional:
+        return KWARGS
+    if positional[0].name == "ctx":
+        return CTX_KWARGS if len(params) > 1 else CTX
+    return PAYLOAD
+
+def accepted_keywords(fn: Callable) -> Optional[frozenset]:
+    """Nomes aceitos por palavra-chave, ou None se a função recebe **kwargs (aceita qualquer chave)."""
+    try:
+        params = inspect.signature(fn).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params):
+        return None
+    return frozenset(
+        p.name for p in params
+        if p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+    )
+
+@dataclass(frozen=True)
+class Dispatch:
+    fn: Callable
+    convention: str
+    is_async: bool
+    keywords: Optional[frozenset] = None
+
+    def __call__(self, payload: Optional[Dict[str, Any]] = None, ctx: Optional[Dict[str, Any]] = None):
+        payload = payload or {}
+        ctx = ctx or {}
+        if self.convention == NO_ARGS:
+            args, kwargs = (), {}
+        elif self.convention == KWARGS:
+            args, kwargs = (), self._keyword_payload(payload)
+        elif self.convention == CTX:
+            args, kwargs = (ctx,), {}
+        elif self.convention == CTX_KWARGS:
+            args, kwargs = (ctx,), self._keyword_payload(payload)
+        else:
+            args, kwargs = (payload,), {}
+        if self.is_async:
+            return asyncio.run(self.fn(*args, **kwargs))
+        return self.fn(*args, **kwargs)
+
+    def _keyword_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        # sem **kwargs, as chaves injetadas pelo runner (_workspace, _secrets...) só seguem se a
+        # função as declarar; as demais chaves do payload passam como antes
+        if self.keywords is None:
+            return payload
+        return {k: v for k, v in payload.items() if k in self.keywords or not str(k).startswith("_")}
+
+def dispatch_for(fn: Callable) -> Dispatch:
+    return Dispatch(
+        fn=fn,
+        convention=resolve_convention(fn),
+        is_async=inspect.iscoroutinefunction(fn),
+        keywords=accepted_keywords(fn),
+    )
+
+_dispatch_cache: Dict[Tuple[str, str], Tuple[ModuleType, Dispatch]] = {}
+_dispatch_lock = threading.Lock()
+
+def _split_path(module_path: str, func_name: Optional[str]) -> Tuple[str, str]:
+    if func_name:
+        return module_path, func_name
     if ":" in module_path:
-        mod_name, func_name = module_path.split(":", 1)
-    else:
-        mod_name, func_name = module_path, "main"
-    mod: ModuleType = importlib.import_module(mod_name)
-    fn = getattr(mod, func_name, None)
-    if not callable(fn):
-        raise RuntimeError(f"'{func_name}' não é callable em {mod_name}")
-    return fn
+        mod_name, fn_name = module_path.split(":", 1)
+        return mod_name, fn_name
+    return module_path, "main"
+
+def get_dispatch(module_path: str, func_name: Optional[str] = None) -> Dispatch:
+    """Resolve (uma vez por módulo carregado) a função e sua convenção de chamada."""
+    mod_name, fn_name = _split_path(module_path, func_name)
+    key = (mod_name, fn_name)
+    cached = _dispatch_cache.get(key)
+    if cached is not None and sys.modules.get(mod_name) is cached[0]:
+        return cached[1]
+    with _dispatch_lock:
+        mod: ModuleType = importlib.import_module(mod_name)
+        fn = getattr(mod, fn_name, None)
+        if not callable(fn):
+            raise RuntimeError(f"'{fn_name}' não é callable em {mod_name}")
+        dispatch = dispatch_for(fn)
+        _dispatch_cache[key] = (mod, dispatch)
+        return dispatch
+
+def call_automation(module_path: str, func_name: Optional[str] = None, payload: Optional[Dict[str, Any]] = None, ctx: Optional[Dict[str, Any]] = None):
+    return get_dispatch(module_path, func_name)(payload, ctx)
+
+def load_callable(module_path: str):
+    return get_dispatch(module_path).fn
 
 def smart_call(fn, ctx: dict | None = None, payload: dict | None = None):
-    ctx = ctx or {}
-    payload = payload or {}
-    sig = inspect.signature(fn)
-    params = sig.parameters
-    if len(params) == 0:
-        return fn()
-    if all(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values()):
-        return fn(**payload)
-    if len(params) == 1:
-        return fn(ctx)
-    return fn(ctx, **payload)
+    return dispatch_for(fn)(payload, ctx)
 
 def run_module(module_path: str, ctx: dict | None = None, **payload):
-    fn = load_callable(module_path)
-    return smart_call(fn, ctx=ctx, payload=payload)
+    return call_automation(module_path, payload=payload, ctx=ctx)
@@ -17,6 +17,48 @@ class Settings(BaseModel):
     DB_HOST: str = Field(default_factory=lambda: os.getenv("DB_HOST", "localhost"))
     DB_PORT: int = Field(default_factory=lambda: int(os.getenv("DB_PORT", "5432")))
     DB_NAME: str = Field(default_factory=lambda: os.getenv("DB_NAME", "automacao"))
+    CONCURRENCY_LEASE_SEC: int = Field(default_factory=lambda: int(os.getenv("CONCURRENCY_LEASE_SEC", "60")))
+    CONCURRENCY_DEFER_SEC: int = Field(default_factory=lambda: int(os.getenv("CONCURRENCY_DEFER_SEC", "20")))
+    # adiamentos por falta de slot antes de o run falhar com concurrency_timeout (0 = sem limite)
+    CONCURRENCY_MAX_DEFERRALS: int = Field(default_factory=lambda: int(os.getenv("CONCURRENCY_MAX_DEFERRALS", "90")))
+    DEDUP_WINDOW_SEC: int = Field(default_factory=lambda: int(os.getenv("DEDUP_WINDOW_SEC", "3600")))
+    RUN_ISOLATION: str = Field(default_factory=lambda: os.getenv("RUN_ISOLATION", "subprocess"))
+    RUN_TIMEOUT_SEC: int = Field(default_factory=lambda: int(os.getenv("RUN_TIMEOUT_SEC", "3600")))
+    RUN_CPU_LIMIT_SEC: int = Field(default_factory=lambda: int(os.getenv("RUN_CPU_LIMIT_SEC", "0")))
+    RUN_MEMORY_LIMIT_MB: int = Field(default_factory=lambda: int(os.getenv("RUN_MEMORY_LIMIT_MB", "0")))
+    MODULES_ROOT: str = Field(default_factory=lambda: os.getenv("MODULES_ROOT", ""))
+    ARTIFACTS_ROOT: str = Field(default_factory=lambda: os.getenv("ARTIFACTS_ROOT", "/srv/automations/_artifacts"))
+    ARTIFACT_RETENTION_DAYS: int = Field(default_factory=lambda: int(os.getenv("ARTIFACT_RETENTION_DAYS", "30")))
+    ARTIFACT_QUOTA_MB: int = Field(default_factory=lambda: int(os.getenv("ARTIFACT_QUOTA_MB", "5120")))
+    ARTIFACT_GC_INTERVAL_SEC: int = Field(default_factory=lambda: int(os.getenv("ARTIFACT_GC_INTERVAL_SEC", "3600")))
+    RESULT_INLINE_MAX_KB: int = Field(default_factory=lambda: int(os.getenv("RESULT_INLINE_MAX_KB", "64")))
+    RESULT_PREVIEW_CHARS: int = Field(default_factory=lambda: int(os.getenv("RESULT_PREVIEW_CHARS", "4000")))
+    RESULT_BLOB_ROOT: str = Field(default_factory=lambda: os.getenv("RESULT_BLOB_ROOT", "/srv/automations/_results"))
+    RUN_ARCHIVE_ROOT: str = Field(default_factory=lambda: os.getenv("RUN_ARCHIVE_ROOT", "/srv/automations/_runs_archive"))
+    RUN_RETENTION_MONTHS: int = Field(default_factory=lambda: int(os.getenv("RUN_RETENTION_MONTHS", "6")))
+    RUN_PARTITIONS_AHEAD: int = Field(default_factory=lambda: int(os.getenv("RUN_PARTITIONS_AHEAD", "2")))
+    RUN_RETENTION_INTERVAL_SEC: int = Field(default_factory=lambda: int(os.getenv("RUN_RETENTION_INTERVAL_SEC", "86400")))
+    DELIVERY_BACKEND: str = Field(default_factory=lambda: os.getenv("DELIVERY_BACKEND", "cloud_api"))
+    DELIVERY_DESKTOP_RESOURCE: str = Field(default_factory=lambda: os.getenv("DELIVERY_DESKTOP_RESOURCE", "delphos_desktop"))
+    WHATSAPP_API_URL: str = Field(default_factory=lambda: os.getenv("WHATSAPP_API_URL", "https://graph.facebook.com/v20.0"))
+    WHATSAPP_PHONE_NUMBER_ID: str = Field(default_factory=lambda: os.getenv("WHATSAPP_PHONE_NUMBER_ID", ""))
+    WHATSAPP_TOKEN: str = Field(default_factory=lambda: os.getenv("WHATSAPP_TOKEN", ""))
+    WHATSAPP_TIMEOUT_SEC: float = Field(default_factory=lambda: float(os.getenv("WHATSAPP_TIMEOUT_SEC", "30")))
+    WHATSAPP_CONCURRENCY: int = Field(default_factory=lambda: int(os.getenv("WHATSAPP_CONCURRENCY", "4")))
+    WHATSAPP_RATE_PER_SEC: float = Field(default_factory=lambda: float(os.getenv("WHATSAPP_RATE_PER_SEC", "10")))
+    WHATSAPP_MAX_ATTEMPTS: int = Field(default_factory=lambda: int(os.getenv("WHATSAPP_MAX_ATTEMPTS", "4")))
+    SECRETS_CACHE_TTL_SEC: int = Field(default_factory=lambda: int(os.getenv("SECRETS_CACHE_TTL_SEC", "60")))
+    SECRET_ROTATION_BATCH: int = Field(default_factory=lambda: int(os.getenv("SECRET_ROTATION_BATCH", "500")))
+    SECRET_ROTATION_WORKERS: int = Field(default_factory=lambda: int(os.getenv("SECRET_ROTATION_WORKERS", "0")))
+    BCRYPT_ROUNDS: int = Field(default_factory=lambda: int(os.getenv("BCRYPT_ROUNDS", "12")))
+    PASSWORD_HASH_WORKERS: int = Field(default_factory=lambda: int(os.getenv("PASSWORD_HASH_WORKERS", "2")))
+    PASSWORD_HASH_MAX_PENDING: int = Field(default_factory=lambda: int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16")))
+    LOGIN_RATE_PER_MIN: float = Field(default_factory=lambda: float(os.getenv("LOGIN_RATE_PER_MIN", "10")))
+    LOGIN_BURST: int = Field(default_factory=lambda: int(os.getenv("LOGIN_BURST", "5")))
+    RESPONSE_CACHE_TTL_SEC: int = Field(default_factory=lambda: int(os.getenv("RESPONSE_CACHE_TTL_SEC", "300")))
+    TEMPLATE_CACHE_DIR: str = Field(default_factory=lambda: os.getenv("TEMPLATE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".hub_templates")))
+    # Limite de pixels (largura x altura) de uma imagem enviada; conferido no cabeçalho, antes de decodificar
+    TEMPLATE_MAX_PIXELS: int = Field(default_factory=lambda: int(os.getenv("TEMPLATE_MAX_PIXELS", "25000000")))
     @property
     def assembled_database_url(self) -> str:
         if self.DATABASE_URL:
@@ -10,9 +10,30 @@ from typing import Any, Dict, Optional
 import importlib
 import traceback
 from datetime import datetime
+from app.core.automation_loader import call_automation
+from app.core.config import settings
 from app.db.database import SessionLocal
 from app.db.models import Run, Automation
 
+def _with_artifacts(run_id, result, cached_from=None):
+    """Leva os arquivos do resultado para o store de artefatos do run (ou reaproveita os do cache).
+
+    Resultados novos e bem-sucedidos também disparam as entregas pedidas pela automação.
+    """
+    if run_id is None or not isinstance(result, dict):
+        return result
+    from app.services import artifacts, delivery
+    db = SessionLocal()
+    try:
+        if cached_from is not None:
+            return artifacts.link_cached(db, cached_from, run_id, result)
+        result = artifacts.ingest_result(db, run_id, result)
+        if result.get("ok", True):
+            result = delivery.fan_out(db, run_id, result)
+        return result
+    finally:
+        db.close()
+
 @dataclass
 class ExecResult:
     ok: bool
@@ -21,6 +42,7 @@ class ExecResult:
     stderr: str
     result: Optional[Dict[str, Any]]
     error: Optional[str]
+    cache_hit: bool = False
 
 def _json_serializable_or_none(value: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     if value is None:
@@ -34,17 +56,7 @@ def _json_serializable_or_none(value: Optional[Dict[str, Any]]) -> Optional[Dict
     return value
 
 def _import_and_call(module_path: str, func_name: str, payload: dict | None):
-    mod = importlib.import_module(module_path)
-    func = getattr(mod, func_name)
-    payload = payload or {}
-    
-    try:
-        return func(payload)
-    except TypeError as e:
-        if "positional arguments but" in str(e) or "takes 0 positional arguments" in str(e):
-            return func()
-        else:
-            raise
+    return call_automation(module_path, func_name, payload or {})
 
 def _run_external(command: str, timeout: int, cwd: Optional[str] = None) -> ExecResult:
     try:
@@ -89,6 +101,9 @@ def run_sync(
     payload: Optional[Dict[str, Any]] = None,
     timeout_sec: int = 900,
     cwd: Optional[str] = None,
+    automation: Optional[Automation] = None,
+    run_id: Optional[Any] = None,
+    cache_scope: Optional[str] = None,
 ) -> ExecResult:
     payload = payload or {}
     if command:
@@ -102,12 +117,44 @@ def run_sync(
             result=None,
             error="Informe command OU (module_path + func_name).",
         )
+    if automation is not None:
+        from app.services import result_cache
+        cached = result_cache.lookup(automation, payload, cache_scope)
+        if cached is not None:
+            cached = _with_artifacts(run_id, cached, cached_from=cached.get("cached_from_run"))
+            return ExecResult(ok=True, exit_code=0, stdout="", stderr="", result=cached, error=None, cache_hit=True)
     try:
-        ret = _import_and_call(module_path, func_name, payload or {})
+        if (settings.RUN_ISOLATION or "").lower() == "inline":
+            ret = _import_and_call(module_path, func_name, payload or {})
+        else:
+            from app.core.supervisor import run_supervised
+            from app.services import cancellation
+            outcome = run_supervised(
+                module_path,
+                func_name,
+                payload or {},
+                timeout_sec=timeout_sec,
+                cpu_limit_sec=settings.RUN_CPU_LIMIT_SEC or None,
+                memory_limit_mb=settings.RUN_MEMORY_LIMIT_MB or None,
+                cancel_check=(lambda: cancellation.is_cancelled(run_id)) if run_id else None,
+            )
+            if not outcome.ok:
+                return ExecResult(
+                    ok=False,
+                    exit_code=outcome.exit_code,
+                    stdout="",
+                    stderr=outcome.traceback or "",
+                    result=outcome.error_result(),
+                    error=outcome.error,
+                )
+            ret = outcome.value
         if ret is None:
             return ExecResult(ok=True, exit_code=0, stdout="", stderr="", result=None, error=None)
         if isinstance(ret, dict):
+            ret = _with_artifacts(run_id, ret)
             ok = bool(ret.get("ok", True))
+            if ok and automation is not None:
+                result_cache.store(automation, payload, run_id, ret, cache_scope)
             return ExecResult(ok=ok, exit_code=0, stdout="", stderr="", result=ret, error=None if ok else ret.get("error"))
         return ExecResult(ok=True, exit_code=0, stdout="", stderr="", result={"data": ret}, error=None)
     except Exception as e:
@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from app.core import security
+from app.core.config import settings
+
+log = logging.getLogger("password_pool")
+
+# bcrypt gasta ~250 ms de CPU por senha; rodar isso nas threads do FastAPI trava a API inteira
+# num pico de logins. Aqui o hash vai para um pool de processos pequeno e a fila é limitada:
+# passando de PASSWORD_HASH_MAX_PENDING, o pedido falha rápido em vez de acumular.
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots: Optional[asyncio.Semaphore] = None
+
+
+class HashingBusy(Exception):
+    pass
+
+
+def _executor() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=max(1, settings.PASSWORD_HASH_WORKERS))
+    return _pool
+
+
+async def _submit(fn, *args, wait_sec: float = 2.0):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(max(1, settings.PASSWORD_HASH_MAX_PENDING))
+    try:
+        await asyncio.wait_for(_slots.acquire(), wait_sec)
+    except asyncio.TimeoutError:
+        raise HashingBusy()
+    try:
+        return await asyncio.wrap_future(_executor().submit(fn, *args))
+    finally:
+        _slots.release()
+
+
+async def verify_and_update(plain_password: str, password_hash: Optional[str]) -> Tuple[bool, Optional[str]]:
+    return await _submit(security.verify_and_update, plain_password, password_hash)
+
+
+async def hash_password(plain_password: str) -> str:
+    return await _submit(security.hash_password, plain_password)
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
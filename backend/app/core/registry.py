@@ -0,0 +1,162 @@
+import importlib.util
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.automation_loader import Dispatch, get_dispatch
+from app.core.config import settings
+
+log = logging.getLogger("registry")
+
+MANIFEST_NAME = "manifest.json"
+ENTRY_POINT_GROUP = "hub_automacao.automations"
+
+_DEFAULT_MODULES_ROOT = Path(__file__).resolve().parents[2] / "modules"
+
+@dataclass(frozen=True)
+class AutomationSpec:
+    name: str
+    module_path: str
+    func_name: str
+    description: Optional[str] = None
+    config_schema: Optional[Dict[str, Any]] = None
+    default_payload: Optional[Dict[str, Any]] = None
+    resources: Dict[str, Any] = field(default_factory=dict)
+    source: str = "manifest"
+
+    @property
+    def target(self) -> str:
+        return f"{self.module_path}:{self.func_name}"
+
+    def load(self) -> Dispatch:
+        """Importa o módulo apenas aqui, na primeira execução."""
+        return get_dispatch(self.module_path, self.func_name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "module_path": self.module_path,
+            "func_name": self.func_name,
+            "description": self.description,
+            "config_schema": self.config_schema,
+            "default_payload": self.default_payload,
+            "resources": dict(self.resources),
+            "source": self.source,
+        }
+
+_specs: Dict[str, AutomationSpec] = {}
+_by_target: Dict[Tuple[str, str], AutomationSpec] = {}
+_discovered = False
+_lock = threading.Lock()
+
+def modules_root() -> Path:
+    return Path(settings.MODULES_ROOT) if settings.MODULES_ROOT else _DEFAULT_MODULES_ROOT
+
+def _package_for(manifest: Path, root: Path) -> str:
+    rel = manifest.parent.relative_to(root.parent)
+    return ".".join(rel.parts)
+
+def _scan_manifests(root: Path) -> List[AutomationSpec]:
+    specs: List[AutomationSpec] = []
+    if not root.is_dir():
+        return specs
+    for manifest in sorted(root.rglob(MANIFEST_NAME)):
+        try:
+            data = json.loads(manifest.read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            log.warning("Manifesto inválido ignorado: %s (%s)", manifest, e)
+            continue
+        package = data.get("package") or _package_for(manifest, root)
+        for entry in data.get("automations") or []:
+            module = entry.get("module")
+            func = entry.get("func") or "run"
+            name = entry.get("name")
+            if not module or not name:
+                log.warning("Entrada sem 'name'/'module' ignorada em %s", manifest)
+                continue
+            module_path = module if "." in module else f"{package}.{module}"
+            specs.append(AutomationSpec(
+                name=name,
+                module_path=module_path,
+                func_name=func,
+                description=entry.get("description"),
+                config_schema=entry.get("config_schema"),
+                default_payload=entry.get("default_payload"),
+                resources=dict(entry.get("resources") or {}),
+                source=str(manifest),
+            ))
+    return specs
+
+def _scan_entry_points() -> List[AutomationSpec]:
+    specs: List[AutomationSpec] = []
+    try:
+        eps = metadata.entry_points(group=ENTRY_POINT_GROUP)
+    except Exception as e:
+        log.warning("Falha ao listar entry points de automações: %s", e)
+        return specs
+    for ep in eps:
+        module_path, _, func_name = ep.value.partition(":")
+        specs.append(AutomationSpec(
+            name=ep.name,
+            module_path=module_path.strip(),
+            func_name=(func_name or "run").strip(),
+            source=f"entry_point:{ep.value}",
+        ))
+    return specs
+
+def discover(refresh: bool = False) -> List[AutomationSpec]:
+    """Indexa as automações disponíveis sem importar nenhum módulo."""
+    global _discovered
+    with _lock:
+        if _discovered and not refresh:
+            return list(_specs.values())
+        specs: Dict[str, AutomationSpec] = {}
+        for spec in _scan_manifests(modules_root()) + _scan_entry_points():
+            if spec.name in specs:
+                log.warning("Automação '%s' duplicada; mantendo %s", spec.name, specs[spec.name].source)
+                continue
+            specs[spec.name] = spec
+        _specs.clear()
+        _specs.update(specs)
+        _by_target.clear()
+        _by_target.update({(s.module_path, s.func_name): s for s in specs.values()})
+        _discovered = True
+        log.info("Registro de automações carregado: %d automações", len(_specs))
+        return list(_specs.values())
+
+def all_specs() -> List[AutomationSpec]:
+    return discover()
+
+def get(name: str) -> Optional[AutomationSpec]:
+    discover()
+    return _specs.get(name)
+
+def find(module_path: str, func_name: str) -> Optional[AutomationSpec]:
+    discover()
+    return _by_target.get((module_path, func_name))
+
+def validate_target(module_path: str, func_name: str) -> Optional[str]:
+    """Retorna uma mensagem de erro, ou None se o alvo é válido.
+
+    Alvos do registro não são importados. Os demais não têm manifesto que garanta a função,
+    então o módulo é importado para conferir que `func_name` existe e é callable.
+    """
+    if module_path.startswith("shell:"):
+        return None
+    if find(module_path, func_name) is not None:
+        return None
+    try:
+        found = importlib.util.find_spec(module_path) is not None
+    except (ImportError, ValueError):
+        found = False
+    if not found:
+        return f"Módulo '{module_path}' não encontrado"
+    try:
+        get_dispatch(module_path, func_name)
+    except Exception as e:
+        return f"Falha ao importar {module_path}.{func_name}: {e}"
+    return None
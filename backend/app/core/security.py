@@ -1,14 +1,20 @@
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Tuple
 from jose import jwt
 from passlib.context import CryptContext
 from app.core.config import settings
-from cryptography.fernet import Fernet, InvalidToken
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from functools import lru_cache
 import base64
 import os
 import hashlib
 
-pwd_context = CryptContext(schemes=["bcrypt_sha256"], deprecated="auto")
+# Hashes com custo diferente de BCRYPT_ROUNDS são refeitos no próximo login (verify_and_update).
+pwd_context = CryptContext(
+    schemes=["bcrypt_sha256"],
+    deprecated="auto",
+    bcrypt_sha256__rounds=settings.BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -16,6 +22,13 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, password_hash: str) -> bool:
     return pwd_context.verify(plain_password, password_hash)
 
+def verify_and_update(plain_password: str, password_hash: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """(senha confere, hash novo ou None). Sem hash, gasta o mesmo tempo e devolve False."""
+    if not password_hash:
+        pwd_context.dummy_verify()
+        return False, None
+    return pwd_context.verify_and_update(plain_password, password_hash)
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -26,19 +39,47 @@ def _derive_fernet_key_from_secret(secret: str) -> bytes:
     digest = hashlib.sha256(secret.encode("utf-8")).digest()  
     return base64.urlsafe_b64encode(digest)  
 
-def _get_fernet() -> Fernet:
+def _load_fernet(raw: str, name: str) -> Fernet:
+    try:
+        return Fernet(raw.strip().encode("utf-8"))
+    except Exception:
+        raise RuntimeError(
+            f"{name} inválida. Ela deve ser uma chave base64 urlsafe de 32 bytes "
+            "(44 caracteres). Ex.: base64.urlsafe_b64encode(os.urandom(32)).decode()"
+        )
+
+@lru_cache(maxsize=1)
+def _keys() -> Tuple[Fernet, ...]:
+    """Chaves do processo: a primeira cifra, todas decifram.
+
+    Para rotacionar, a chave nova vai em SECRETS_KEY e a antiga passa para SECRETS_PREVIOUS_KEYS
+    (separadas por vírgula); depois de `rotate_secret` em todos os registros a antiga pode sair.
+    A chave derivada do SECRET_KEY fica sempre por último, para os segredos gravados antes de
+    existir SECRETS_KEY.
+    """
+    keys = []
     raw = os.getenv("SECRETS_KEY")
     if raw:
-        try:
-            key_bytes = raw.encode("utf-8") if isinstance(raw, str) else raw
-            return Fernet(key_bytes)
-        except Exception:
-            raise RuntimeError(
-                "SECRETS_KEY inválida. Ela deve ser uma chave base64 urlsafe de 32 bytes "
-                "(44 caracteres). Ex.: base64.urlsafe_b64encode(os.urandom(32)).decode()"
-            )
-    key_bytes = _derive_fernet_key_from_secret(settings.SECRET_KEY)
-    return Fernet(key_bytes)
+        keys.append(_load_fernet(raw, "SECRETS_KEY"))
+    for old in (os.getenv("SECRETS_PREVIOUS_KEYS") or "").split(","):
+        if old.strip():
+            keys.append(_load_fernet(old, "SECRETS_PREVIOUS_KEYS"))
+    keys.append(Fernet(_derive_fernet_key_from_secret(settings.SECRET_KEY)))
+    return tuple(keys)
+
+@lru_cache(maxsize=1)
+def _get_fernet() -> MultiFernet:
+    return MultiFernet(list(_keys()))
+
+def reset_key_ring() -> None:
+    """Descarta o chaveiro em cache (ex.: depois de trocar as variáveis de ambiente)."""
+    _keys.cache_clear()
+    _get_fernet.cache_clear()
+
+def primary_key_fingerprint() -> str:
+    """Identifica a chave primária sem expô-la (usado no checkpoint da rotação)."""
+    raw = os.getenv("SECRETS_KEY") or settings.SECRET_KEY
+    return hashlib.sha256(b"hub-secrets:" + raw.strip().encode("utf-8")).hexdigest()[:16]
 
 def encrypt_secret(value: str) -> str:
     f = _get_fernet()
@@ -52,3 +93,17 @@ def decrypt_secret(token_str: str) -> str:
         return plain.decode("utf-8")
     except InvalidToken:
         raise ValueError("Secret inválido ou chave incorreta")
+
+def needs_rotation(token_str: str) -> bool:
+    try:
+        _keys()[0].decrypt(token_str.encode("utf-8"))
+        return False
+    except InvalidToken:
+        return True
+
+def rotate_secret(token_str: str) -> str:
+    """Recifra o token com a chave primária (mantendo o timestamp original)."""
+    try:
+        return _get_fernet().rotate(token_str.encode("utf-8")).decode("utf-8")
+    except InvalidToken:
+        raise ValueError("Secret inválido ou chave incorreta")
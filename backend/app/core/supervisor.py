@@ -0,0 +1,153 @@
+from __future__ import annotations
+import logging
+import multiprocessing as mp
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows não tem RLIMIT_*
+    resource = None
+
+log = logging.getLogger("supervisor")
+
+@dataclass
+class SupervisedOutcome:
+    ok: bool
+    value: Any = None
+    error: Optional[str] = None
+    error_type: Optional[str] = None
+    traceback: Optional[str] = None
+    exit_code: Optional[int] = None
+    timed_out: bool = False
+    cancelled: bool = False
+
+    def error_result(self) -> Dict[str, Any]:
+        return {
+            "ok": False,
+            "error": self.error,
+            "error_type": self.error_type,
+            "traceback": self.traceback,
+            "exit_code": self.exit_code,
+            "timed_out": self.timed_out,
+            "cancelled": self.cancelled,
+        }
+
+def _apply_limits(cpu_limit_sec: Optional[int], memory_limit_mb: Optional[int]) -> None:
+    if resource is None:
+        return
+    if cpu_limit_sec:
+        resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_limit_sec), int(cpu_limit_sec) + 5))
+    if memory_limit_mb:
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+def _call(module_path: str, func_name: str, payload: Dict[str, Any]):
+    from app.core.automation_loader import call_automation
+    return call_automation(module_path, func_name, payload)
+
+def _child(conn, module_path: str, func_name: str, payload: Dict[str, Any], cpu_limit_sec, memory_limit_mb):
+    try:
+        _apply_limits(cpu_limit_sec, memory_limit_mb)
+        value = _call(module_path, func_name, payload)
+        conn.send(("ok", value))
+    except BaseException as e:
+        try:
+            conn.send(("error", {
+                "error": f"{type(e).__name__}: {e}",
+                "error_type": type(e).__name__,
+                "traceback": traceback.format_exc(),
+            }))
+        except Exception:
+            pass
+    finally:
+        conn.close()
+
+def _stop(proc) -> None:
+    if not proc.is_alive():
+        return
+    proc.terminate()
+    proc.join(5)
+    if proc.is_alive():
+        proc.kill()
+        proc.join(5)
+
+def run_supervised(
+    module_path: str,
+    func_name: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    timeout_sec: Optional[float] = None,
+    cpu_limit_sec: Optional[int] = None,
+    memory_limit_mb: Optional[int] = None,
+    cancel_check: Optional[Callable[[], bool]] = None,
+    poll_interval: float = 1.0,
+) -> SupervisedOutcome:
+    """Executa `module_path:func_name(payload)` em um processo filho supervisionado.
+
+    O processo é encerrado se passar de `timeout_sec` ou se `cancel_check()` retornar True.
+    Limites de CPU/memória usam RLIMIT_CPU/RLIMIT_AS quando a plataforma suporta.
+    """
+    ctx = mp.get_context("spawn")
+    recv_conn, send_conn = ctx.Pipe(duplex=False)
+    proc = ctx.Process(
+        target=_child,
+        args=(send_conn, module_path, func_name, payload or {}, cpu_limit_sec, memory_limit_mb),
+        name=f"automation-{module_path}",
+    )
+    proc.start()
+    send_conn.close()
+    deadline = time.monotonic() + timeout_sec if timeout_sec else None
+    try:
+        while True:
+            if recv_conn.poll(poll_interval):
+                try:
+                    kind, value = recv_conn.recv()
+                except EOFError:
+                    proc.join(5)
+                    return SupervisedOutcome(
+                        ok=False,
+                        error=f"Processo da automação terminou inesperadamente (exit code {proc.exitcode})",
+                        error_type="ProcessError",
+                        exit_code=proc.exitcode,
+                    )
+                proc.join(5)
+                if kind == "ok":
+                    return SupervisedOutcome(ok=True, value=value, exit_code=proc.exitcode)
+                return SupervisedOutcome(ok=False, exit_code=proc.exitcode, **value)
+            if not proc.is_alive() and not recv_conn.poll(0):
+                return SupervisedOutcome(
+                    ok=False,
+                    error=f"Processo da automação terminou inesperadamente (exit code {proc.exitcode})",
+                    error_type="ProcessError",
+                    exit_code=proc.exitcode,
+                )
+            if deadline is not None and time.monotonic() > deadline:
+                _stop(proc)
+                return SupervisedOutcome(
+                    ok=False,
+                    error=f"Tempo limite de {timeout_sec:g}s excedido",
+                    error_type="TimeoutError",
+                    exit_code=proc.exitcode,
+                    timed_out=True,
+                )
+            if cancel_check is not None:
+                try:
+                    cancelled = cancel_check()
+                except Exception:
+                    log.exception("Falha ao consultar cancelamento de %s", module_path)
+                    cancelled = False
+                if cancelled:
+                    _stop(proc)
+                    return SupervisedOutcome(
+                        ok=False,
+                        error="Execução cancelada",
+                        error_type="Cancelled",
+                        exit_code=proc.exitcode,
+                        cancelled=True,
+                    )
+    finally:
+        _stop(proc)
+        recv_conn.close()
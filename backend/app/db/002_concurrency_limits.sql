@@ -0,0 +1,8 @@
+-- limites de concorrência por automação
+ALTER TABLE automations
+ADD COLUMN IF NOT EXISTS max_concurrent INTEGER;
+
+ALTER TABLE automations
+ADD COLUMN IF NOT EXISTS exclusive_resource VARCHAR(255);
+
+CREATE INDEX IF NOT EXISTS idx_runs_automation_status ON runs(automation_id, status);
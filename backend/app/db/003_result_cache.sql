@@ -0,0 +1,6 @@
+-- cache de resultado opcional por automação
+ALTER TABLE automations
+ADD COLUMN IF NOT EXISTS cache_ttl_sec INTEGER;
+
+ALTER TABLE automations
+ADD COLUMN IF NOT EXISTS cache_key_fields JSONB;
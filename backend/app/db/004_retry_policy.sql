@@ -0,0 +1,11 @@
+-- política de retentativas por automação e encadeamento das tentativas
+ALTER TABLE automations
+ADD COLUMN IF NOT EXISTS retry_policy JSONB;
+
+ALTER TABLE runs
+ADD COLUMN IF NOT EXISTS attempt INTEGER NOT NULL DEFAULT 1;
+
+ALTER TABLE runs
+ADD COLUMN IF NOT EXISTS parent_run_id UUID REFERENCES runs(id) ON DELETE SET NULL;
+
+CREATE INDEX IF NOT EXISTS idx_runs_parent ON runs(parent_run_id);
@@ -0,0 +1,3 @@
+-- tempo limite de execução por automação
+ALTER TABLE automations
+ADD COLUMN IF NOT EXISTS timeout_sec INTEGER;
@@ -0,0 +1,15 @@
+-- artefatos gerados pelos runs (conteúdo endereçado por SHA-256 em ARTIFACTS_ROOT)
+CREATE TABLE IF NOT EXISTS run_artifacts (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    run_id UUID NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name VARCHAR(255) NOT NULL,
+    sha256 VARCHAR(64) NOT NULL,
+    size BIGINT NOT NULL,
+    content_type VARCHAR(100),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT uq_run_artifact_name UNIQUE (run_id, name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_run_artifacts_run_id ON run_artifacts(run_id);
+CREATE INDEX IF NOT EXISTS idx_run_artifacts_sha256 ON run_artifacts(sha256);
+CREATE INDEX IF NOT EXISTS idx_run_artifacts_created_at ON run_artifacts(created_at);
@@ -0,0 +1,21 @@
+-- entregas (WhatsApp etc.) disparadas pelos runs e processadas na fila `deliveries`
+CREATE TABLE IF NOT EXISTS deliveries (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    run_id UUID NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    group_name VARCHAR(100),
+    channel VARCHAR(30) NOT NULL DEFAULT 'whatsapp',
+    backend VARCHAR(30),
+    recipients JSONB NOT NULL DEFAULT '[]'::jsonb,
+    message TEXT,
+    media_path TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    results JSONB NOT NULL DEFAULT '[]'::jsonb,
+    error TEXT,
+    job_id VARCHAR(64),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS idx_deliveries_run_id ON deliveries(run_id);
@@ -0,0 +1,18 @@
+-- imagens de referência do matcher (search_image), versionadas por nome
+CREATE TABLE IF NOT EXISTS template_assets (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    name VARCHAR(500) NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1,
+    sha256 VARCHAR(64) NOT NULL,
+    ext VARCHAR(10) NOT NULL,
+    size INTEGER NOT NULL,
+    width INTEGER,
+    height INTEGER,
+    content BYTEA NOT NULL,
+    uploaded_by UUID REFERENCES users(id) ON DELETE SET NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    CONSTRAINT uq_template_asset_version UNIQUE (name, version)
+);
+
+CREATE INDEX IF NOT EXISTS idx_template_assets_name ON template_assets(name);
+CREATE INDEX IF NOT EXISTS idx_template_assets_sha256 ON template_assets(sha256);
@@ -0,0 +1,5 @@
+-- GET /schedules filtra por permissão no próprio SELECT (schedules JOIN automations)
+CREATE INDEX IF NOT EXISTS idx_schedules_automation_id ON schedules(automation_id);
+CREATE INDEX IF NOT EXISTS idx_schedules_created_at ON schedules(created_at DESC);
+-- já criado em 001_init.sql; repetido para bancos que vieram de dumps sem ele
+CREATE INDEX IF NOT EXISTS idx_automations_owner ON automations(owner_type, owner_id);
@@ -0,0 +1,83 @@
+-- runs particionada por mês em created_at. Partições antigas são exportadas para arquivos
+-- (app.services.run_archive), indexadas em runs_archive_index e removidas do banco.
+--
+-- Postgres não aceita FK apontando só para runs(id) numa tabela particionada (a PK precisa
+-- incluir created_at), então as FKs de run_artifacts, deliveries e parent_run_id saem; a
+-- limpeza dessas linhas passa a ser feita pelo job de retenção ao arquivar a partição.
+
+CREATE OR REPLACE FUNCTION ensure_runs_partition(p_month DATE) RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::date;
+    v_name TEXT := 'runs_p' || to_char(v_start, 'YYYYMM');
+BEGIN
+    IF to_regclass(v_name) IS NULL THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF runs FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, (v_start + INTERVAL '1 month')::date
+        );
+    END IF;
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    v_month DATE;
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid
+        WHERE c.relname = 'runs'
+    ) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE run_artifacts DROP CONSTRAINT IF EXISTS run_artifacts_run_id_fkey;
+    ALTER TABLE deliveries DROP CONSTRAINT IF EXISTS deliveries_run_id_fkey;
+    ALTER TABLE runs DROP CONSTRAINT IF EXISTS runs_parent_run_id_fkey;
+    ALTER TABLE runs RENAME TO runs_unpartitioned;
+
+    CREATE TABLE runs (
+        LIKE runs_unpartitioned INCLUDING DEFAULTS,
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    ALTER TABLE runs ADD CONSTRAINT runs_automation_id_fkey
+        FOREIGN KEY (automation_id) REFERENCES automations(id) ON DELETE CASCADE;
+    ALTER TABLE runs ADD CONSTRAINT runs_user_id_fkey
+        FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE SET NULL;
+
+    FOR v_month IN
+        SELECT generate_series(
+            date_trunc('month', COALESCE((SELECT MIN(created_at) FROM runs_unpartitioned), NOW())),
+            date_trunc('month', NOW()) + INTERVAL '2 months',
+            INTERVAL '1 month'
+        )::date
+    LOOP
+        PERFORM ensure_runs_partition(v_month);
+    END LOOP;
+    -- rede de segurança: o job de retenção cria os meses seguintes antes de precisar
+    CREATE TABLE runs_default PARTITION OF runs DEFAULT;
+
+    INSERT INTO runs SELECT * FROM runs_unpartitioned;
+    DROP TABLE runs_unpartitioned;
+END $$;
+
+CREATE INDEX IF NOT EXISTS idx_runs_id ON runs(id);
+CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_runs_automation_status ON runs(automation_id, status);
+CREATE INDEX IF NOT EXISTS idx_runs_parent ON runs(parent_run_id);
+
+-- histórico arquivado: só o necessário para listar e achar o arquivo; o registro completo
+-- (payload/result) fica em RUN_ARCHIVE_ROOT/runs-AAAA-MM.jsonl.gz
+CREATE TABLE IF NOT EXISTS runs_archive_index (
+    id UUID PRIMARY KEY,
+    automation_id UUID NOT NULL,
+    user_id UUID,
+    status VARCHAR(50) NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE,
+    archive_file TEXT NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_runs_archive_automation ON runs_archive_index(automation_id, created_at DESC);
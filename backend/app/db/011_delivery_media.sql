@@ -0,0 +1,7 @@
+-- nome e tipo da mídia da entrega: depois da ingestão o arquivo fica no store de artefatos,
+-- endereçado pelo SHA-256 e sem extensão
+ALTER TABLE deliveries
+ADD COLUMN IF NOT EXISTS media_name VARCHAR(255);
+
+ALTER TABLE deliveries
+ADD COLUMN IF NOT EXISTS media_type VARCHAR(100);
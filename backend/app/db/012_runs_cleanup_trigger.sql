@@ -0,0 +1,23 @@
+-- Sem FKs apontando para runs (010), apagar um run não leva mais junto os artefatos, as
+-- entregas nem a referência dos retries. Isso inclui a cascata de automations -> runs
+-- (runs_automation_id_fkey). Linhas órfãs em run_artifacts mantêm os blobs vivos no store.
+-- O trigger refaz a cascata para qualquer DELETE em runs. O DROP de partição feito pelo
+-- job de retenção não dispara trigger e continua limpando por conta própria.
+
+CREATE OR REPLACE FUNCTION runs_cleanup_children() RETURNS TRIGGER AS $$
+BEGIN
+    DELETE FROM run_artifacts WHERE run_id = OLD.id;
+    DELETE FROM deliveries WHERE run_id = OLD.id;
+    UPDATE runs SET parent_run_id = NULL WHERE parent_run_id = OLD.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_runs_cleanup_children ON runs;
+CREATE TRIGGER trg_runs_cleanup_children
+    AFTER DELETE ON runs
+    FOR EACH ROW EXECUTE FUNCTION runs_cleanup_children();
+
+-- órfãos deixados por automações apagadas antes deste trigger
+DELETE FROM run_artifacts ra WHERE NOT EXISTS (SELECT 1 FROM runs r WHERE r.id = ra.run_id);
+DELETE FROM deliveries d WHERE NOT EXISTS (SELECT 1 FROM runs r WHERE r.id = d.run_id);
@@ -0,0 +1,51 @@
+-- runs_default recebe os runs de meses sem partição (o job de retenção ficou parado além de
+-- RUN_PARTITIONS_AHEAD). Com linhas do mês na default, o CREATE TABLE ... PARTITION OF falha.
+-- A partição agora é montada fora da tabela, recebe as linhas do mês tiradas da default e só
+-- então é anexada. O job de retenção chama a função também para os meses presentes na default.
+
+CREATE OR REPLACE FUNCTION runs_cleanup_children() RETURNS TRIGGER AS $$
+BEGIN
+    -- linhas sendo movidas da default para a partição do mês não estão sendo apagadas
+    IF current_setting('hub.moving_runs', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    DELETE FROM run_artifacts WHERE run_id = OLD.id;
+    DELETE FROM deliveries WHERE run_id = OLD.id;
+    UPDATE runs SET parent_run_id = NULL WHERE parent_run_id = OLD.id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION ensure_runs_partition(p_month DATE) RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::date;
+    v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::date;
+    v_name TEXT := 'runs_p' || to_char(v_start, 'YYYYMM');
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN v_name;
+    END IF;
+    IF to_regclass('runs_default') IS NULL
+       OR NOT EXISTS (SELECT 1 FROM runs_default WHERE created_at >= v_start AND created_at < v_end) THEN
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF runs FOR VALUES FROM (%L) TO (%L)',
+            v_name, v_start, v_end
+        );
+        RETURN v_name;
+    END IF;
+
+    EXECUTE format('CREATE TABLE %I (LIKE runs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', v_name);
+    PERFORM set_config('hub.moving_runs', 'on', true);
+    EXECUTE format(
+        'WITH moved AS (DELETE FROM runs_default WHERE created_at >= %L AND created_at < %L RETURNING *) '
+        || 'INSERT INTO %I SELECT * FROM moved',
+        v_start, v_end, v_name
+    );
+    PERFORM set_config('hub.moving_runs', 'off', true);
+    EXECUTE format(
+        'ALTER TABLE runs ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,4 @@
+-- captura a registrar no índice de mudanças da automação (modules.common.phash) quando a
+-- entrega terminar 'sent'; registrar antes do envio faria um envio com falha nunca ser refeito
+ALTER TABLE deliveries
+ADD COLUMN IF NOT EXISTS sent_marker JSONB;
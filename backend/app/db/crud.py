@@ -2,9 +2,10 @@ from __future__ import annotations
 import uuid
 from typing import Optional, Any, Dict, List, Sequence, Union
 from uuid import UUID
-from sqlalchemy.orm import Session
-from sqlalchemy import text, func
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import text, func, and_, or_
 from app.db import models
+from app.services import response_cache, result_store
 from datetime import datetime, timezone, timedelta
 import logging
 
@@ -82,6 +83,13 @@ def create_automation(
     owner_id: Union[str, UUID],
     default_payload: Optional[Dict[str, Any]] = None,
     config_schema: Optional[Dict[str, Any]] = None,
+    *,
+    max_concurrent: Optional[int] = None,
+    exclusive_resource: Optional[str] = None,
+    cache_ttl_sec: Optional[int] = None,
+    cache_key_fields: Optional[List[str]] = None,
+    retry_policy: Optional[Dict[str, Any]] = None,
+    timeout_sec: Optional[int] = None,
 ) -> models.Automation:
     owner_id_uuid = _to_uuid(owner_id)
     a = models.Automation(
@@ -93,6 +101,12 @@ def create_automation(
         owner_id=owner_id_uuid,
         default_payload=default_payload or {},
         config_schema=config_schema or {},
+        max_concurrent=max_concurrent,
+        exclusive_resource=exclusive_resource,
+        cache_ttl_sec=cache_ttl_sec,
+        cache_key_fields=cache_key_fields,
+        retry_policy=retry_policy,
+        timeout_sec=timeout_sec,
     )
     db.add(a)
     db.commit()
@@ -156,23 +170,44 @@ def list_automations(db: Session, owner_type: Optional[str] = None, owner_id: Op
     return q.order_by(text("created_at DESC")).all()
 
 def list_automations_for_user(db: Session, user_id: Union[str, UUID]) -> list:
-    role_global = get_user_global_role(db, user_id)
-    if role_global == "admin":
-        return db.query(models.Automation).order_by(text("created_at DESC")).all()
-    sector_ids = get_user_sector_ids(db, user_id)
-    q_user = db.query(models.Automation).filter(
-        models.Automation.owner_type == 'user',
-        models.Automation.owner_id == _to_uuid(user_id)
+    """Automações visíveis ao usuário numa única consulta, com `Automation.sector` já carregado.
+
+    Admin vê todas; os demais veem as próprias e, se forem manager em algum setor, as dos setores
+    de que participam.
+    """
+    uid = _to_uuid(user_id)
+    if uid is None:
+        return []
+    is_admin = (
+        db.query(models.User.id)
+        .filter(models.User.id == uid, func.lower(models.User.role) == "admin")
+        .exists()
+    )
+    member_sectors = (
+        db.query(models.SectorMember.sector_id)
+        .filter(models.SectorMember.user_id == uid)
+    )
+    is_manager_somewhere = (
+        db.query(models.SectorMember.id)
+        .filter(models.SectorMember.user_id == uid, func.lower(models.SectorMember.role) == "manager")
+        .exists()
+    )
+    return (
+        db.query(models.Automation)
+        .outerjoin(models.Automation.sector)
+        .options(contains_eager(models.Automation.sector))
+        .filter(or_(
+            is_admin,
+            and_(models.Automation.owner_type == 'user', models.Automation.owner_id == uid),
+            and_(
+                models.Automation.owner_type == 'sector',
+                models.Automation.owner_id.in_(member_sectors.scalar_subquery()),
+                is_manager_somewhere,
+            ),
+        ))
+        .order_by(models.Automation.created_at.desc())
+        .all()
     )
-    roles_map = get_user_roles_by_sector(db, user_id)
-    is_manager_somewhere = any((r or "").lower() == "manager" for r in roles_map.values())
-    if is_manager_somewhere and sector_ids:
-        q_sector = db.query(models.Automation).filter(
-            models.Automation.owner_type == 'sector',
-            models.Automation.owner_id.in_(sector_ids)
-        )
-        return q_user.union_all(q_sector).order_by(text("created_at DESC")).all()
-    return q_user.order_by(text("created_at DESC")).all()
 
 def list_automations_assigned_to_user(db: Session, user_id: Union[str, UUID]) -> List[models.Automation]:
     uid = _to_uuid(user_id)
@@ -225,37 +260,149 @@ def set_run_status_final(db: Session, run_id: Union[str, UUID], status: str, res
     status_norm = status.lower()
     db.execute(
         text("UPDATE runs SET status=:st, finished_at=now(), result=:res WHERE id=:id"),
-        {"st": status_norm, "res": result, "id": rid}
+        {"st": status_norm, "res": result_store.compact(result), "id": rid}
     )
     db.commit()
 
+def count_active_runs(db: Session, automation_id: Union[str, UUID]) -> int:
+    aid = _to_uuid(automation_id)
+    if aid is None:
+        return 0
+    return (
+        db.query(func.count(models.Run.id))
+        .filter(
+            models.Run.automation_id == aid,
+            models.Run.status.in_(("queued", "running")),
+        )
+        .scalar()
+        or 0
+    )
+
+def create_retry_run(db: Session, failed: models.Run) -> models.Run:
+    run = models.Run(
+        automation_id=failed.automation_id,
+        user_id=failed.user_id,
+        status="queued",
+        payload=failed.payload or {},
+        attempt=(failed.attempt or 1) + 1,
+        parent_run_id=failed.parent_run_id or failed.id,
+    )
+    db.add(run)
+    db.commit()
+    db.refresh(run)
+    return run
+
+def list_run_attempts(db: Session, run_id: Union[str, UUID]) -> list[models.Run]:
+    run = get_run(db, run_id)
+    if not run:
+        return []
+    root_id = run.parent_run_id or run.id
+    return (
+        db.query(models.Run)
+        .filter((models.Run.id == root_id) | (models.Run.parent_run_id == root_id))
+        .order_by(models.Run.attempt.asc())
+        .all()
+    )
+
+def delete_run(db: Session, run_id: Union[str, UUID]) -> None:
+    rid = _to_uuid(run_id)
+    if rid is None:
+        return
+    # runs é particionada e não tem mais FKs apontando para ela; a cascata é feita aqui
+    db.query(models.RunArtifact).filter(models.RunArtifact.run_id == rid).delete(synchronize_session=False)
+    db.query(models.Delivery).filter(models.Delivery.run_id == rid).delete(synchronize_session=False)
+    db.query(models.Run).filter(models.Run.parent_run_id == rid).update(
+        {models.Run.parent_run_id: None}, synchronize_session=False
+    )
+    db.query(models.Run).filter(models.Run.id == rid).delete()
+    db.commit()
+
 def get_run(db: Session, run_id: Union[str, UUID]) -> Optional[models.Run]:
     rid = _to_uuid(run_id)
     if rid is None:
         return None
     return db.query(models.Run).filter(models.Run.id == rid).first()
 
-def list_runs_for_user(db: Session, user_id: Union[str, UUID], automation_id: Optional[Union[str, UUID]] = None) -> list[models.Run]:
-    role_global = get_user_global_role(db, user_id)
-    q = db.query(models.Run).join(models.Automation, models.Run.automation_id == models.Automation.id)
-    if role_global == "admin":
-        if automation_id:
-            q = q.filter(models.Run.automation_id == _to_uuid(automation_id))
-        return q.order_by(text("runs.started_at DESC NULLS LAST, runs.created_at DESC NULLS LAST, runs.id DESC")).all()
-
+def _visible_automations_filter(db: Session, user_id: Union[str, UUID]):
+    """Condição sobre Automation para quem não é admin (None para admin: vê tudo)."""
+    if get_user_global_role(db, user_id) == "admin":
+        return None
     roles_map = get_user_roles_by_sector(db, user_id)
     manager_sector_ids = [_to_uuid(sid) for sid, r in roles_map.items() if (r or "").lower() == "manager"]
     cond = ((models.Automation.owner_type == 'user') & (models.Automation.owner_id == _to_uuid(user_id)))
     if manager_sector_ids:
         cond = cond | ((models.Automation.owner_type == 'sector') & (models.Automation.owner_id.in_(manager_sector_ids)))
-    q = q.filter(cond)
+    return cond
+
+def list_runs_for_user(
+    db: Session,
+    user_id: Union[str, UUID],
+    automation_id: Optional[Union[str, UUID]] = None,
+    *,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> list[models.Run]:
+    q = db.query(models.Run).join(models.Automation, models.Run.automation_id == models.Automation.id)
+    cond = _visible_automations_filter(db, user_id)
+    if cond is not None:
+        q = q.filter(cond)
     if automation_id:
         q = q.filter(models.Run.automation_id == _to_uuid(automation_id))
-    return q.order_by(
+    if since is not None:
+        # filtro em created_at (chave da partição) deixa o Postgres ler só os meses recentes
+        q = q.filter(models.Run.created_at >= since)
+    q = q.order_by(
         models.Run.started_at.desc().nullslast(),
         models.Run.created_at.desc().nullslast(),
         models.Run.id.desc(),
-    ).all()
+    )
+    if limit:
+        q = q.limit(limit)
+    return q.all()
+
+def list_archived_runs_for_user(
+    db: Session,
+    user_id: Union[str, UUID],
+    automation_id: Optional[Union[str, UUID]] = None,
+    *,
+    since: Optional[datetime] = None,
+    limit: Optional[int] = None,
+) -> list[models.RunArchiveEntry]:
+    q = db.query(models.RunArchiveEntry).join(
+        models.Automation, models.RunArchiveEntry.automation_id == models.Automation.id
+    )
+    cond = _visible_automations_filter(db, user_id)
+    if cond is not None:
+        q = q.filter(cond)
+    if automation_id:
+        q = q.filter(models.RunArchiveEntry.automation_id == _to_uuid(automation_id))
+    if since is not None:
+        q = q.filter(models.RunArchiveEntry.created_at >= since)
+    q = q.order_by(models.RunArchiveEntry.created_at.desc(), models.RunArchiveEntry.id.desc())
+    if limit:
+        q = q.limit(limit)
+    return q.all()
+
+def create_delivery(db: Session, run_id: Union[str, UUID], **fields) -> models.Delivery:
+    delivery = models.Delivery(run_id=_to_uuid(run_id), **fields)
+    db.add(delivery)
+    db.commit()
+    db.refresh(delivery)
+    return delivery
+
+def get_delivery(db: Session, delivery_id: Union[str, UUID]) -> Optional[models.Delivery]:
+    did = _to_uuid(delivery_id)
+    if did is None:
+        return None
+    return db.query(models.Delivery).filter(models.Delivery.id == did).first()
+
+def list_deliveries_for_run(db: Session, run_id: Union[str, UUID]) -> list[models.Delivery]:
+    return (
+        db.query(models.Delivery)
+        .filter(models.Delivery.run_id == _to_uuid(run_id))
+        .order_by(models.Delivery.created_at, models.Delivery.group_name)
+        .all()
+    )
 
 def get_user_roles_by_sector(db: Session, user_id: Union[str, UUID]) -> dict:
     uid = _to_uuid(user_id)
@@ -352,6 +499,37 @@ def list_secrets(db: Session, *, owner_type: str, owner_id: Union[str, UUID]) ->
         .all()
     )
 
+def get_secrets_for_owners(db: Session, owners: Sequence[tuple]) -> Dict[str, str]:
+    """Carrega e decifra numa consulta só os segredos de vários donos `(owner_type, owner_id)`.
+
+    Em chaves repetidas vale o dono que aparece por último em `owners`.
+    """
+    from app.core.security import decrypt_secret
+    rank = {}
+    for owner_type, owner_id in owners:
+        oid = _to_uuid(owner_id)
+        if oid is not None:
+            rank[(owner_type, str(oid))] = len(rank)
+    if not rank:
+        return {}
+    rows = (
+        db.query(models.Secret.owner_type, models.Secret.owner_id, models.Secret.key, models.Secret.value_ciphertext)
+        .filter(or_(*[
+            and_(models.Secret.owner_type == t, models.Secret.owner_id == oid) for t, oid in rank
+        ]))
+        .all()
+    )
+    out: Dict[str, str] = {}
+    for owner_type, owner_id, key, ciphertext in sorted(rows, key=lambda r: rank[(r[0], str(r[1]))]):
+        try:
+            out[key] = decrypt_secret(ciphertext)
+        except ValueError:
+            log.warning("Segredo '%s' de %s %s não pôde ser decifrado", key, owner_type, owner_id)
+    return out
+
+def get_secrets_for_owner(db: Session, *, owner_type: str, owner_id: Union[str, UUID]) -> Dict[str, str]:
+    return get_secrets_for_owners(db, [(owner_type, owner_id)])
+
 def get_secret(db: Session, secret_id: Union[str, UUID]) -> Optional[models.Secret]:
     sid = _to_str_uuid(secret_id)
     if not sid:
@@ -409,6 +587,55 @@ def list_schedules(db: Session, *, automation_id: Optional[Union[str, UUID]] = N
         q = q.filter(models.Schedule.automation_id == _to_uuid(automation_id))
     return q.order_by(models.Schedule.created_at.desc()).all()
 
+def list_schedules_for_user(
+    db: Session,
+    user_id: Union[str, UUID],
+    *,
+    is_admin: bool = False,
+    automation_id: Optional[Union[str, UUID]] = None,
+    limit: int = 100,
+    offset: int = 0,
+) -> list:
+    """Agendamentos visíveis ao usuário, com a automação no mesmo SELECT.
+
+    Cada linha é (Schedule, automation_name, automation_owner_type, automation_owner_id).
+
+    Fora o admin, vale a mesma regra das rotas de escrita: automação do próprio usuário ou de um
+    setor em que ele é manager.
+    """
+    uid = _to_uuid(user_id)
+    q = (
+        db.query(
+            models.Schedule,
+            models.Automation.name,
+            models.Automation.owner_type,
+            models.Automation.owner_id,
+        )
+        .join(models.Automation, models.Automation.id == models.Schedule.automation_id)
+    )
+    if automation_id:
+        q = q.filter(models.Schedule.automation_id == _to_uuid(automation_id))
+    if not is_admin:
+        manages_sector = (
+            db.query(models.SectorMember.id)
+            .filter(
+                models.SectorMember.sector_id == models.Automation.owner_id,
+                models.SectorMember.user_id == uid,
+                func.lower(models.SectorMember.role) == "manager",
+            )
+            .exists()
+        )
+        q = q.filter(or_(
+            and_(models.Automation.owner_type != 'sector', models.Automation.owner_id == uid),
+            and_(models.Automation.owner_type == 'sector', manages_sector),
+        ))
+    return (
+        q.order_by(models.Schedule.created_at.desc(), models.Schedule.id)
+        .offset(offset)
+        .limit(limit)
+        .all()
+    )
+
 def get_schedule(db: Session, schedule_id: Union[str, UUID]) -> Optional[models.Schedule]:
     sid = _to_str_uuid(schedule_id)
     if not sid:
@@ -480,6 +707,7 @@ def create_sector(db: Session, name: str) -> models.Sector:
     db.add(s)
     db.commit()
     db.refresh(s)
+    response_cache.bump("sectors")
     return s
 
 def is_user_in_sector(db: Session, user_id: UUID, sector_id: UUID) -> bool:
@@ -518,7 +746,7 @@ def finish_run(
     run.status = status
     run.finished_at = finished_at or datetime.utcnow()
     if result is not None:
-        run.result = result
+        run.result = result_store.compact(result)
     if error:
         run.error = error
 
@@ -587,6 +815,7 @@ def create_dashboard_config(
     db.add(dashboard)
     db.commit()
     db.refresh(dashboard)
+    response_cache.bump("dashboards")
     return dashboard
 
 def update_dashboard_config(
@@ -605,6 +834,7 @@ def update_dashboard_config(
     dashboard.updated_at = datetime.now(timezone.utc)
     db.commit()
     db.refresh(dashboard)
+    response_cache.bump("dashboards")
     return dashboard
 
 def delete_dashboard_config(db: Session, dashboard_id: Union[str, UUID]) -> bool:
@@ -614,4 +844,62 @@ def delete_dashboard_config(db: Session, dashboard_id: Union[str, UUID]) -> bool
     
     db.delete(dashboard)
     db.commit()
+    response_cache.bump("dashboards")
     return True
+
+# ---------- Template Assets ----------
+def get_latest_template_asset(db: Session, name: str) -> Optional[models.TemplateAsset]:
+    return (
+        db.query(models.TemplateAsset)
+        .filter(models.TemplateAsset.name == name)
+        .order_by(models.TemplateAsset.version.desc())
+        .first()
+    )
+
+def list_latest_template_assets(db: Session) -> List[models.TemplateAsset]:
+    latest = (
+        db.query(models.TemplateAsset.name, func.max(models.TemplateAsset.version).label("version"))
+        .group_by(models.TemplateAsset.name)
+        .subquery()
+    )
+    return (
+        db.query(models.TemplateAsset)
+        .join(latest, and_(
+            models.TemplateAsset.name == latest.c.name,
+            models.TemplateAsset.version == latest.c.version,
+        ))
+        .order_by(models.TemplateAsset.name)
+        .all()
+    )
+
+def list_template_versions(db: Session, name: str) -> List[models.TemplateAsset]:
+    return (
+        db.query(models.TemplateAsset)
+        .filter(models.TemplateAsset.name == name)
+        .order_by(models.TemplateAsset.version.desc())
+        .all()
+    )
+
+def get_template_contents(db: Session, sha256s: Sequence[str]) -> Dict[str, bytes]:
+    if not sha256s:
+        return {}
+    rows = (
+        db.query(models.TemplateAsset.sha256, models.TemplateAsset.content)
+        .filter(models.TemplateAsset.sha256.in_(list(sha256s)))
+        .all()
+    )
+    return {sha: bytes(content) for sha, content in rows}
+
+def create_template_asset(db: Session, **fields) -> models.TemplateAsset:
+    asset = models.TemplateAsset(id=uuid.uuid4(), **fields)
+    db.add(asset)
+    db.commit()
+    db.refresh(asset)
+    return asset
+
+def delete_template_assets(db: Session, asset_ids: Sequence[Union[str, UUID]]) -> None:
+    ids = [i for i in (_to_uuid(a) for a in asset_ids) if i is not None]
+    if not ids:
+        return
+    db.query(models.TemplateAsset).filter(models.TemplateAsset.id.in_(ids)).delete(synchronize_session=False)
+    db.commit()
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import Optional
 import enum
-from sqlalchemy import (String,ForeignKey,DateTime,Text,Boolean,Integer,func,UniqueConstraint,)
+from sqlalchemy import (String,ForeignKey,DateTime,Text,Boolean,Integer,BigInteger,LargeBinary,func,UniqueConstraint,)
 from sqlalchemy.dialects.postgresql import UUID as PGUUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from app.db.database import Base
@@ -84,6 +84,24 @@ class Automation(Base):
     default_payload: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict) 
     config_schema: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict) 
     enabled: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    max_concurrent: Mapped[Optional[int]] = mapped_column(
+        Integer, comment="Máximo de execuções simultâneas (NULL = sem limite)"
+    )
+    exclusive_resource: Mapped[Optional[str]] = mapped_column(
+        String, comment="Recurso exclusivo exigido pela automação, ex: 'delphos_desktop'"
+    )
+    cache_ttl_sec: Mapped[Optional[int]] = mapped_column(
+        Integer, comment="TTL do cache de resultado em segundos (NULL/0 = sem cache)"
+    )
+    cache_key_fields: Mapped[Optional[list]] = mapped_column(
+        JSONB, comment="Chaves do payload que compõem a chave do cache (NULL = todas)"
+    )
+    timeout_sec: Mapped[Optional[int]] = mapped_column(
+        Integer, comment="Tempo limite de execução em segundos (NULL = RUN_TIMEOUT_SEC)"
+    )
+    retry_policy: Mapped[Optional[dict]] = mapped_column(
+        JSONB, comment="Política de retentativas {max_attempts, backoff_sec, backoff_factor, max_backoff_sec, jitter, retry_on, retry_codes}"
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now()
     )
@@ -144,9 +162,82 @@ class Run(Base):
     finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     payload: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
     result: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict)
+    attempt: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    parent_run_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        PGUUID(as_uuid=True), ForeignKey("runs.id", ondelete="SET NULL"), nullable=True,
+        comment="Primeira tentativa da cadeia de retentativas"
+    )
     user: Mapped[Optional["User"]] = relationship("User", back_populates="runs")
     automation: Mapped["Automation"] = relationship("Automation", back_populates="runs")
 
+class RunArchiveEntry(Base):
+    """Run de uma partição já arquivada; o registro completo está em `archive_file`."""
+    __tablename__ = "runs_archive_index"
+    id: Mapped[uuid.UUID] = mapped_column(PGUUID(as_uuid=True), primary_key=True)
+    automation_id: Mapped[uuid.UUID] = mapped_column(PGUUID(as_uuid=True), nullable=False)
+    user_id: Mapped[Optional[uuid.UUID]] = mapped_column(PGUUID(as_uuid=True))
+    status: Mapped[str] = mapped_column(String(50), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    archive_file: Mapped[str] = mapped_column(Text, nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+class RunArtifact(Base):
+    __tablename__ = "run_artifacts"
+    __table_args__ = (
+        UniqueConstraint("run_id", "name", name="uq_run_artifact_name"),
+    )
+    id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), primary_key=True, default=uuid4
+    )
+    run_id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), ForeignKey("runs.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    sha256: Mapped[str] = mapped_column(
+        String(64), nullable=False, index=True, comment="Conteúdo em ARTIFACTS_ROOT/<sha[:2]>/<sha[2:4]>/<sha>"
+    )
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[Optional[str]] = mapped_column(String(100))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), index=True
+    )
+
+class Delivery(Base):
+    """Um envio (grupo de destinatários) pedido por um run; processado na fila `deliveries`."""
+    __tablename__ = "deliveries"
+    id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), primary_key=True, default=uuid4
+    )
+    run_id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), ForeignKey("runs.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    group_name: Mapped[Optional[str]] = mapped_column(String(100))
+    channel: Mapped[str] = mapped_column(String(30), nullable=False, default="whatsapp")
+    backend: Mapped[Optional[str]] = mapped_column(String(30))
+    recipients: Mapped[list] = mapped_column(JSONB, nullable=False, default=list)
+    message: Mapped[Optional[str]] = mapped_column(Text)
+    media_path: Mapped[Optional[str]] = mapped_column(Text)
+    media_name: Mapped[Optional[str]] = mapped_column(String(255))
+    media_type: Mapped[Optional[str]] = mapped_column(String(100))
+    # registro gravado no índice de capturas da automação quando a entrega termina 'sent'
+    sent_marker: Mapped[Optional[dict]] = mapped_column(JSONB)
+    status: Mapped[str] = mapped_column(
+        String(20), nullable=False, default="queued", comment="queued|sending|sent|partial|failed"
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    results: Mapped[list] = mapped_column(JSONB, nullable=False, default=list)
+    error: Mapped[Optional[str]] = mapped_column(Text)
+    job_id: Mapped[Optional[str]] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
 # --------- Segredos ---------
 class Secret(Base):
     __tablename__ = "secrets"
@@ -258,3 +349,30 @@ class DashboardConfig(Base):
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
+
+class TemplateAsset(Base):
+    """Imagem de referência do matcher, versionada por nome e distribuída aos workers pelo SHA-256."""
+    __tablename__ = "template_assets"
+    __table_args__ = (
+        UniqueConstraint("name", "version", name="uq_template_asset_version"),
+    )
+    id: Mapped[uuid.UUID] = mapped_column(
+        PGUUID(as_uuid=True), primary_key=True, default=uuid4
+    )
+    name: Mapped[str] = mapped_column(
+        String(500), nullable=False, index=True,
+        comment="Nome usado em DashboardConfig.search_image"
+    )
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    sha256: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    ext: Mapped[str] = mapped_column(String(10), nullable=False)
+    size: Mapped[int] = mapped_column(Integer, nullable=False)
+    width: Mapped[Optional[int]] = mapped_column(Integer)
+    height: Mapped[Optional[int]] = mapped_column(Integer)
+    content: Mapped[bytes] = mapped_column(LargeBinary, nullable=False, deferred=True)
+    uploaded_by: Mapped[Optional[uuid.UUID]] = mapped_column(
+        PGUUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL")
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
@@ -8,6 +8,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
+from app.core import password_pool, registry
 
 log = logging.getLogger("automacao")
 
@@ -86,8 +87,10 @@ app.mount("/uploads", StaticFiles(directory="/home/ubuntu/projeto_final/backend/
 
 @app.on_event("startup")
 async def on_startup():
+    registry.discover()
     log.info("API iniciada com sucesso.")
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    password_pool.shutdown()
     log.info("API encerrada.")
@@ -41,6 +41,34 @@ def register_jobs():
         )
     except Exception as e:
         logging.warning(f"Não foi possível registrar 'dispatch_due_schedules': {e}")
+    try:
+        from app.core.config import settings
+        from app.services.artifacts import run_maintenance
+        sch.add_job(
+            run_maintenance,
+            "interval",
+            seconds=settings.ARTIFACT_GC_INTERVAL_SEC,
+            id="artifact_maintenance",
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
+    except Exception as e:
+        logging.warning(f"Não foi possível registrar 'artifact_maintenance': {e}")
+    try:
+        from app.core.config import settings
+        from app.services.run_archive import run_retention
+        sch.add_job(
+            run_retention,
+            "interval",
+            seconds=settings.RUN_RETENTION_INTERVAL_SEC,
+            id="run_retention",
+            replace_existing=True,
+            coalesce=True,
+            max_instances=1,
+        )
+    except Exception as e:
+        logging.warning(f"Não foi possível registrar 'run_retention': {e}")
 
 def add_automation_job(automation_id: str, days_of_week: str, hour: int, minute: int, callback):
     sch = get_scheduler()
@@ -0,0 +1,257 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+
+log = logging.getLogger("artifacts")
+
+# Chaves do resultado que apontam para arquivos gerados pela automação.
+ARTIFACT_KEYS = ("screenshot", "thumbnail", "artifact", "artifact_path")
+
+CHUNK_SIZE = 64 * 1024
+# Blobs sem referência só são apagados depois disso, para não correr com uma ingestão em andamento.
+_ORPHAN_GRACE_SEC = 3600
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(settings.ARTIFACTS_ROOT, sha256[:2], sha256[2:4], sha256)
+
+def artifact_url(run_id, name: str) -> str:
+    return f"/runs/{run_id}/artifacts/{name}"
+
+def put_file(path: str) -> Tuple[str, int]:
+    """Copia `path` para o store calculando o SHA-256 no caminho; conteúdo repetido não é regravado."""
+    os.makedirs(settings.ARTIFACTS_ROOT, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(prefix=".upload-", dir=settings.ARTIFACTS_ROOT)
+    try:
+        with os.fdopen(fd, "wb") as out, open(path, "rb") as src:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        sha = digest.hexdigest()
+        dest = blob_path(sha)
+        if os.path.exists(dest):
+            os.utime(dest)
+        else:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(tmp, dest)
+            tmp = None
+        return sha, size
+    finally:
+        if tmp and os.path.exists(tmp):
+            os.unlink(tmp)
+
+def _unique_name(db: Session, run_id, name: str) -> str:
+    base, ext = os.path.splitext(name)
+    candidate, n = name, 1
+    while db.query(models.RunArtifact.id).filter(
+        models.RunArtifact.run_id == run_id, models.RunArtifact.name == candidate
+    ).first():
+        n += 1
+        candidate = f"{base}-{n}{ext}"
+    return candidate
+
+def attach(db: Session, run_id, name: str, path: str, *, delete_source: bool = True) -> models.RunArtifact:
+    sha, size = put_file(path)
+    art = models.RunArtifact(
+        run_id=run_id,
+        name=_unique_name(db, run_id, name),
+        sha256=sha,
+        size=size,
+        content_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+    )
+    db.add(art)
+    db.commit()
+    db.refresh(art)
+    if delete_source:
+        try:
+            os.unlink(path)
+        except OSError:
+            log.warning("Não foi possível remover o arquivo original %s", path)
+    return art
+
+def describe(art: models.RunArtifact) -> Dict[str, Any]:
+    return {
+        "name": art.name,
+        "sha256": art.sha256,
+        "size": art.size,
+        "content_type": art.content_type,
+        "url": artifact_url(art.run_id, art.name),
+    }
+
+def ingest_result(db: Session, run_id, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Move os arquivos citados no resultado para o store e troca os caminhos pelo blob."""
+    if not isinstance(result, dict):
+        return result
+    described: List[Dict[str, Any]] = list(result.get("artifacts") or [])
+    for key in ARTIFACT_KEYS:
+        path = result.get(key)
+        if not isinstance(path, str) or not path or not os.path.isfile(path):
+            continue
+        if os.path.abspath(path).startswith(os.path.abspath(settings.ARTIFACTS_ROOT) + os.sep):
+            continue
+        try:
+            art = attach(db, run_id, f"{key}{os.path.splitext(path)[1]}", path)
+        except Exception:
+            db.rollback()
+            log.exception("Falha ao armazenar artefato %s do run %s", path, run_id)
+            continue
+        result[key] = blob_path(art.sha256)
+        described.append(describe(art))
+    if described:
+        result["artifacts"] = described
+    return result
+
+def link_cached(db: Session, source_run_id, run_id, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Em cache hit, reaproveita os blobs do run de origem criando só as linhas de metadados."""
+    if not source_run_id:
+        return result
+    source = db.query(models.RunArtifact).filter(models.RunArtifact.run_id == source_run_id).all()
+    described = []
+    for src in source:
+        if not os.path.exists(blob_path(src.sha256)):
+            continue
+        art = models.RunArtifact(
+            run_id=run_id, name=src.name, sha256=src.sha256, size=src.size, content_type=src.content_type,
+        )
+        db.add(art)
+        described.append(art)
+    if not described:
+        return result
+    db.commit()
+    return {**result, "artifacts": [describe(a) for a in described]}
+
+def list_for_run(db: Session, run_id) -> List[models.RunArtifact]:
+    return (
+        db.query(models.RunArtifact)
+        .filter(models.RunArtifact.run_id == run_id)
+        .order_by(models.RunArtifact.created_at, models.RunArtifact.name)
+        .all()
+    )
+
+def get_for_run(db: Session, run_id, name: str) -> Optional[models.RunArtifact]:
+    return (
+        db.query(models.RunArtifact)
+        .filter(models.RunArtifact.run_id == run_id, models.RunArtifact.name == name)
+        .first()
+    )
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Interpreta `Range: bytes=a-b` (um único intervalo). None = arquivo inteiro; ValueError = 416."""
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_s, _, end_s = spec.strip().partition("-")
+    if not start_s:
+        length = int(end_s)
+        if length <= 0:
+            raise ValueError("range inválido")
+        return max(0, size - length), size - 1
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size or end < start:
+        raise ValueError("range fora do arquivo")
+    return start, min(end, size - 1)
+
+def iter_file(path: str, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = None if end is None else end - start + 1
+        while remaining is None or remaining > 0:
+            chunk = f.read(CHUNK_SIZE if remaining is None else min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+
+# --- retenção / cota -------------------------------------------------------------------
+
+def _stored_bytes(db: Session) -> int:
+    sub = db.query(models.RunArtifact.sha256, func.max(models.RunArtifact.size).label("size")).group_by(
+        models.RunArtifact.sha256
+    ).subquery()
+    return int(db.query(func.coalesce(func.sum(sub.c.size), 0)).scalar() or 0)
+
+def _collect_orphans(db: Session) -> Tuple[int, int]:
+    root = settings.ARTIFACTS_ROOT
+    if not os.path.isdir(root):
+        return 0, 0
+    referenced = {sha for (sha,) in db.query(models.RunArtifact.sha256).distinct()}
+    cutoff = time.time() - _ORPHAN_GRACE_SEC
+    removed = freed = 0
+    for dirpath, _, files in os.walk(root):
+        for fname in files:
+            path = os.path.join(dirpath, fname)
+            if fname in referenced:
+                continue
+            try:
+                st = os.stat(path)
+                if st.st_mtime > cutoff:
+                    continue
+                os.unlink(path)
+                removed += 1
+                freed += st.st_size
+            except OSError:
+                continue
+    return removed, freed
+
+def enforce_policies(db: Session, *, retention_days: Optional[int] = None, quota_mb: Optional[int] = None) -> Dict[str, int]:
+    retention_days = settings.ARTIFACT_RETENTION_DAYS if retention_days is None else retention_days
+    quota_mb = settings.ARTIFACT_QUOTA_MB if quota_mb is None else quota_mb
+    summary = {"expired": 0, "evicted": 0, "blobs_removed": 0, "bytes_freed": 0}
+
+    if retention_days and retention_days > 0:
+        cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+        summary["expired"] = (
+            db.query(models.RunArtifact)
+            .filter(models.RunArtifact.created_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+
+    if quota_mb and quota_mb > 0:
+        quota = quota_mb * 1024 * 1024
+        total = _stored_bytes(db)
+        while total > quota:
+            oldest = (
+                db.query(models.RunArtifact)
+                .order_by(models.RunArtifact.created_at)
+                .limit(200)
+                .all()
+            )
+            if not oldest:
+                break
+            for art in oldest:
+                db.delete(art)
+                summary["evicted"] += 1
+            db.commit()
+            total = _stored_bytes(db)
+
+    summary["blobs_removed"], summary["bytes_freed"] = _collect_orphans(db)
+    return summary
+
+def run_maintenance() -> Dict[str, int]:
+    from app.db.database import SessionLocal
+    db = SessionLocal()
+    try:
+        summary = enforce_policies(db)
+        log.info("Manutenção de artefatos concluída: %s", summary)
+        return summary
+    finally:
+        db.close()
@@ -1,12 +1,13 @@
 from sqlalchemy.orm import Session
 from app.core.automation_loader import run_module
 from app.db import models
+from app.services import secret_cache
 
-def build_ctx(db: Session, automation: models.Automation):
+def build_ctx(db: Session, automation: models.Automation, user_id=None):
     return {
         "db": db,
         "logger": None,
-        "secrets": {},      
+        "secrets": secret_cache.secrets_for_run(db, automation, user_id),
     }
 
 def run_automation(db: Session, automation: models.Automation, payload: dict | None):
@@ -0,0 +1,25 @@
+import logging
+from app.services.queue import redis_conn
+
+log = logging.getLogger("cancellation")
+
+_TTL_SEC = 24 * 3600
+
+def _key(run_id) -> str:
+    return f"run:cancel:{run_id}"
+
+def request_cancel(run_id) -> None:
+    redis_conn.set(_key(run_id), "1", ex=_TTL_SEC)
+
+def is_cancelled(run_id) -> bool:
+    try:
+        return bool(redis_conn.exists(_key(run_id)))
+    except Exception:
+        log.exception("Falha ao consultar cancelamento do run %s", run_id)
+        return False
+
+def clear(run_id) -> None:
+    try:
+        redis_conn.delete(_key(run_id))
+    except Exception:
+        log.exception("Falha ao limpar cancelamento do run %s", run_id)
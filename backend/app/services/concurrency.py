@@ -0,0 +1,161 @@
+import logging
+import threading
+import time
+import uuid
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core import registry
+from app.core.config import settings
+from app.db import crud, models
+from app.services.queue import redis_conn
+
+log = logging.getLogger("concurrency")
+
+# Cada semáforo é um ZSET: membro = token do lease, score = instante (epoch) em que o lease expira.
+# Leases de workers que morreram expiram sozinhos, pois o heartbeat para de renovar o score.
+_ACQUIRE_LUA = """
+local now = tonumber(ARGV[1])
+local expires = tonumber(ARGV[2])
+local ttl = tonumber(ARGV[3])
+local token = ARGV[4]
+for i, key in ipairs(KEYS) do
+    redis.call('ZREMRANGEBYSCORE', key, '-inf', now)
+end
+for i, key in ipairs(KEYS) do
+    local limit = tonumber(ARGV[4 + i])
+    if not redis.call('ZSCORE', key, token) and redis.call('ZCARD', key) >= limit then
+        return 0
+    end
+end
+for i, key in ipairs(KEYS) do
+    redis.call('ZADD', key, expires, token)
+    redis.call('EXPIRE', key, ttl)
+end
+return 1
+"""
+
+_RENEW_LUA = """
+local expires = tonumber(ARGV[1])
+local ttl = tonumber(ARGV[2])
+local token = ARGV[3]
+local renewed = 0
+for i, key in ipairs(KEYS) do
+    if redis.call('ZSCORE', key, token) then
+        redis.call('ZADD', key, 'XX', expires, token)
+        redis.call('EXPIRE', key, ttl)
+        renewed = renewed + 1
+    end
+end
+return renewed
+"""
+
+_acquire_script = redis_conn.register_script(_ACQUIRE_LUA)
+_renew_script = redis_conn.register_script(_RENEW_LUA)
+
+
+def _automation_key(automation_id) -> str:
+    return f"semaphore:automation:{automation_id}"
+
+def _resource_key(resource: str) -> str:
+    return f"semaphore:resource:{resource}"
+
+def limits_for(automation: models.Automation) -> List[Tuple[str, int]]:
+    limits: List[Tuple[str, int]] = []
+    spec = registry.find(automation.module_path, automation.func_name)
+    resources = spec.resources if spec else {}
+    max_concurrent = getattr(automation, "max_concurrent", None) or resources.get("max_concurrent")
+    if max_concurrent and max_concurrent > 0:
+        limits.append((_automation_key(automation.id), int(max_concurrent)))
+    resource = (getattr(automation, "exclusive_resource", None) or resources.get("exclusive_resource") or "").strip()
+    if resource:
+        limits.append((_resource_key(resource), 1))
+    return limits
+
+
+class Lease:
+    def __init__(self, keys: List[str], token: str, lease_sec: int):
+        self.keys = keys
+        self.token = token
+        self.lease_sec = lease_sec
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _ttl(self) -> int:
+        return self.lease_sec * 2
+
+    def _heartbeat(self):
+        interval = max(1.0, self.lease_sec / 3)
+        while not self._stop.wait(interval):
+            try:
+                renewed = _renew_script(
+                    keys=self.keys,
+                    args=[time.time() + self.lease_sec, self._ttl(), self.token],
+                )
+                if int(renewed) < len(self.keys):
+                    log.warning("Lease %s perdido em %d de %d semáforos", self.token, len(self.keys) - int(renewed), len(self.keys))
+            except Exception:
+                log.exception("Falha no heartbeat do lease %s", self.token)
+
+    def start(self):
+        if not self.keys:
+            return
+        self._thread = threading.Thread(target=self._heartbeat, name=f"lease-{self.token}", daemon=True)
+        self._thread.start()
+
+    def release(self):
+        self._stop.set()
+        if not self.keys:
+            return
+        try:
+            pipe = redis_conn.pipeline()
+            for key in self.keys:
+                pipe.zrem(key, self.token)
+            pipe.execute()
+        except Exception:
+            log.exception("Falha ao liberar lease %s", self.token)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def try_acquire(automation: models.Automation, run_id=None) -> Optional[Lease]:
+    """Tenta ocupar todos os slots exigidos pela automação de uma vez.
+
+    Retorna um Lease (com heartbeat já iniciado) ou None se algum limite estiver cheio.
+    Automações sem limites recebem um Lease vazio.
+    """
+    return _acquire(limits_for(automation), str(run_id or uuid.uuid4()))
+
+def try_acquire_resource(resource: str, token=None) -> Optional[Lease]:
+    """Ocupa só um recurso exclusivo (ex.: o desktop), fora do contexto de uma automação."""
+    return _acquire([(_resource_key(resource), 1)], str(token or uuid.uuid4()))
+
+def _acquire(limits: List[Tuple[str, int]], token: str) -> Optional[Lease]:
+    lease_sec = max(5, settings.CONCURRENCY_LEASE_SEC)
+    if not limits:
+        return Lease([], token, lease_sec)
+    keys = [k for k, _ in limits]
+    now = time.time()
+    ok = _acquire_script(
+        keys=keys,
+        args=[now, now + lease_sec, lease_sec * 2, token, *[limit for _, limit in limits]],
+    )
+    if not int(ok):
+        return None
+    lease = Lease(keys, token, lease_sec)
+    lease.start()
+    return lease
+
+def can_dispatch(db: Session, automation_id) -> bool:
+    """Usado pelos schedulers para não empilhar runs de uma automação que já está no limite."""
+    auto = crud.get_automation_by_id(db, automation_id)
+    if not auto:
+        return True
+    max_concurrent = getattr(auto, "max_concurrent", None)
+    if not max_concurrent or max_concurrent <= 0:
+        return True
+    return crud.count_active_runs(db, auto.id) < max_concurrent
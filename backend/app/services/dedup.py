@@ -0,0 +1,86 @@
+import logging
+from typing import Any, Dict, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db import crud, models
+from app.services.queue import redis_conn
+from app.utils.hashing import payload_fingerprint
+
+log = logging.getLogger("dedup")
+
+PENDING_STATUSES = ("queued", "running")
+
+_RELEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_script = redis_conn.register_script(_RELEASE_LUA)
+
+
+def idempotency_key(automation_id, user_id, payload: Optional[Dict[str, Any]]) -> str:
+    # o usuário entra na chave: o run roda com os segredos de quem o criou
+    return f"dedup:run:{user_id or '-'}:{payload_fingerprint(automation_id, payload)}"
+
+def _pending_run(db: Session, run_id, user_id) -> Optional[models.Run]:
+    if not run_id:
+        return None
+    if isinstance(run_id, bytes):
+        run_id = run_id.decode("utf-8")
+    run = crud.get_run(db, run_id)
+    if not run or str(run.user_id or "") != str(user_id or ""):
+        return None
+    if (run.status or "").lower() in PENDING_STATUSES:
+        return run
+    return None
+
+def submit_run(
+    db: Session,
+    *,
+    automation_id,
+    user_id=None,
+    payload: Optional[Dict[str, Any]] = None,
+    window_sec: Optional[int] = None,
+) -> Tuple[models.Run, bool]:
+    """Cria um run 'queued' ou devolve o run pendente idêntico (mesmo usuário, automação e payload).
+
+    Retorna (run, created). Quando created=False o chamador não deve enfileirar nada:
+    a submissão foi anexada ao run existente.
+    """
+    payload = payload or {}
+    window = window_sec or settings.DEDUP_WINDOW_SEC
+    key = idempotency_key(automation_id, user_id, payload)
+    try:
+        current = redis_conn.get(key)
+        existing = _pending_run(db, current, user_id)
+        if existing:
+            log.info("Submissão duplicada anexada ao run pendente %s", existing.id)
+            return existing, False
+        if current is not None:
+            _release_script(keys=[key], args=[current])
+    except Exception:
+        log.exception("Falha ao consultar chave de idempotência; criando run sem deduplicação")
+        run = crud.create_run(db, automation_id=automation_id, user_id=user_id, status="queued", payload=payload)
+        return run, True
+
+    run = crud.create_run(db, automation_id=automation_id, user_id=user_id, status="queued", payload=payload)
+    try:
+        if redis_conn.set(key, str(run.id), nx=True, ex=window):
+            return run, True
+        winner = _pending_run(db, redis_conn.get(key), user_id)
+        if winner and winner.id != run.id:
+            crud.delete_run(db, run.id)
+            log.info("Submissão concorrente anexada ao run pendente %s", winner.id)
+            return winner, False
+        redis_conn.set(key, str(run.id), ex=window)
+    except Exception:
+        log.exception("Falha ao registrar chave de idempotência para run %s", run.id)
+    return run, True
+
+def release(automation_id, user_id, payload: Optional[Dict[str, Any]], run_id) -> None:
+    try:
+        _release_script(keys=[idempotency_key(automation_id, user_id, payload)], args=[str(run_id)])
+    except Exception:
+        log.exception("Falha ao liberar chave de idempotência do run %s", run_id)
@@ -0,0 +1,390 @@
+import logging
+import mimetypes
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from app.services.retry import RetryPolicy
+
+log = logging.getLogger("delivery")
+
+
+class DeliveryError(Exception):
+    def __init__(self, message: str, *, retryable: bool = False, retry_after: Optional[float] = None, status: Optional[int] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+        self.status = status
+
+
+class TokenBucket:
+    """Limita envios por segundo entre as threads do processo (`acquire` bloqueia até haver ficha)."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+# --- backends ---------------------------------------------------------------------------
+
+class DeliveryBackend:
+    name = "base"
+    # quantos envios simultâneos o backend aguenta
+    max_concurrency = 1
+    # recurso exclusivo (ver services.concurrency) que precisa estar livre para enviar
+    exclusive_resource: Optional[str] = None
+
+    def prepare(self, media_path: Optional[str], media_name: Optional[str] = None, media_type: Optional[str] = None) -> Any:
+        """Preparação feita uma vez por lote (ex.: upload da mídia); o retorno vai para `send`.
+
+        `media_name`/`media_type` descrevem o arquivo quando o caminho não diz (blob do store de artefatos).
+        """
+        return media_path
+
+    def send(self, recipient: str, message: Optional[str], media: Any = None) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class CloudAPIBackend(DeliveryBackend):
+    """WhatsApp Business Cloud API: a mídia sobe uma vez e cada destinatário recebe só o id."""
+
+    name = "cloud_api"
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        phone_number_id: Optional[str] = None,
+        token: Optional[str] = None,
+        timeout: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.phone_number_id = phone_number_id or settings.WHATSAPP_PHONE_NUMBER_ID
+        if not self.phone_number_id:
+            raise DeliveryError("WHATSAPP_PHONE_NUMBER_ID não configurado.")
+        self.max_concurrency = max(1, max_concurrency or settings.WHATSAPP_CONCURRENCY)
+        self.client = httpx.Client(
+            base_url=(base_url or settings.WHATSAPP_API_URL).rstrip("/"),
+            headers={"Authorization": f"Bearer {token or settings.WHATSAPP_TOKEN}"},
+            timeout=timeout or settings.WHATSAPP_TIMEOUT_SEC,
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+        )
+
+    def _request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        try:
+            resp = self.client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            raise DeliveryError(f"{type(e).__name__}: {e}", retryable=True)
+        if resp.status_code == 429 or resp.status_code >= 500:
+            retry_after = resp.headers.get("retry-after")
+            raise DeliveryError(
+                f"HTTP {resp.status_code}",
+                retryable=True,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+                status=resp.status_code,
+            )
+        try:
+            data = resp.json()
+        except ValueError:
+            data = {}
+        if resp.status_code >= 400:
+            detail = (data.get("error") or {}).get("message") if isinstance(data, dict) else None
+            raise DeliveryError(detail or f"HTTP {resp.status_code}", status=resp.status_code)
+        return data
+
+    def prepare(self, media_path: Optional[str], media_name: Optional[str] = None, media_type: Optional[str] = None) -> Optional[str]:
+        if not media_path:
+            return None
+        name = media_name or os.path.basename(media_path)
+        mime = media_type or mimetypes.guess_type(name)[0] or "image/png"
+        with open(media_path, "rb") as f:
+            data = self._request(
+                "POST",
+                f"/{self.phone_number_id}/media",
+                data={"messaging_product": "whatsapp", "type": mime},
+                files={"file": (name, f, mime)},
+            )
+        return data["id"]
+
+    def send(self, recipient: str, message: Optional[str], media: Any = None) -> Dict[str, Any]:
+        body: Dict[str, Any] = {"messaging_product": "whatsapp", "to": recipient}
+        if media:
+            body.update(type="image", image={"id": media, **({"caption": message} if message else {})})
+        else:
+            body.update(type="text", text={"body": message or ""})
+        data = self._request("POST", f"/{self.phone_number_id}/messages", json=body)
+        messages = data.get("messages") or [{}]
+        return {"message_id": messages[0].get("id")}
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class ClipboardBackend(DeliveryBackend):
+    """Envio antigo pelo WhatsApp Web + clipboard. Só funciona no host com desktop, um por vez."""
+
+    name = "clipboard"
+
+    def __init__(self):
+        self.exclusive_resource = settings.DELIVERY_DESKTOP_RESOURCE or None
+
+    def send(self, recipient: str, message: Optional[str], media: Any = None) -> Dict[str, Any]:
+        from modules.comercial.dashboard.whatsapp import send_whatsapp_via_clipboard
+        if not send_whatsapp_via_clipboard(recipient, media, caption=message, logger=log.info):
+            raise DeliveryError("Envio pelo WhatsApp Web falhou.")
+        return {}
+
+
+BACKENDS = {
+    CloudAPIBackend.name: CloudAPIBackend,
+    ClipboardBackend.name: ClipboardBackend,
+}
+
+
+def get_backend(name: Optional[str] = None, **options) -> DeliveryBackend:
+    name = (name or settings.DELIVERY_BACKEND or "").strip().lower()
+    if name not in BACKENDS:
+        raise DeliveryError(f"Backend de entrega desconhecido: {name!r}")
+    return BACKENDS[name](**options)
+
+
+# --- envio em lote -----------------------------------------------------------------------
+
+def normalize_recipient(value: Any) -> str:
+    return re.sub(r"\D", "", str(value or ""))
+
+
+def default_policy() -> RetryPolicy:
+    return RetryPolicy(max_attempts=max(1, settings.WHATSAPP_MAX_ATTEMPTS), backoff_sec=2.0, max_backoff_sec=60.0)
+
+
+def _with_retries(fn: Callable[[], Any], policy: RetryPolicy, sleep: Callable[[float], None] = time.sleep):
+    attempt = 1
+    while True:
+        try:
+            return fn(), attempt
+        except DeliveryError as e:
+            if not e.retryable or attempt >= policy.max_attempts:
+                e.attempts = attempt
+                raise
+            delay = e.retry_after if e.retry_after is not None else policy.delay_for(attempt)
+            sleep(min(delay, policy.max_backoff_sec))
+            attempt += 1
+
+
+def send_batch(
+    backend: DeliveryBackend,
+    recipients: List[str],
+    message: Optional[str] = None,
+    media_path: Optional[str] = None,
+    *,
+    media_name: Optional[str] = None,
+    media_type: Optional[str] = None,
+    rate_per_sec: Optional[float] = None,
+    policy: Optional[RetryPolicy] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> List[Dict[str, Any]]:
+    """Envia para todos os destinatários em paralelo, respeitando a taxa e refazendo falhas transitórias.
+
+    Retorna um item por destinatário: `{"recipient", "ok", "attempts", ...}`.
+    """
+    policy = policy or default_policy()
+    bucket = TokenBucket(settings.WHATSAPP_RATE_PER_SEC if rate_per_sec is None else rate_per_sec)
+    numbers = [n for n in dict.fromkeys(normalize_recipient(r) for r in recipients) if n]
+
+    try:
+        media, _ = _with_retries(lambda: backend.prepare(media_path, media_name, media_type), policy, sleep)
+    except DeliveryError as e:
+        log.error("Falha ao preparar a mídia %s: %s", media_path, e)
+        return [{"recipient": n, "ok": False, "attempts": 0, "error": f"Mídia: {e}"} for n in numbers]
+
+    def _one(number: str) -> Dict[str, Any]:
+        def _send():
+            bucket.acquire()
+            return backend.send(number, message, media)
+        try:
+            info, attempts = _with_retries(_send, policy, sleep)
+            return {"recipient": number, "ok": True, "attempts": attempts, **(info or {})}
+        except DeliveryError as e:
+            return {"recipient": number, "ok": False, "attempts": getattr(e, "attempts", 1), "error": str(e), "status": e.status}
+        except Exception as e:
+            log.exception("Erro inesperado ao enviar para %s", number)
+            return {"recipient": number, "ok": False, "attempts": 1, "error": f"{type(e).__name__}: {e}"}
+
+    workers = max(1, min(backend.max_concurrency, len(numbers) or 1))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="delivery") as pool:
+        return list(pool.map(_one, numbers))
+
+
+# --- fila ----------------------------------------------------------------------------------
+
+def delivery_groups(result: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Extrai os pedidos de entrega que a automação devolveu em `result["entrega"]`.
+
+    Aceita `{"destinatarios": [...], "mensagem": ...}` ou, para vários grupos,
+    `{"grupos": [{"nome": ..., "destinatarios": [...], "mensagem": ...}], "mensagem": ...}`.
+    """
+    if not isinstance(result, dict):
+        return []
+    entrega = result.get("entrega")
+    if not isinstance(entrega, dict):
+        return []
+    groups = entrega.get("grupos") or [entrega]
+    out = []
+    for g in groups:
+        if not isinstance(g, dict) or not g.get("destinatarios"):
+            continue
+        media_path = g.get("arquivo") or entrega.get("arquivo") or result.get("screenshot")
+        out.append({
+            "group_name": g.get("nome"),
+            "channel": entrega.get("canal") or "whatsapp",
+            "backend": g.get("canal_backend") or entrega.get("canal_backend"),
+            "recipients": list(g["destinatarios"]),
+            "message": g.get("mensagem", entrega.get("mensagem")),
+            "media_path": media_path,
+            **_media_info(media_path, result.get("artifacts")),
+            "sent_marker": entrega.get("registro_envio"),
+        })
+    return out
+
+
+def _media_info(media_path: Optional[str], described: Any) -> Dict[str, Optional[str]]:
+    """Nome e tipo da mídia. Arquivos já ingeridos viram blobs sem extensão (o nome do blob é o
+    SHA-256), então o nome e o content_type vêm do artefato correspondente em `result["artifacts"]`."""
+    if not isinstance(media_path, str) or not media_path:
+        return {"media_name": None, "media_type": None}
+    blob = os.path.basename(media_path)
+    for art in described if isinstance(described, list) else []:
+        if isinstance(art, dict) and art.get("sha256") == blob:
+            return {"media_name": art.get("name"), "media_type": art.get("content_type")}
+    return {"media_name": os.path.basename(media_path), "media_type": mimetypes.guess_type(media_path)[0]}
+
+
+def fan_out(db, run_id, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Cria uma entrega por grupo, põe cada uma na fila `deliveries` e resume isso no resultado do run."""
+    groups = delivery_groups(result)
+    if not groups:
+        return result
+    from app.db import crud
+    from app.services.queue import delivery_queue
+    summary = []
+    for group in groups:
+        row = crud.create_delivery(db, run_id, **group)
+        try:
+            job = delivery_queue.enqueue(
+                "app.services.delivery.process_delivery",
+                {"delivery_id": str(row.id)},
+                job_timeout=max(300, int(settings.WHATSAPP_TIMEOUT_SEC * 10)),
+            )
+            row.job_id = job.id
+        except Exception as e:
+            log.exception("Falha ao enfileirar a entrega %s do run %s", row.id, run_id)
+            row.status, row.error = "failed", f"Fila indisponível: {e}"
+        db.commit()
+        summary.append({"id": str(row.id), "grupo": row.group_name, "destinatarios": len(row.recipients), "status": row.status})
+    entrega = {k: v for k, v in result["entrega"].items() if k != "grupos"}
+    return {**result, "entrega": {**entrega, "status": "enfileirada", "entregas": summary}}
+
+
+def _defer(delivery_id: str, delay: float) -> None:
+    from app.services.queue import delivery_queue
+    delivery_queue.enqueue_in(
+        timedelta(seconds=delay), "app.services.delivery.process_delivery", {"delivery_id": delivery_id},
+    )
+
+
+def _record_sent(row) -> None:
+    """Só depois do envio a captura passa a contar como 'já recebida' na detecção de mudança."""
+    if not row.sent_marker:
+        return
+    from modules.common import phash
+    try:
+        phash.record_sent(row.sent_marker)
+    except Exception:
+        log.exception("Falha ao registrar a captura enviada pela entrega %s", row.id)
+
+
+def process_delivery(job_payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    from app.db import crud
+    from app.db.database import SessionLocal
+    from app.services import concurrency
+
+    delivery_id = job_payload.get("delivery_id")
+    db = SessionLocal()
+    try:
+        row = crud.get_delivery(db, delivery_id)
+        if row is None:
+            log.warning("Entrega %s não encontrada", delivery_id)
+            return None
+        if row.status not in ("queued", "sending"):
+            log.info("Entrega %s já processada (status %s)", delivery_id, row.status)
+            return None
+        try:
+            backend = get_backend(row.backend)
+        except DeliveryError as e:
+            row.status, row.error, row.finished_at = "failed", str(e), datetime.now(timezone.utc)
+            db.commit()
+            return None
+
+        # o envio pelo WhatsApp Web usa o desktop: espera a vez junto com as automações de GUI
+        lease = None
+        if backend.exclusive_resource:
+            lease = concurrency.try_acquire_resource(backend.exclusive_resource, f"delivery:{row.id}")
+            if lease is None:
+                backend.close()
+                _defer(str(row.id), settings.CONCURRENCY_DEFER_SEC)
+                log.info("Entrega %s aguardando o recurso %s", row.id, backend.exclusive_resource)
+                return None
+
+        row.status, row.started_at = "sending", datetime.now(timezone.utc)
+        row.attempts = (row.attempts or 0) + 1
+        db.commit()
+        try:
+            results = send_batch(
+                backend, row.recipients or [], row.message, row.media_path,
+                media_name=row.media_name, media_type=row.media_type,
+            )
+        finally:
+            backend.close()
+            if lease is not None:
+                lease.release()
+
+        sent = sum(1 for r in results if r["ok"])
+        row.results = results
+        row.status = "sent" if sent == len(results) else ("partial" if sent else "failed")
+        row.error = None if sent == len(results) else next((r.get("error") for r in results if not r["ok"]), None)
+        row.finished_at = datetime.now(timezone.utc)
+        db.commit()
+        log.info("Entrega %s do run %s: %d/%d enviadas", row.id, row.run_id, sent, len(results))
+        if row.status == "sent":
+            _record_sent(row)
+        return {"delivery_id": str(row.id), "run_id": str(row.run_id), "sent": sent, "failed": len(results) - sent}
+    finally:
+        db.close()
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import tempfile
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple
+
+CHUNK_SIZE = 64 * 1024
+
+# Assinaturas dos formatos aceitos; o content_type vem do cliente e não prova nada.
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+)
+
+EQUIVALENT_EXTENSIONS = {".jpeg": ".jpg"}
+
+# Sufixo da matriz já decodificada (BGR, como o matcher usa) gravada ao lado da imagem.
+DECODED_SUFFIX = ".npy"
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class NotAnImage(Exception):
+    pass
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    for magic, ext in _SIGNATURES:
+        if head.startswith(magic):
+            return ext
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+def save_stream(src: BinaryIO, dest_dir: Path, max_bytes: int) -> Dict[str, object]:
+    """Copia `src` em blocos para `dest_dir`, validando o tipo pelo conteúdo e o tamanho durante a cópia.
+
+    Bloqueante: chamar via threadpool. O arquivo só aparece com o nome final se tudo deu certo.
+    """
+    dest_dir.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".upload-", dir=str(dest_dir))
+    digest = hashlib.sha256()
+    size = 0
+    ext = None
+    try:
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                if ext is None:
+                    ext = sniff_image_type(chunk[:16])
+                    if ext is None:
+                        raise NotAnImage()
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge()
+                digest.update(chunk)
+                out.write(chunk)
+        if ext is None:
+            raise NotAnImage()
+        sha256 = digest.hexdigest()
+        final = dest_dir / f"{uuid.uuid4()}{ext}"
+        os.replace(tmp, final)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return {"path": final, "filename": final.name, "ext": ext, "size": size, "sha256": sha256}
+
+
+def decoded_path(image_path) -> str:
+    return f"{image_path}{DECODED_SUFFIX}"
+
+
+def image_dimensions(image_path) -> Tuple[int, int]:
+    """(largura, altura) lidas só do cabeçalho; o Pillow não decodifica os pixels em `open`."""
+    from PIL import Image, UnidentifiedImageError
+    try:
+        with Image.open(image_path) as im:
+            return im.size
+    except Image.DecompressionBombError:
+        raise ImageTooLarge()
+    except (UnidentifiedImageError, OSError):
+        raise NotAnImage()
+
+
+def precompute_template(image_path, max_pixels: Optional[int] = None) -> Optional[str]:
+    """Decodifica a imagem uma vez e grava a matriz ao lado; as automações carregam com np.load.
+
+    Com `max_pixels`, imagens maiores são recusadas pelo cabeçalho antes de qualquer decodificação.
+    Sem OpenCV instalado (ex.: API sem dependências de desktop) apenas não gera o cache.
+    """
+    if max_pixels:
+        width, height = image_dimensions(image_path)
+        if width * height > max_pixels:
+            raise ImageTooLarge()
+    try:
+        import cv2
+        import numpy as np
+    except ImportError:
+        return None
+    img = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+    if img is None:
+        raise NotAnImage()
+    out = decoded_path(image_path)
+    with open(out + ".tmp", "wb") as fh:
+        np.save(fh, img, allow_pickle=False)
+    os.replace(out + ".tmp", out)
+    return out
+
+
+def remove(image_path) -> None:
+    for p in (str(image_path), decoded_path(image_path)):
+        try:
+            os.unlink(p)
+        except OSError:
+            pass
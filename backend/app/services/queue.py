@@ -4,3 +4,5 @@ from app.core.config import settings
 
 redis_conn = redis.from_url(settings.REDIS_URL)
 queue = rq.Queue("runs", connection=redis_conn)
+# Entregas (WhatsApp etc.) rodam em workers próprios, fora do worker que segura o desktop.
+delivery_queue = rq.Queue("deliveries", connection=redis_conn)
@@ -0,0 +1,62 @@
+import logging
+import math
+import time
+from typing import Iterable, Tuple
+
+from app.services.queue import redis_conn
+
+log = logging.getLogger("rate_limit")
+
+# Token bucket por chave num HASH {tokens, ts}. Todas as chaves são verificadas antes de
+# consumir: se alguma estiver vazia, nenhuma é debitada. Retorna 0 (negado) ou 1 e, no
+# segundo valor, os segundos (x1000) até haver ficha na chave mais vazia.
+_TAKE_LUA = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local ttl = tonumber(ARGV[4])
+local levels = {}
+local wait = 0
+for i, key in ipairs(KEYS) do
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        wait = math.max(wait, (1 - tokens) / rate)
+    end
+end
+if wait > 0 then
+    return {0, math.ceil(wait * 1000)}
+end
+for i, key in ipairs(KEYS) do
+    redis.call('HSET', key, 'tokens', levels[i] - 1, 'ts', now)
+    redis.call('EXPIRE', key, ttl)
+end
+return {1, 0}
+"""
+
+_take_script = redis_conn.register_script(_TAKE_LUA)
+
+
+def take(keys: Iterable[str], rate_per_sec: float, burst: int, conn=None) -> Tuple[bool, int]:
+    """Consome uma ficha de cada chave. Retorna (permitido, segundos para tentar de novo).
+
+    Se o Redis falhar, libera (o limite é proteção, não autenticação).
+    """
+    keys = list(keys)
+    if not keys or rate_per_sec <= 0:
+        return True, 0
+    ttl = int(math.ceil(burst / rate_per_sec)) + 60
+    try:
+        script = _take_script if conn is None else conn.register_script(_TAKE_LUA)
+        allowed, wait_ms = script(keys=keys, args=[time.time(), rate_per_sec, burst, ttl])
+    except Exception:
+        log.exception("Falha ao consultar o rate limit; liberando a requisição")
+        return True, 0
+    return bool(int(allowed)), int(math.ceil(int(wait_ms) / 1000))
+
+
+def login_keys(ip: str, email: str) -> list:
+    return [f"ratelimit:login:ip:{ip}", f"ratelimit:login:email:{email.lower()}"]
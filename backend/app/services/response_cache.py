@@ -0,0 +1,84 @@
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+from app.core.config import settings
+
+log = logging.getLogger("response_cache")
+
+# Respostas de listagens que mudam pouco (dashboards, setores), já serializadas e guardadas no
+# Redis sob a versão atual do namespace. Quem altera os dados chama `bump` (via crud); a versão
+# nova muda o ETag e a chave, e as entradas antigas só esperam o TTL vencer. Sem Redis, as rotas
+# respondem normalmente, sem cache.
+
+_PREFIX = "respcache"
+
+
+def _conn(conn=None):
+    if conn is not None:
+        return conn
+    from app.services.queue import redis_conn
+    return redis_conn
+
+
+def version(namespace: str, conn=None) -> Optional[int]:
+    try:
+        raw = _conn(conn).get(f"{_PREFIX}:ver:{namespace}")
+    except Exception:
+        log.warning("Redis indisponível; cache de '%s' ignorado", namespace)
+        return None
+    return int(raw or 0)
+
+
+def bump(namespace: str, conn=None) -> None:
+    try:
+        _conn(conn).incr(f"{_PREFIX}:ver:{namespace}")
+    except Exception:
+        # sem o bump, quem estiver em cache vê o dado antigo até o TTL
+        log.exception("Falha ao invalidar o cache de '%s'", namespace)
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def cached_json(
+    request: Request,
+    namespace: str,
+    build: Callable[[], Any],
+    *,
+    variant: str = "",
+    conn=None,
+) -> Response:
+    """JSON de `build()` com ETag; responde 304 se o cliente já tem a versão atual."""
+    ver = version(namespace, conn)
+    if ver is None:
+        return Response(json.dumps(jsonable_encoder(build())).encode(), media_type="application/json")
+
+    digest = hashlib.sha1(variant.encode()).hexdigest()[:12]
+    etag = f'W/"{namespace}.{ver}.{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    key = f"{_PREFIX}:{namespace}:{ver}:{digest}"
+    body = None
+    try:
+        body = _conn(conn).get(key)
+    except Exception:
+        log.warning("Falha ao ler %s do cache", key)
+    if body is None:
+        body = json.dumps(jsonable_encoder(build())).encode()
+        try:
+            _conn(conn).set(key, body, ex=settings.RESPONSE_CACHE_TTL_SEC)
+        except Exception:
+            log.warning("Falha ao gravar %s no cache", key)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,80 @@
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+from app.db import models
+from app.services.queue import redis_conn
+from app.utils.hashing import payload_fingerprint
+
+log = logging.getLogger("result_cache")
+
+# Chaves do resultado que apontam para arquivos gerados; se o arquivo sumiu o cache não vale mais.
+_ARTIFACT_KEYS = ("screenshot", "thumbnail", "artifact", "artifact_path")
+
+
+def is_enabled(automation: models.Automation) -> bool:
+    ttl = getattr(automation, "cache_ttl_sec", None)
+    return bool(ttl and ttl > 0)
+
+def cache_key(automation: models.Automation, payload: Optional[Dict[str, Any]], scope: Optional[str] = None) -> str:
+    """`scope` separa resultados produzidos com segredos de um usuário (ver secret_cache.cache_scope)."""
+    merged = {**(getattr(automation, "default_payload", None) or {}), **(payload or {})}
+    fp = payload_fingerprint(automation.id, merged, getattr(automation, "cache_key_fields", None))
+    if scope:
+        return f"result-cache:{automation.id}:{scope}:{fp}"
+    return f"result-cache:{automation.id}:{fp}"
+
+def _artifacts_present(result: Dict[str, Any]) -> bool:
+    for k in _ARTIFACT_KEYS:
+        path = result.get(k)
+        if isinstance(path, str) and path and not os.path.exists(path):
+            return False
+    return True
+
+def lookup(automation: models.Automation, payload: Optional[Dict[str, Any]], scope: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Retorna o resultado em cache (já marcado como cache hit) ou None."""
+    if not is_enabled(automation):
+        return None
+    try:
+        raw = redis_conn.get(cache_key(automation, payload, scope))
+    except Exception:
+        log.exception("Falha ao consultar cache de resultado da automação %s", automation.id)
+        return None
+    if not raw:
+        return None
+    try:
+        entry = json.loads(raw)
+    except ValueError:
+        return None
+    result = entry.get("result") or {}
+    if not _artifacts_present(result):
+        log.info("Cache da automação %s ignorado: artefato não existe mais", automation.id)
+        return None
+    return {
+        **result,
+        "cache_hit": True,
+        "cached_from_run": entry.get("run_id"),
+        "cached_at": entry.get("cached_at"),
+    }
+
+def store(
+    automation: models.Automation,
+    payload: Optional[Dict[str, Any]],
+    run_id,
+    result: Optional[Dict[str, Any]],
+    scope: Optional[str] = None,
+) -> None:
+    if not is_enabled(automation) or not isinstance(result, dict):
+        return
+    if not result.get("ok", True) or result.get("cache_hit"):
+        return
+    entry = {
+        "run_id": str(run_id) if run_id else None,
+        "cached_at": datetime.now(timezone.utc).isoformat(),
+        "result": result,
+    }
+    try:
+        redis_conn.set(cache_key(automation, payload, scope), json.dumps(entry, default=str), ex=int(automation.cache_ttl_sec))
+    except Exception:
+        log.exception("Falha ao gravar cache de resultado da automação %s", automation.id)
@@ -0,0 +1,141 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+
+log = logging.getLogger("result_store")
+
+# Resultados acima de RESULT_INLINE_MAX_KB não vão inteiros para runs.result (JSONB): o JSON
+# completo é gravado comprimido em RESULT_BLOB_ROOT, endereçado pelo SHA-256, e a linha fica
+# com os campos pequenos, o final dos textos grandes (stdout/stderr/traceback) e a referência
+# em `_external`. `load` devolve o resultado completo.
+
+EXTERNAL_KEY = "_external"
+# campos mantidos quando nem a versão cortada cabe no limite (ex.: milhares de chaves pequenas)
+SUMMARY_KEYS = ("ok", "error_code", "error_type", "retryable", "exit_code", "cancelled")
+# blobs recém-gravados podem ainda não ter a linha do run commitada
+_ORPHAN_GRACE_SEC = 3600
+
+
+def blob_path(sha256: str) -> str:
+    return os.path.join(settings.RESULT_BLOB_ROOT, sha256[:2], f"{sha256}.json.gz")
+
+
+def _dumps(value: Any) -> bytes:
+    return json.dumps(value, default=str, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _put(data: bytes) -> Dict[str, Any]:
+    sha256 = hashlib.sha256(data).hexdigest()
+    path = blob_path(sha256)
+    if os.path.exists(path):
+        # blob reaproveitado por outro run: renova o mtime para a coleta de órfãos não levá-lo
+        # antes de a nova linha ser gravada
+        os.utime(path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".result-", dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                out.write(gzip.compress(data, compresslevel=6))
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    return {"sha256": sha256, "size": len(data), "compressed_size": os.path.getsize(path)}
+
+
+def compact(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Versão do resultado para gravar na linha do run; o original fica intacto."""
+    if not isinstance(result, dict) or EXTERNAL_KEY in result:
+        return result
+    limit = settings.RESULT_INLINE_MAX_KB * 1024
+    if limit <= 0:
+        return result
+    data = _dumps(result)
+    if len(data) <= limit:
+        return result
+    try:
+        ref = _put(data)
+    except OSError:
+        # sem onde gravar, o resultado vai inteiro como antes
+        log.exception("Falha ao externalizar resultado de %d bytes", len(data))
+        return result
+
+    preview = max(0, settings.RESULT_PREVIEW_CHARS)
+    # orçamento por campo: os maiores campos é que serão cortados
+    field_budget = max(256, limit // max(1, len(result)))
+    out: Dict[str, Any] = {}
+    truncated = []
+    for key, value in result.items():
+        if len(_dumps(value)) <= field_budget:
+            out[key] = value
+        elif isinstance(value, str):
+            out[key] = value[-preview:] if preview else ""
+            truncated.append(key)
+        else:
+            truncated.append(key)
+    out[EXTERNAL_KEY] = {**ref, "truncated": truncated}
+    if len(_dumps(out)) > limit:
+        # muitos campos pequenos (nem a lista dos cortados cabe): fica só o resumo; "*" = todo o resto
+        out = {key: result[key] for key in SUMMARY_KEYS if key in result}
+        out[EXTERNAL_KEY] = {**ref, "truncated": "*"}
+    log.info("Resultado externalizado: %d bytes -> %s (campos %s)", ref["size"], ref["sha256"][:12], truncated)
+    return out
+
+
+def is_external(result: Any) -> bool:
+    return isinstance(result, dict) and isinstance(result.get(EXTERNAL_KEY), dict)
+
+
+def load(result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Resultado completo: lê o blob se a linha tiver só a versão compacta."""
+    if not is_external(result):
+        return result
+    ref = result[EXTERNAL_KEY]
+    try:
+        with gzip.open(blob_path(ref["sha256"]), "rb") as fh:
+            return json.loads(fh.read())
+    except (OSError, ValueError):
+        log.error("Blob de resultado %s indisponível; devolvendo a versão compacta", ref.get("sha256"))
+        return result
+
+
+def collect_orphans(db: Session) -> Tuple[int, int]:
+    """Apaga blobs que nenhum run referencia mais (run apagado ou arquivado). Retorna (removidos, bytes)."""
+    root = settings.RESULT_BLOB_ROOT
+    if not os.path.isdir(root):
+        return 0, 0
+    sha = models.Run.result[(EXTERNAL_KEY, "sha256")].as_string()
+    referenced = {value for (value,) in db.query(sha).filter(sha.isnot(None)).distinct()}
+    cutoff = time.time() - _ORPHAN_GRACE_SEC
+    removed = freed = 0
+    for dirpath, _, files in os.walk(root):
+        for fname in files:
+            if not fname.endswith(".json.gz") or fname[: -len(".json.gz")] in referenced:
+                continue
+            path = os.path.join(dirpath, fname)
+            try:
+                st = os.stat(path)
+                if st.st_mtime > cutoff:
+                    continue
+                os.unlink(path)
+                removed += 1
+                freed += st.st_size
+            except OSError:
+                continue
+    if removed:
+        log.info("Blobs de resultado órfãos removidos: %d (%d bytes)", removed, freed)
+    return removed, freed
@@ -0,0 +1,61 @@
+import random
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+from app.db import models
+
+# tentativas quando a política não informa max_attempts (vale também para a API)
+DEFAULT_MAX_ATTEMPTS = 3
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS
+    backoff_sec: float = 30.0
+    backoff_factor: float = 2.0
+    max_backoff_sec: float = 900.0
+    jitter: float = 0.2
+    retry_on: Tuple[str, ...] = field(default_factory=tuple)
+    retry_codes: Tuple[str, ...] = field(default_factory=tuple)
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> Optional["RetryPolicy"]:
+        if not isinstance(data, dict) or not data:
+            return None
+        return cls(
+            max_attempts=max(1, int(data.get("max_attempts", DEFAULT_MAX_ATTEMPTS))),
+            backoff_sec=max(0.0, float(data.get("backoff_sec", 30.0))),
+            backoff_factor=max(1.0, float(data.get("backoff_factor", 2.0))),
+            max_backoff_sec=max(0.0, float(data.get("max_backoff_sec", 900.0))),
+            jitter=min(1.0, max(0.0, float(data.get("jitter", 0.2)))),
+            retry_on=tuple(str(x) for x in (data.get("retry_on") or ())),
+            retry_codes=tuple(str(x) for x in (data.get("retry_codes") or ())),
+        )
+
+    @classmethod
+    def for_automation(cls, automation: models.Automation) -> Optional["RetryPolicy"]:
+        return cls.from_dict(getattr(automation, "retry_policy", None))
+
+    def is_retryable(self, result: Optional[Dict[str, Any]]) -> bool:
+        """Classifica a falha: a automação pode marcar `retryable`, ou a política lista o tipo/código."""
+        if not isinstance(result, dict) or result.get("ok", False):
+            return False
+        if result.get("cancelled"):
+            return False
+        if result.get("retryable") is True:
+            return True
+        if result.get("retryable") is False:
+            return False
+        error_type = result.get("error_type")
+        if error_type and error_type in self.retry_on:
+            return True
+        error_code = result.get("error_code")
+        return bool(error_code and error_code in self.retry_codes)
+
+    def should_retry(self, attempt: int, result: Optional[Dict[str, Any]]) -> bool:
+        return attempt < self.max_attempts and self.is_retryable(result)
+
+    def delay_for(self, attempt: int) -> float:
+        """Espera antes da tentativa `attempt + 1` (backoff exponencial com jitter)."""
+        delay = min(self.max_backoff_sec, self.backoff_sec * (self.backoff_factor ** max(0, attempt - 1)))
+        if self.jitter:
+            delay *= 1 + random.uniform(-self.jitter, self.jitter)
+        return max(0.0, delay)
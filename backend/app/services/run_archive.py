@@ -0,0 +1,244 @@
+"""Retenção do histórico de runs.
+
+`runs` é particionada por mês (010_runs_partitioning.sql). O job de retenção garante as
+partições dos próximos meses (e tira da partição default os runs de meses que ficaram sem
+partição) e, para cada mês mais antigo que RUN_RETENTION_MONTHS:
+
+1. exporta a partição para RUN_ARCHIVE_ROOT/runs-AAAA-MM.jsonl.gz (um run por linha);
+2. grava o resumo de cada run em runs_archive_index (listagem e localização do arquivo);
+3. apaga artefatos/entregas desses runs e descarta a partição (DETACH + DROP).
+
+O arquivo leva o resultado completo (sem a referência ao blob de result_store), e o mesmo job
+remove os blobs de resultado que nenhum run em `runs` referencia mais.
+
+A leitura de um run arquivado abre o arquivo do mês indicado no índice.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+import uuid
+from datetime import date, datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import models
+from app.services import result_store
+
+log = logging.getLogger("run_archive")
+
+_PARTITION_RE = re.compile(r"^runs_p(\d{4})(\d{2})$")
+_FETCH_SIZE = 1000
+# chave do pg_advisory_lock do job de retenção ("runs" em ASCII)
+_RETENTION_LOCK_KEY = 0x72756E73
+
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    index = month.year * 12 + month.month - 1 + n
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"runs_p{month:%Y%m}"
+
+
+def archive_path(month: date, root: Optional[str] = None) -> str:
+    return os.path.join(root or settings.RUN_ARCHIVE_ROOT, f"runs-{month:%Y-%m}.jsonl.gz")
+
+
+def write_archive(rows: Iterable[Dict[str, Any]], path: str) -> int:
+    """Grava os runs como JSONL comprimido, de forma atômica. Retorna quantos foram gravados."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".runs-", dir=os.path.dirname(path))
+    count = 0
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as gz:
+            for row in rows:
+                gz.write(json.dumps(row, default=str, ensure_ascii=False).encode("utf-8"))
+                gz.write(b"\n")
+                count += 1
+            gz.flush()
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return count
+
+
+def read_archived(path: str, run_id) -> Optional[Dict[str, Any]]:
+    needle = str(run_id)
+    marker = f'"id": "{needle}"'.encode()
+    try:
+        with gzip.open(path, "rb") as gz:
+            for line in gz:
+                # evita decodificar JSON linha a linha; só confirma quando o id aparece
+                if marker in line:
+                    record = json.loads(line)
+                    if record.get("id") == needle:
+                        return record
+    except FileNotFoundError:
+        log.error("Arquivo de histórico ausente: %s", path)
+    return None
+
+
+def _default_months(db: Session) -> List[date]:
+    """Meses com runs caídos na partição default (sem partição própria quando foram criados)."""
+    if db.execute(text("SELECT to_regclass('runs_default')")).scalar() is None:
+        return []
+    rows = db.execute(text(
+        "SELECT DISTINCT date_trunc('month', created_at)::date FROM runs_default"
+    )).scalars()
+    return [date(m.year, m.month, 1) for m in rows]
+
+
+def ensure_partitions(db: Session, ahead: Optional[int] = None, today: Optional[datetime] = None) -> List[str]:
+    """Cria as partições dos próximos meses e as dos meses presentes na default.
+
+    ensure_runs_partition (013) move as linhas do mês da default para a partição nova, e a partir
+    daí elas seguem a retenção normal.
+    """
+    ahead = settings.RUN_PARTITIONS_AHEAD if ahead is None else ahead
+    current = month_start(today or datetime.now(timezone.utc))
+    months = {add_months(current, i) for i in range(ahead + 1)} | set(_default_months(db))
+    names = [
+        db.execute(text("SELECT ensure_runs_partition(:m)"), {"m": month}).scalar()
+        for month in sorted(months)
+    ]
+    db.commit()
+    return names
+
+
+def _partitions(db: Session) -> List[date]:
+    rows = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = 'runs'"
+    )).scalars()
+    months = []
+    for name in rows:
+        m = _PARTITION_RE.match(name)
+        if m:
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+def _stream_partition(db: Session, name: str):
+    result = db.execute(
+        text(f'SELECT * FROM "{name}" ORDER BY created_at, id').execution_options(yield_per=_FETCH_SIZE)
+    )
+    for row in result.mappings():
+        record = {k: (str(v) if isinstance(v, uuid.UUID) else v) for k, v in row.items()}
+        # o arquivo guarda o resultado inteiro: o blob externo deixa de ser referenciado e é coletado
+        record["result"] = result_store.load(record.get("result"))
+        yield record
+
+
+def archive_partition(db: Session, month: date, root: Optional[str] = None) -> int:
+    name = partition_name(month)
+    path = archive_path(month, root)
+    # o arquivo vem primeiro: se algo falhar depois, a partição continua no banco e o
+    # próximo ciclo regrava o mesmo arquivo
+    count = write_archive(_stream_partition(db, name), path)
+    db.execute(
+        text(
+            "INSERT INTO runs_archive_index "
+            "(id, automation_id, user_id, status, created_at, started_at, finished_at, archive_file) "
+            f'SELECT id, automation_id, user_id, status, created_at, started_at, finished_at, :path FROM "{name}" '
+            "ON CONFLICT (id) DO NOTHING"
+        ),
+        {"path": path},
+    )
+    db.execute(text(f'DELETE FROM run_artifacts WHERE run_id IN (SELECT id FROM "{name}")'))
+    db.execute(text(f'DELETE FROM deliveries WHERE run_id IN (SELECT id FROM "{name}")'))
+    db.execute(text(f'ALTER TABLE runs DETACH PARTITION "{name}"'))
+    db.execute(text(f'DROP TABLE "{name}"'))
+    db.commit()
+    log.info("Partição %s arquivada em %s (%d runs)", name, path, count)
+    return count
+
+
+def retention_cutoff(keep_months: Optional[int] = None, today: Optional[datetime] = None) -> Optional[datetime]:
+    """Início do mês mais antigo que continua em `runs`; None quando a retenção está desligada."""
+    keep_months = settings.RUN_RETENTION_MONTHS if keep_months is None else keep_months
+    if keep_months <= 0:
+        return None
+    month = add_months(month_start(today or datetime.now(timezone.utc)), -keep_months)
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+
+def enforce_retention(db: Session, keep_months: Optional[int] = None, today: Optional[datetime] = None) -> Dict[str, Any]:
+    now = today or datetime.now(timezone.utc)
+    summary: Dict[str, Any] = {"partitions_created": ensure_partitions(db, today=now), "archived": {}}
+    cutoff = retention_cutoff(keep_months, now)
+    if cutoff is not None:
+        for month in _partitions(db):
+            if month >= cutoff.date():
+                break
+            summary["archived"][f"{month:%Y-%m}"] = archive_partition(db, month)
+    # blobs de resultado de runs arquivados ou apagados
+    summary["result_blobs_removed"], _ = result_store.collect_orphans(db)
+    return summary
+
+
+def run_retention() -> Dict[str, Any]:
+    """Entrada do job. Roda no scheduler da API e no scheduler_process; o advisory lock garante
+    um ciclo por vez (dois ao mesmo tempo arquivariam e descartariam a mesma partição)."""
+    from app.db.database import SessionLocal, engine
+    with engine.connect() as conn:
+        # lock de sessão: fica na conexão, que a Session abaixo reutiliza entre os commits
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _RETENTION_LOCK_KEY}).scalar():
+            conn.rollback()
+            log.info("Retenção de runs já em andamento em outro processo; ciclo ignorado")
+            return {"skipped": True}
+        conn.commit()
+        db = SessionLocal(bind=conn)
+        try:
+            summary = enforce_retention(db)
+            log.info("Retenção de runs concluída: %s", summary)
+            return summary
+        finally:
+            db.close()
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _RETENTION_LOCK_KEY})
+            conn.commit()
+
+
+def get_archived_run(db: Session, run_id, full: bool = True) -> Optional[Dict[str, Any]]:
+    entry = db.get(models.RunArchiveEntry, uuid.UUID(str(run_id)))
+    if entry is None:
+        return None
+    record = read_archived(entry.archive_file, entry.id)
+    if record is not None:
+        result = record.get("result")
+        # mesmo formato de GET /runs/{id}: resultado completo e a referência do blob, se houver
+        record["result_external"] = result.get(result_store.EXTERNAL_KEY) if isinstance(result, dict) else None
+        if full:
+            record["result"] = result_store.load(result)
+        record["archived"] = True
+    return record
+
+
+def describe_entry(entry: models.RunArchiveEntry) -> Dict[str, Any]:
+    return {
+        "id": entry.id,
+        "automation_id": entry.automation_id,
+        "user_id": entry.user_id,
+        "status": entry.status,
+        "created_at": entry.created_at,
+        "started_at": entry.started_at,
+        "finished_at": entry.finished_at,
+        "archived": True,
+    }
@@ -1,10 +1,12 @@
-from importlib import import_module
 from typing import Any, Dict, Optional
 from uuid import UUID
-import asyncio
 import traceback
 from sqlalchemy.orm import Session
 from app.db import crud, models
+from app.core.automation_loader import call_automation
+from app.core.config import settings
+from app.core.supervisor import run_supervised
+from app.services import artifacts, cancellation, delivery, result_cache, secret_cache, template_assets
 from app.utils.workspace import user_workspace
 
 def _safe_payload(base: Optional[Dict[str, Any]]) -> Dict[str, Any]:
@@ -14,9 +16,13 @@ def _format_error(e: Exception) -> Dict[str, Any]:
     return {
         "ok": False,
         "error": f"{type(e).__name__}: {e}",
+        "error_type": type(e).__name__,
         "traceback": traceback.format_exc(),
     }
 
+def _call_inline(automation: models.Automation, data: Dict[str, Any]):
+    return call_automation(automation.module_path, automation.func_name, data)
+
 def execute_run(
     db: Session,
     run_id: UUID,
@@ -30,46 +36,53 @@ def execute_run(
         default_data = _safe_payload(getattr(automation, "default_payload", None))
         request_data = _safe_payload(payload)
         data = {**default_data, **request_data}
+        scope = secret_cache.cache_scope(db, automation, user_id)
+        cached = result_cache.lookup(automation, data, scope)
+        if cached is not None:
+            cached = artifacts.link_cached(db, cached.get("cached_from_run"), run_id, cached)
+            crud.set_run_status_final(db, run_id, "success", cached)
+            return True
         if ws:
             data["_workspace"] = ws
         if user_id:
             data["_user_id"] = str(user_id)
         if getattr(automation, "id", None):
             data["_automation_id"] = str(automation.id)
-        try:
-            mod = import_module(automation.module_path)
-        except Exception as e:
-            crud.set_run_status_final(db, run_id, "failed", _format_error(e))
-            return False
-        if not hasattr(mod, automation.func_name):
-            crud.set_run_status_final(
-                db,
-                run_id,
-                "failed",
-                {"ok": False, "error": f"Função '{automation.func_name}' não encontrada no módulo '{automation.module_path}'"},
+        data["_secrets"] = secret_cache.secrets_for_run(db, automation, user_id)
+        data["_templates"] = template_assets.templates_for_run(db)
+        if (settings.RUN_ISOLATION or "").lower() == "inline":
+            ret = _call_inline(automation, data)
+        else:
+            outcome = run_supervised(
+                automation.module_path,
+                automation.func_name,
+                data,
+                timeout_sec=getattr(automation, "timeout_sec", None) or settings.RUN_TIMEOUT_SEC,
+                cpu_limit_sec=settings.RUN_CPU_LIMIT_SEC or None,
+                memory_limit_mb=settings.RUN_MEMORY_LIMIT_MB or None,
+                cancel_check=lambda: cancellation.is_cancelled(run_id),
             )
-            return False
-        fn = getattr(mod, automation.func_name)
-        try:
-            if asyncio.iscoroutinefunction(fn):
-                ret = asyncio.run(fn(data))
-            else:
-                ret = fn(data)
-        except TypeError as e:
-            if "positional arguments but" in str(e) or "takes 0 positional arguments" in str(e):
-                if asyncio.iscoroutinefunction(fn):
-                    ret = asyncio.run(fn())
-                else:
-                    ret = fn()
-            else:
-                raise
+            if outcome.cancelled:
+                crud.set_run_status_final(db, run_id, "cancelled", outcome.error_result())
+                cancellation.clear(run_id)
+                return False
+            if not outcome.ok:
+                crud.set_run_status_final(db, run_id, "failed", outcome.error_result())
+                return False
+            ret = outcome.value
         if ret is None:
             result = {"ok": True}
         elif isinstance(ret, dict):
             result = ret
         else:
             result = {"ok": True, "data": ret}
+        result = artifacts.ingest_result(db, run_id, result)
+        if not result.get("ok", True):
+            crud.set_run_status_final(db, run_id, "failed", result)
+            return False
+        result = delivery.fan_out(db, run_id, result)
         crud.set_run_status_final(db, run_id, "success", result)
+        result_cache.store(automation, data, run_id, result, scope)
         return True
     except Exception as e:
         crud.set_run_status_final(db, run_id, "failed", _format_error(e))
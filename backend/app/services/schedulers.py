@@ -8,6 +8,8 @@ from sqlalchemy.exc import OperationalError
 from app.db.database import SessionLocal
 from app.db import models
 from app.core.config import settings
+from app.services.concurrency import can_dispatch
+from app.services.dedup import submit_run
 
 try:
     from croniter import croniter
@@ -95,6 +97,7 @@ def dispatch_due_schedules() -> dict:
     processed = 0
     created_runs = 0
     skipped = 0
+    skipped_busy = 0
     now = _utcnow()
     with session_scope() as db:
         try:
@@ -111,21 +114,31 @@ def dispatch_due_schedules() -> dict:
             try:
                 user_id = sch.owner_id if getattr(sch, "owner_type", "") == "user" else None
                 run = None
-                try:
-                    run = __create_run_and_enqueue(db, sch, user_id)
-                except Exception as e:
-                    logger.exception("Falha ao criar/enfileirar run para schedule %s: %s", getattr(sch, "id", None), e)
-                    skipped += 1
-                    continue
+                busy = not can_dispatch(db, sch.automation_id)
+                if busy:
+                    logger.info(
+                        "Schedule %s não disparado: automação %s já está no limite de execuções simultâneas",
+                        getattr(sch, "id", None), sch.automation_id,
+                    )
+                    skipped_busy += 1
+                else:
+                    try:
+                        run = __create_run_and_enqueue(db, sch, user_id)
+                    except Exception as e:
+                        logger.exception("Falha ao criar/enfileirar run para schedule %s: %s", getattr(sch, "id", None), e)
+                        skipped += 1
+                        continue
                 try:
                     next_at = _compute_next_run(now, sch)
-                    sch.last_run_at = now
+                    if not busy:
+                        sch.last_run_at = now
                     sch.next_run_at = next_at
                     db.add(sch)
                     db.commit()
                 except Exception:
                     logger.exception("Falha ao atualizar next_run para schedule %s", getattr(sch, "id", None))
-                created_runs += 1
+                if not busy:
+                    created_runs += 1
             except Exception:
                 logger.exception("Erro ao processar schedule %s", getattr(sch, "id", None))
                 skipped += 1
@@ -133,6 +146,7 @@ def dispatch_due_schedules() -> dict:
     summary = {
         "processed_schedules": processed,
         "skipped_due_to_errors": skipped,
+        "skipped_due_to_concurrency": skipped_busy,
         "created_runs": created_runs,
         "ts": now.isoformat(),
     }
@@ -142,14 +156,15 @@ def dispatch_due_schedules() -> dict:
 
 def __create_run_and_enqueue(db: Session, schedule: models.Schedule, user_id=None):
     payload = getattr(schedule, "payload", None) or {}
-    run = models.Run(
+    run, created = submit_run(
+        db,
         automation_id=getattr(schedule, "automation_id"),
         user_id=user_id,
-        status="queued",
         payload=payload,
     )
-    db.add(run)
-    db.flush()
+    if not created:
+        logger.info("Schedule %s: run idêntico %s ainda pendente; nada enfileirado", getattr(schedule, "id", None), run.id)
+        return run
     try:
         if _HAS_ENQUEUE_HELPER:
             from app.services.queue import queue as _q
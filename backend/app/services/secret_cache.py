@@ -0,0 +1,66 @@
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import crud, models
+
+# Segredos decifrados por conjunto de donos, guardados só em memória e por pouco tempo.
+# Cada processo tem o seu; a rota de segredos invalida o do processo da API e os workers
+# enxergam a mudança quando o TTL vence.
+_cache: Dict[Tuple[Tuple[str, str], ...], Tuple[float, Dict[str, str]]] = {}
+_lock = threading.Lock()
+
+
+def owners_for_run(automation: models.Automation, user_id=None) -> List[Tuple[str, str]]:
+    """Donos cujos segredos valem para o run: o dono da automação e, por cima, o usuário."""
+    owners = [(automation.owner_type, str(automation.owner_id))]
+    if user_id and ("user", str(user_id)) not in owners:
+        owners.append(("user", str(user_id)))
+    return owners
+
+
+def get_secrets(db: Session, owners: List[Tuple[str, str]]) -> Dict[str, str]:
+    key = tuple(owners)
+    ttl = settings.SECRETS_CACHE_TTL_SEC
+    now = time.monotonic()
+    if ttl > 0:
+        with _lock:
+            hit = _cache.get(key)
+        if hit and hit[0] > now:
+            return dict(hit[1])
+    values = crud.get_secrets_for_owners(db, owners)
+    if ttl > 0:
+        with _lock:
+            _cache[key] = (now + ttl, values)
+    return dict(values)
+
+
+def secrets_for_run(db: Session, automation: models.Automation, user_id=None) -> Dict[str, str]:
+    return get_secrets(db, owners_for_run(automation, user_id))
+
+
+def cache_scope(db: Session, automation: models.Automation, user_id=None) -> Optional[str]:
+    """Escopo do cache de resultados (services.result_cache) para este run.
+
+    Os segredos do dono da automação valem para todos que a executam; se o usuário tem segredos
+    próprios, o resultado foi produzido com as credenciais dele e não pode servir a mais ninguém.
+    """
+    personal = owners_for_run(automation, user_id)[1:]
+    if personal and get_secrets(db, personal):
+        owner_type, owner_id = personal[0]
+        return f"{owner_type}:{owner_id}"
+    return None
+
+
+def invalidate(owner_type: Optional[str] = None, owner_id=None) -> None:
+    """Remove do cache as entradas que envolvem o dono (ou tudo, sem argumentos)."""
+    with _lock:
+        if owner_type is None:
+            _cache.clear()
+            return
+        owner = (owner_type, str(owner_id))
+        for key in [k for k in _cache if owner in k]:
+            del _cache[key]
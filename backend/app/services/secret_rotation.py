@@ -0,0 +1,210 @@
+"""Recifra a tabela `secrets` com a chave primária atual, em lotes e retomável.
+
+Depois de mover a chave antiga para SECRETS_PREVIOUS_KEYS e definir a nova em SECRETS_KEY:
+
+    python -m app.services.secret_rotation --batch-size 500 --workers 4
+
+ou `POST /secrets/rotate` (admin), que enfileira `run_rotation_job`. Cada lote é uma transação
+curta; o último id processado fica em um checkpoint no Redis, então uma execução interrompida
+continua de onde parou. Registros já cifrados com a chave primária são pulados.
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, update
+from sqlalchemy.orm import Session
+
+from app.core import security
+from app.core.config import settings
+from app.db import models
+
+log = logging.getLogger("secret_rotation")
+
+CHECKPOINT_KEY = "secret-rotation:checkpoint"
+
+
+@dataclass
+class RotationReport:
+    key_fingerprint: str
+    last_id: Optional[str] = None
+    scanned: int = 0
+    rotated: int = 0
+    skipped: int = 0
+    failed: int = 0
+    conflicts: int = 0
+    batches: int = 0
+    elapsed_sec: float = 0.0
+    done: bool = False
+    failed_ids: List[str] = field(default_factory=list)
+
+    @property
+    def rows_per_sec(self) -> float:
+        return self.scanned / self.elapsed_sec if self.elapsed_sec else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {**asdict(self), "rows_per_sec": round(self.rows_per_sec, 1)}
+
+
+class RedisCheckpoint:
+    def __init__(self, key: str = CHECKPOINT_KEY, conn=None):
+        self.key = key
+        self._conn = conn
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            from app.services.queue import redis_conn
+            self._conn = redis_conn
+        return self._conn
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        raw = self.conn.get(self.key)
+        return json.loads(raw) if raw else None
+
+    def save(self, data: Dict[str, Any]) -> None:
+        self.conn.set(self.key, json.dumps(data))
+
+
+def _rotate_tokens(tokens: List[str]) -> List[Tuple[str, Optional[str]]]:
+    """Roda no processo filho: ("skip", None) | ("ok", novo_token) | ("error", None) por token."""
+    out: List[Tuple[str, Optional[str]]] = []
+    for token in tokens:
+        try:
+            if not security.needs_rotation(token):
+                out.append(("skip", None))
+            else:
+                out.append(("ok", security.rotate_secret(token)))
+        except ValueError:
+            out.append(("error", None))
+    return out
+
+
+def _chunks(items: list, n: int) -> List[list]:
+    size = max(1, -(-len(items) // max(1, n)))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _fetch_batch(db: Session, after: Optional[str], limit: int):
+    q = db.query(models.Secret.id, models.Secret.value_ciphertext)
+    if after:
+        q = q.filter(models.Secret.id > uuid.UUID(after))
+    return q.order_by(models.Secret.id).limit(limit).all()
+
+
+def _initial_report(checkpoint: Optional[RedisCheckpoint], restart: bool) -> RotationReport:
+    fingerprint = security.primary_key_fingerprint()
+    saved = checkpoint.load() if checkpoint and not restart else None
+    if saved and saved.get("key_fingerprint") == fingerprint and not saved.get("done"):
+        saved.pop("rows_per_sec", None)
+        report = RotationReport(**saved)
+        log.info("Retomando rotação a partir de %s (%d já lidos)", report.last_id, report.scanned)
+        return report
+    return RotationReport(key_fingerprint=fingerprint)
+
+
+def rotate_all(
+    db: Session,
+    *,
+    batch_size: Optional[int] = None,
+    workers: Optional[int] = None,
+    checkpoint: Optional[RedisCheckpoint] = None,
+    restart: bool = False,
+    executor: Optional[Executor] = None,
+) -> RotationReport:
+    batch_size = max(1, batch_size or settings.SECRET_ROTATION_BATCH)
+    workers = workers or settings.SECRET_ROTATION_WORKERS or os.cpu_count() or 1
+    report = _initial_report(checkpoint, restart)
+    started = time.perf_counter() - report.elapsed_sec
+    own_pool = executor is None
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        while True:
+            rows = _fetch_batch(db, report.last_id, batch_size)
+            # a consulta abre transação; encerra antes de decifrar para não segurar nada
+            db.rollback()
+            if not rows:
+                break
+            tokens = [r[1] for r in rows]
+            outcomes = [o for part in pool.map(_rotate_tokens, _chunks(tokens, workers)) for o in part]
+
+            for (sid, old), (status, new) in zip(rows, outcomes):
+                if status == "skip":
+                    report.skipped += 1
+                elif status == "error":
+                    report.failed += 1
+                    report.failed_ids.append(str(sid))
+                else:
+                    # só troca se ninguém alterou o segredo enquanto o lote era processado
+                    res = db.execute(
+                        update(models.Secret)
+                        .where(and_(models.Secret.id == sid, models.Secret.value_ciphertext == old))
+                        .values(value_ciphertext=new)
+                    )
+                    if res.rowcount:
+                        report.rotated += 1
+                    else:
+                        report.conflicts += 1
+            db.commit()
+
+            report.scanned += len(rows)
+            report.batches += 1
+            report.last_id = str(rows[-1][0])
+            report.elapsed_sec = time.perf_counter() - started
+            if checkpoint:
+                checkpoint.save(report.to_dict())
+            log.info(
+                "Rotação: lote %d, %d lidos, %d recifrados, %.0f registros/s",
+                report.batches, report.scanned, report.rotated, report.rows_per_sec,
+            )
+    finally:
+        if own_pool:
+            pool.shutdown()
+
+    report.done = True
+    report.elapsed_sec = time.perf_counter() - started
+    if checkpoint:
+        checkpoint.save(report.to_dict())
+    from app.services import secret_cache
+    secret_cache.invalidate()
+    log.info("Rotação concluída: %s", report.to_dict())
+    return report
+
+
+def run_rotation_job(options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Ponto de entrada para a fila (RQ)."""
+    from app.db.database import SessionLocal
+    options = options or {}
+    db = SessionLocal()
+    try:
+        return rotate_all(
+            db,
+            batch_size=options.get("batch_size"),
+            workers=options.get("workers"),
+            checkpoint=RedisCheckpoint(),
+            restart=bool(options.get("restart")),
+        ).to_dict()
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Recifra os segredos com a chave primária atual.")
+    parser.add_argument("--batch-size", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--restart", action="store_true", help="Ignora o checkpoint e começa do início")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+    report = run_rotation_job({"batch_size": args.batch_size, "workers": args.workers, "restart": args.restart})
+    print(json.dumps(report, indent=2))
+    return 0 if not report["failed"] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
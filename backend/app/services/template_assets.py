@@ -0,0 +1,142 @@
+"""Índice das imagens de referência do matcher (`DashboardConfig.search_image`).
+
+Cada upload vira uma versão de um nome lógico, com o conteúdo guardado no banco. Os workers
+mantêm uma cópia local em TEMPLATE_CACHE_DIR endereçada pelo SHA-256: antes de cada run só
+baixam o que mudou, já deixam a matriz decodificada ao lado e entregam à automação o mapa
+nome -> caminho em `_templates`.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db import crud, models
+from app.services import image_uploads
+
+log = logging.getLogger("template_assets")
+
+
+def describe(asset: models.TemplateAsset) -> Dict[str, Any]:
+    return {
+        "id": str(asset.id),
+        "name": asset.name,
+        "version": asset.version,
+        "sha256": asset.sha256,
+        "ext": asset.ext,
+        "size": asset.size,
+        "width": asset.width,
+        "height": asset.height,
+        "created_at": asset.created_at,
+    }
+
+
+def _dimensions(image_path) -> Tuple[Optional[int], Optional[int]]:
+    try:
+        import numpy as np
+        shape = np.load(image_uploads.decoded_path(image_path), mmap_mode="r", allow_pickle=False).shape
+        return int(shape[1]), int(shape[0])
+    except (ImportError, OSError, ValueError):
+        return None, None
+
+
+def register(db: Session, name: str, image_path, *, uploaded_by=None) -> Tuple[models.TemplateAsset, bool]:
+    """Registra `image_path` como nova versão de `name`. Conteúdo igual ao da última versão não gera versão."""
+    with open(image_path, "rb") as fh:
+        content = fh.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+    ext = os.path.splitext(str(image_path))[1].lower()
+    width, height = _dimensions(image_path)
+    for _ in range(3):
+        latest = crud.get_latest_template_asset(db, name)
+        if latest and latest.sha256 == sha256:
+            return latest, False
+        try:
+            asset = crud.create_template_asset(
+                db,
+                name=name,
+                version=(latest.version + 1) if latest else 1,
+                sha256=sha256,
+                ext=ext,
+                size=len(content),
+                width=width,
+                height=height,
+                content=content,
+                uploaded_by=uploaded_by,
+            )
+        except IntegrityError:
+            # outro upload do mesmo nome pegou a versão; recalcula
+            db.rollback()
+            continue
+        log.info("Template '%s' v%d registrado (%s)", name, asset.version, sha256[:12])
+        return asset, True
+    raise RuntimeError(f"Não foi possível versionar o template '{name}'")
+
+
+def manifest(db: Session) -> Dict[str, Dict[str, Any]]:
+    return {
+        a.name: {"sha256": a.sha256, "ext": a.ext, "version": a.version}
+        for a in crud.list_latest_template_assets(db)
+    }
+
+
+def local_path(sha256: str, ext: str, root: Optional[str] = None) -> str:
+    return os.path.join(root or settings.TEMPLATE_CACHE_DIR, f"{sha256}{ext}")
+
+
+def _write(path: str, content: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(prefix=".tpl-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(content)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def materialize(db: Session, root: Optional[str] = None) -> Dict[str, str]:
+    """Sincroniza o cache local com as versões atuais e devolve nome -> caminho local."""
+    root = root or settings.TEMPLATE_CACHE_DIR
+    current = manifest(db)
+    if not current:
+        return {}
+    os.makedirs(root, exist_ok=True)
+    missing = {
+        m["sha256"]: m["ext"] for m in current.values()
+        if not os.path.exists(local_path(m["sha256"], m["ext"], root))
+    }
+    if missing:
+        for sha256, content in crud.get_template_contents(db, list(missing)).items():
+            if hashlib.sha256(content).hexdigest() != sha256:
+                log.error("Template %s corrompido no banco; ignorado", sha256[:12])
+                continue
+            path = local_path(sha256, missing[sha256], root)
+            _write(path, content)
+            try:
+                image_uploads.precompute_template(path)
+            except image_uploads.NotAnImage:
+                log.warning("Template %s não decodifica; o matcher vai ler a imagem direto", sha256[:12])
+        log.info("Templates sincronizados: %d novos de %d", len(missing), len(current))
+    return {
+        name: local_path(m["sha256"], m["ext"], root)
+        for name, m in current.items()
+        if os.path.exists(local_path(m["sha256"], m["ext"], root))
+    }
+
+
+def templates_for_run(db: Session) -> Dict[str, str]:
+    try:
+        return materialize(db)
+    except Exception:
+        # sem o índice a automação usa as imagens locais dela
+        log.exception("Falha ao sincronizar templates")
+        db.rollback()
+        return {}
@@ -0,0 +1,19 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, Optional
+
+def canonical_payload(payload: Optional[Dict[str, Any]], keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Remove metadados de execução (chaves iniciadas por '_') e, se informado, mantém só `keys`."""
+    data = payload if isinstance(payload, dict) else {}
+    out = {k: v for k, v in data.items() if not str(k).startswith("_")}
+    if keys is not None:
+        wanted = {str(k) for k in keys}
+        out = {k: v for k, v in out.items() if k in wanted}
+    return out
+
+def canonical_json(value: Any) -> str:
+    return json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+def payload_fingerprint(automation_id, payload: Optional[Dict[str, Any]], keys: Optional[Iterable[str]] = None) -> str:
+    body = f"{automation_id}\n{canonical_json(canonical_payload(payload, keys))}"
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
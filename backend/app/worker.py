@@ -1,6 +1,9 @@
 import logging
+import random
+from datetime import timedelta
 from uuid import UUID
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.db import database
 from app.db import models, crud
 
@@ -15,6 +18,45 @@ def _parse_uuid_or_none(value: str):
         return None
     return UUID(s)
 
+def _defer_run(job_payload: dict) -> bool:
+    """Reenfileira o run para daqui a pouco; False se ele já esgotou CONCURRENCY_MAX_DEFERRALS."""
+    from app.services.queue import queue
+    deferrals = int(job_payload.get("deferrals") or 0) + 1
+    if settings.CONCURRENCY_MAX_DEFERRALS > 0 and deferrals > settings.CONCURRENCY_MAX_DEFERRALS:
+        return False
+    base = max(1, settings.CONCURRENCY_DEFER_SEC)
+    delay = base + random.uniform(0, base / 2)
+    queue.enqueue_in(
+        timedelta(seconds=delay),
+        "app.worker.process_run",
+        {**job_payload, "deferrals": deferrals},
+    )
+    log.info("process_run: sem slot livre para run %s; adiado por %.1fs (adiamento #%d)", job_payload.get("run_id"), delay, deferrals)
+    return True
+
+def _schedule_retry(db: Session, run_id: UUID, auto: models.Automation, user_id):
+    from app.services.queue import queue
+    from app.services.retry import RetryPolicy
+    policy = RetryPolicy.for_automation(auto)
+    if policy is None:
+        return
+    run = crud.get_run(db, run_id)
+    if not run or (run.status or "").lower() != "failed":
+        return
+    attempt = run.attempt or 1
+    if not policy.should_retry(attempt, run.result):
+        return
+    child = crud.create_retry_run(db, run)
+    delay = policy.delay_for(attempt)
+    queue.enqueue_in(
+        timedelta(seconds=delay),
+        "app.worker.process_run",
+        {"run_id": str(child.id), "user_id": str(user_id) if user_id else None},
+    )
+    run.result = {**(run.result or {}), "retry": {"next_run_id": str(child.id), "attempt": child.attempt, "delay_sec": round(delay, 1)}}
+    db.commit()
+    log.info("process_run: run %s falhou (tentativa %d/%d); nova tentativa %s em %.1fs", run_id, attempt, policy.max_attempts, child.id, delay)
+
 def process_run(job_payload: dict):
     try:
         run_id = _parse_uuid_or_none(job_payload.get("run_id"))
@@ -35,6 +77,9 @@ def process_run(job_payload: dict):
         if not run:
             log.warning("process_run: run não encontrado: %s", run_id)
             return
+        if (run.status or "").lower() == "cancelled":
+            log.info("process_run: run %s cancelado antes de iniciar; ignorando", run_id)
+            return
         auto = crud.get_automation_by_id(db, run.automation_id)
         if not auto:
             log.error("process_run: automação não encontrada para run %s (automation_id=%s)", run_id, run.automation_id)
@@ -71,6 +116,25 @@ def process_run(job_payload: dict):
             log.exception("process_run: não foi possível importar execute_run")
             crud.set_run_status_final(db, run_id, "failed", {"ok": False, "error": "Erro interno do worker"})
             return
+        from app.services import concurrency, dedup
+        lease = concurrency.try_acquire(auto, run.id)
+        if lease is None:
+            if _defer_run(job_payload):
+                return
+            # slot nunca liberou (ex.: lease preso no recurso exclusivo): encerra em vez de adiar para sempre
+            log.error("process_run: run %s sem slot após %d adiamentos; marcando como falha", run_id, settings.CONCURRENCY_MAX_DEFERRALS)
+            crud.set_run_status_final(db, run_id, "failed", {
+                "ok": False,
+                "error": "Sem slot de execução livre dentro do tempo de espera",
+                "error_code": "concurrency_timeout",
+                "retryable": True,
+            })
+            dedup.release(run.automation_id, run.user_id, run.payload, run.id)
+            try:
+                _schedule_retry(db, run_id, auto, user_id)
+            except Exception:
+                log.exception("process_run: falha ao agendar nova tentativa para run %s", run_id)
+            return
         try:
             success = execute_run(db, run.id, auto, user_id, run.payload or {})
             if not success:
@@ -80,8 +144,15 @@ def process_run(job_payload: dict):
         except Exception:
             log.exception("process_run: exceção durante execução do run %s", run_id)
             try:
-                crud.set_run_status_final(db, run_id, "failed", {"ok": False, "error": "Erro durante execução"})
+                crud.set_run_status_final(db, run_id, "failed", {"ok": False, "error": "Erro durante execução", "error_type": "WorkerError"})
             except Exception:
                 log.exception("process_run: falha ao setar status final após exceção para run %s", run_id)
+        finally:
+            lease.release()
+            dedup.release(run.automation_id, run.user_id, run.payload, run.id)
+        try:
+            _schedule_retry(db, run_id, auto, user_id)
+        except Exception:
+            log.exception("process_run: falha ao agendar nova tentativa para run %s", run_id)
     finally:
         db.close()
@@ -0,0 +1,83 @@
+"""Benchmark offline do fluxo `run_dashboard_v2.run` sobre o simulador de telas.
+
+Mede a latência por etapa (capture, locate, ocr, wait) sem o DELPHOS.BI, então roda
+em qualquer máquina Linux. `wait` é tempo virtual: o quanto a automação dormiria.
+
+    python bench/bench_dashboard_flow.py --iterations 5
+    python bench/bench_dashboard_flow.py --recording caminho/da/gravacao --json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from modules.common import timing
+from modules.common.drivers import set_driver
+from modules.common.simulator import ReplayDriver, dashboard_recording, load_recording
+from modules.comercial.dashboard import run_dashboard_v2
+
+IMAGES_DIR = os.path.join(BACKEND_DIR, "modules", "comercial", "dashboard", "images")
+
+
+def run_once(recording, payload):
+    driver = ReplayDriver(recording)
+    previous = set_driver(driver)
+    start_virtual = driver.now()
+    t0 = time.perf_counter()
+    try:
+        result = run_dashboard_v2.run(dict(payload))
+    finally:
+        set_driver(previous)
+    return {
+        "ok": bool(isinstance(result, dict) and result.get("ok")),
+        "wall_s": time.perf_counter() - t0,
+        "virtual_s": (driver.now() - start_virtual).total_seconds(),
+        "states": driver.history,
+        "result": result,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=3)
+    parser.add_argument("--recording", help="Diretório com recording.json (padrão: gravação sintética)")
+    parser.add_argument("--dashboard", default="comercial_2024_2025")
+    parser.add_argument("--json", action="store_true", help="Saída em JSON")
+    args = parser.parse_args(argv)
+
+    recording = load_recording(args.recording) if args.recording else dashboard_recording(IMAGES_DIR)
+    runs = []
+    with tempfile.TemporaryDirectory() as workspace, timing.recording() as recorder:
+        payload = {"dashboard_name": args.dashboard, "enviar_whatsapp": False, "_workspace": workspace}
+        for _ in range(max(1, args.iterations)):
+            runs.append(run_once(recording, payload))
+
+    report = {
+        "iterations": len(runs),
+        "ok": all(r["ok"] for r in runs),
+        "wall_s": [round(r["wall_s"], 4) for r in runs],
+        "virtual_s": [round(r["virtual_s"], 2) for r in runs],
+        "final_state": runs[-1]["states"][-1],
+        "steps": recorder.summary(),
+    }
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print(f"\niterações: {report['iterations']}  ok: {report['ok']}  estado final: {report['final_state']}")
+        print(f"tempo real (s): {report['wall_s']}")
+        print(f"tempo virtual (s): {report['virtual_s']}")
+        print(f"{'etapa':<20}{'n':>6}{'total ms':>12}{'média':>10}{'p50':>10}{'p95':>10}{'máx':>10}")
+        for name, s in sorted(report["steps"].items()):
+            print(f"{name:<20}{s['count']:>6}{s['total_ms']:>12.1f}{s['mean_ms']:>10.2f}"
+                  f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
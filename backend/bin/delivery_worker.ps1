@@ -0,0 +1,4 @@
+$ErrorActionPreference = "Stop"
+$root = Split-Path -Parent $MyInvocation.MyCommand.Path
+$env:PYTHONPATH = (Resolve-Path "$root\..").Path
+rq worker deliveries --with-scheduler
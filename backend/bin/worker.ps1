@@ -1,4 +1,4 @@
 $ErrorActionPreference = "Stop"
 $root = Split-Path -Parent $MyInvocation.MyCommand.Path
 $env:PYTHONPATH = (Resolve-Path "$root\..").Path
-rq worker runs
+rq worker runs --with-scheduler
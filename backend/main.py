@@ -9,6 +9,8 @@ from pathlib import Path
 import importlib
 import secrets as _secrets
 
+from app.core.automation_loader import call_automation
+
 BASE_DIR = Path(__file__).resolve().parent
 USERS_FILE = BASE_DIR / "users" / "users.json"
 
@@ -68,10 +70,10 @@ def cmd_login(username: str, password: str):
 def _run_comercial_dashboard() -> bool:
     try:
         mod = importlib.import_module("modules.comercial.dashboard.run_comercial")
-        fn = getattr(mod, "main", None) or getattr(mod, "run", None)
-        if not fn:
+        func_name = "main" if callable(getattr(mod, "main", None)) else "run"
+        if not callable(getattr(mod, func_name, None)):
             raise RuntimeError("Função 'main' ou 'run' não encontrada no módulo comercial.dashboard.run_comercial")
-        res = fn() if callable(fn) else None
+        res = call_automation(mod.__name__, func_name, {})
         return True
     except Exception as e:
         tb = traceback.format_exc()
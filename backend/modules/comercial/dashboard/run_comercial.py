@@ -1,8 +1,11 @@
-import os, time, json
-import pyautogui, keyring
+import os, json
 from datetime import datetime
+from modules.common.drivers import get_driver
+from modules.common.lazy import lazy_import
 from modules.comercial.dashboard.ui_helpers import (focus_window_by_title,save_full_screenshot,take_region_screenshot,multiscale_locate,click_image,)
 
+keyring = lazy_import("keyring")
+
 BASE = os.path.dirname(__file__)
 CFG_PATH = os.path.join(BASE, "config.json")
 
@@ -46,14 +49,16 @@ LOGS_DIR = os.path.join(BASE, cfg.get("pasta_logs","logs"))
 os.makedirs(SCREENSHOT_DIR, exist_ok=True); os.makedirs(LOGS_DIR, exist_ok=True)
 SERVICE = "HubAutomacoes_SistemaBI"
 SYSTEM_USER = cfg.get("default_user")
-password = None
-if SYSTEM_USER:
-    try:
-        password = keyring.get_password(SERVICE, f"{SYSTEM_USER}_password")
-    except Exception:
-        password = None
-if not password:
-    password = cfg.get("default_password")
+
+def get_password(username):
+    # Consultado só na execução: o keyring é lento e pode exigir o backend do sistema.
+    password = None
+    if username:
+        try:
+            password = keyring.get_password(SERVICE, f"{username}_password")
+        except Exception:
+            password = None
+    return password or cfg.get("default_password")
 
 def load_regions_from_annotations():
     jpath = os.path.join(ANNOT_DIR, "regions.json")
@@ -70,6 +75,7 @@ def load_regions_from_annotations():
     return cfg.get("region_relatorio")
 
 def focus_login_window():
+    ui = get_driver()
     titles = ["Acesso", "Acesso - DELPHOS.BI", "Login", "DELPHOS.BI Principal"]
     for t in titles:
         if focus_window_by_title(t, timeout=2):
@@ -79,13 +85,13 @@ def focus_login_window():
     if os.path.exists(login_full):
         if click_image(login_full, confidence=0.6, timeout=4):
             log("Clique em login_full.png (fallback) para focar")
-            time.sleep(0.6)
+            ui.sleep(0.6)
             return True
     try:
-        pyautogui.keyDown('alt'); pyautogui.press('tab'); pyautogui.keyUp('alt')
-        time.sleep(1)
-        pyautogui.keyDown('alt');pyautogui.press('tab');pyautogui.keyUp('alt')
-        time.sleep(1)
+        ui.key_down('alt'); ui.press('tab'); ui.key_up('alt')
+        ui.sleep(1)
+        ui.key_down('alt');ui.press('tab');ui.key_up('alt')
+        ui.sleep(1)
         log("Fallback Alt+Tab enviado")
         return True
     except Exception as e:
@@ -93,19 +99,20 @@ def focus_login_window():
     return False
 
 def do_login_keyboard(username, pwd):
+    ui = get_driver()
     if not focus_login_window():
         log("Não conseguiu focar janela de login.")
         return False
-    time.sleep(2)
-    pyautogui.typewrite(username, interval=0.03)
-    time.sleep(2)
-    pyautogui.press('tab')
-    time.sleep(2)
-    pyautogui.typewrite(pwd, interval=0.03)
-    time.sleep(2)
-    pyautogui.press('enter')
+    ui.sleep(2)
+    ui.type_text(username, interval=0.03)
+    ui.sleep(2)
+    ui.press('tab')
+    ui.sleep(2)
+    ui.type_text(pwd, interval=0.03)
+    ui.sleep(2)
+    ui.press('enter')
     log("Credenciais digitadas via teclado (username/tab/password/enter)")
-    time.sleep(3.0)
+    ui.sleep(3.0)
     dash_img = os.path.join(IMG_DIR, "dashboard_full.png")
     if os.path.exists(dash_img):
         pos = None
@@ -120,45 +127,46 @@ def do_login_keyboard(username, pwd):
     return True
 
 def keyboard_navigate_and_generate():
+    ui = get_driver()
     focus_window_by_title(cfg.get("titulo_janela","DELPHOS.BI Principal"), timeout=4)
-    time.sleep(1)
-    pyautogui.press('f11')
+    ui.sleep(1)
+    ui.press('f11')
     log("Pressionado F11 (Parametros do Sistema) - aguardando carregamento")
-    time.sleep(2.0)
+    ui.sleep(2.0)
     for i in range(17):
-        pyautogui.press('down')
-        time.sleep(0.08)
-    time.sleep(0.12)
-    pyautogui.press('enter')  
+        ui.press('down')
+        ui.sleep(0.08)
+    ui.sleep(0.12)
+    ui.press('enter')  
     log("Navegado por 17 setas ↓ e pressionado Enter para selecionar a planilha")
-    time.sleep(1.8)
-    pyautogui.press('right')
-    time.sleep(0.2)
+    ui.sleep(1.8)
+    ui.press('right')
+    ui.sleep(0.2)
     btn_exec = os.path.join(IMG_DIR, "btn_executar_rel.png")
     if os.path.exists(btn_exec):
         clicked = click_image(btn_exec, timeout=3, confidence=0.66)
         if clicked:
             log("Clicado em btn_executar_rel.png (X) para executar relatório")
         else:
-            pyautogui.press('X')
+            ui.press('X')
             log("btn_executar_rel.png não encontrado - pressionado Enter como fallback")
     else:
-        pyautogui.press('X')
+        ui.press('X')
         log("btn_executar_rel.png ausente - pressionado Enter para executar (fallback)")
-    time.sleep(10.0) 
+    ui.sleep(10.0) 
     log("Periodicidade ajustada para 'Mensal' ")
-    pyautogui.keyDown('alt')
-    pyautogui.press('down')
-    time.sleep(5)
-    pyautogui.press('down')
-    time.sleep(5)
+    ui.key_down('alt')
+    ui.press('down')
+    ui.sleep(5)
+    ui.press('down')
+    ui.sleep(5)
     log("Mês selecionado")
-    pyautogui.press('left')
-    pyautogui.keyUp('alt')
-    time.sleep(2.5)
-    pyautogui.press('enter')
+    ui.press('left')
+    ui.key_up('alt')
+    ui.sleep(2.5)
+    ui.press('enter')
     log("Pressionado Enter para atualizar relatório (finalizar)")
-    time.sleep(4.0)
+    ui.sleep(4.0)
     region = load_regions_from_annotations()
     if not region:
         log("region_relatorio não configurado. Rode helper_pick_region.py se quiser capturar area especifica.")
@@ -171,9 +179,10 @@ def keyboard_navigate_and_generate():
         return path
 
 def main():
+    ui = get_driver()
     log("=== INICIANDO ROTINA (keyboard-first) ===")
     username = SYSTEM_USER or cfg.get("default_user")
-    pwd = password or cfg.get("default_password")
+    pwd = get_password(username)
     if not username or not pwd:
         log("Usuário/senha não configurados. Coloque config.json ou keyring.")
         return
@@ -181,7 +190,7 @@ def main():
         opened = open_app()
         if not opened:
             log("Falha ao abrir app; continue se o app já estiver aberto manualmente.")
-    time.sleep(cfg.get("timeout_open", 6))
+    ui.sleep(cfg.get("timeout_open", 6))
     ok = do_login_keyboard(username, pwd)
     if not ok:
         log("Falha no login (keyboard). Abortando.")
@@ -204,7 +213,7 @@ def main():
                     ok = send_wh_cb(num, result_path, caption=mensagem, wait_for_ready=8, focus_click_coord=None,
                                     logger=log)
                     log(f"Envio WhatsApp (clipboard) para {num} -> {ok}")
-                    time.sleep(1.2)
+                    ui.sleep(1.2)
                 except Exception as e:
                     log(f"Erro envio WhatsApp para {num} (clipboard): {e}")
         else:
@@ -1,12 +1,11 @@
 import os
-import time
 import json
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 
-import pyautogui
-import keyring
-
+from modules.common.drivers import get_driver
+from modules.common.lazy import lazy_import
+from modules.common import imaging, phash, timing
 from modules.comercial.dashboard.ui_helpers import (
     focus_window_by_title,
     save_full_screenshot,
@@ -15,12 +14,10 @@ from modules.comercial.dashboard.ui_helpers import (
     click_image,
 )
 
+cv2 = lazy_import("cv2")
+keyring = lazy_import("keyring")
 # OCR opcional
-try:
-    import pytesseract
-    from pytesseract import Output as TesseractOutput
-except Exception:
-    pytesseract = None
+pytesseract = lazy_import("pytesseract")
 
 BASE = os.path.dirname(__file__)
 CFG_PATH = os.path.join(BASE, "config.json")
@@ -66,9 +63,13 @@ def get_dashboard_config(dashboard_name: str) -> Optional[dict]:
     return dashboards.get("dashboards", {}).get(dashboard_name)
 
 
-def get_credentials(cfg: dict) -> tuple[str, str]:
+def get_credentials(cfg: dict, secrets: Optional[dict] = None) -> tuple[str, str]:
+    """Segredos injetados pelo backend (`_secrets`) primeiro; depois keyring e config.json."""
+    secrets = secrets or {}
+    if secrets.get("delphos_usuario") and secrets.get("delphos_senha"):
+        return secrets["delphos_usuario"], secrets["delphos_senha"]
     SERVICE = "HubAutomacoes_SistemaBI"
-    username = cfg.get("default_user")
+    username = secrets.get("delphos_usuario") or cfg.get("default_user")
     password = None
 
     if username:
@@ -118,6 +119,7 @@ def open_app(cfg: dict) -> bool:
 # =====================================================================
 
 def focus_login_window(cfg: dict, img_dir: str) -> bool:
+    ui = get_driver()
     titles = ["Acesso", "Acesso - DELPHOS.BI", "Login", "DELPHOS.BI Principal"]
     for t in titles:
         if focus_window_by_title(t, timeout=2):
@@ -128,18 +130,18 @@ def focus_login_window(cfg: dict, img_dir: str) -> bool:
     if os.path.exists(login_full):
         if click_image(login_full, confidence=0.6, timeout=4):
             log("Clique em login_full.png (fallback) para focar")
-            time.sleep(0.6)
+            ui.sleep(0.6)
             return True
 
     try:
-        pyautogui.keyDown("alt")
-        pyautogui.press("tab")
-        pyautogui.keyUp("alt")
-        time.sleep(1)
-        pyautogui.keyDown("alt")
-        pyautogui.press("tab")
-        pyautogui.keyUp("alt")
-        time.sleep(1)
+        ui.key_down("alt")
+        ui.press("tab")
+        ui.key_up("alt")
+        ui.sleep(1)
+        ui.key_down("alt")
+        ui.press("tab")
+        ui.key_up("alt")
+        ui.sleep(1)
         log("Fallback Alt+Tab enviado para focar login")
         return True
     except Exception as e:
@@ -149,20 +151,21 @@ def focus_login_window(cfg: dict, img_dir: str) -> bool:
 
 
 def do_login_keyboard(username: str, password: str, cfg: dict, img_dir: str) -> bool:
+    ui = get_driver()
     if not focus_login_window(cfg, img_dir):
         log("Não conseguiu focar janela de login.")
         return False
 
-    time.sleep(2)
-    pyautogui.typewrite(username, interval=0.03)
-    time.sleep(2)
-    pyautogui.press("tab")
-    time.sleep(2)
-    pyautogui.typewrite(password, interval=0.03)
-    time.sleep(2)
-    pyautogui.press("enter")
+    ui.sleep(2)
+    ui.type_text(username, interval=0.03)
+    ui.sleep(2)
+    ui.press("tab")
+    ui.sleep(2)
+    ui.type_text(password, interval=0.03)
+    ui.sleep(2)
+    ui.press("enter")
     log("Credenciais digitadas via teclado (username/tab/password/enter)")
-    time.sleep(3.0)
+    ui.sleep(3.0)
 
     dash_img = os.path.join(img_dir, "dashboard_full.png")
     if os.path.exists(dash_img):
@@ -219,21 +222,22 @@ def navigate_to_planilhas_old(cfg: dict) -> bool:
     Depois disso estamos com a tela de planilhas aberta
     (igual no keyboard_navigate_and_generate original).
     """
+    ui = get_driver()
     focus_window_by_title(cfg.get("titulo_janela", "DELPHOS.BI Principal"), timeout=4)
-    time.sleep(1)
+    ui.sleep(1)
 
-    pyautogui.press("f11")
+    ui.press("f11")
     log("Pressionado F11 (Parâmetros do Sistema) - aguardando carregamento")
-    time.sleep(2.0)
+    ui.sleep(2.0)
 
     for i in range(17):
-        pyautogui.press("down")
-        time.sleep(0.08)
-    time.sleep(0.12)
+        ui.press("down")
+        ui.sleep(0.08)
+    ui.sleep(0.12)
 
-    pyautogui.press("enter")
+    ui.press("enter")
     log("Navegado por 17 setas ↓ e pressionado Enter (tela de planilhas)")
-    time.sleep(1.8)
+    ui.sleep(1.8)
 
     # NÃO aperto 'right' aqui. A partir daqui vamos usar a lógica nova
     # para localizar o dashboard na grade.
@@ -245,23 +249,26 @@ def navigate_to_planilhas_old(cfg: dict) -> bool:
 # =====================================================================
 
 def ocr_find_and_click(text: str, min_conf: int = 55) -> bool:
-    if pytesseract is None:
+    ui = get_driver()
+    if not pytesseract.available:
         log("[OCR] pytesseract não disponível; ignorando OCR.")
         return False
 
     log(f"[OCR] procurando texto na tela: '{text}' (min_conf={min_conf})")
 
-    screenshot = pyautogui.screenshot()
-    if screenshot is None:
+    frame = ui.capture()
+    if frame is None:
         log("[OCR] falha ao capturar screenshot.")
         return False
+    screenshot = cv2.cvtColor(frame, cv2.COLOR_BGRA2RGB if frame.shape[2] == 4 else cv2.COLOR_BGR2RGB)
 
     try:
-        data = pytesseract.image_to_data(
-            screenshot,
-            output_type=TesseractOutput.DICT,
-            lang="por"
-        )
+        with timing.step("ocr"):
+            data = pytesseract.image_to_data(
+                screenshot,
+                output_type=pytesseract.Output.DICT,
+                lang="por"
+            )
     except Exception as e:
         log(f"[OCR] erro ao rodar pytesseract: {e}")
         return False
@@ -297,28 +304,34 @@ def ocr_find_and_click(text: str, min_conf: int = 55) -> bool:
     x = data["left"][best_idx] + data["width"][best_idx] // 2
     y = data["top"][best_idx] + data["height"][best_idx] // 2
 
-    pyautogui.moveTo(x, y, duration=0.2)
-    pyautogui.click()
+    ui.move_to(x, y, duration=0.2)
+    ui.click()
     log(f"[OCR] clique aproximado em '{text}' em ({x}, {y})")
-    time.sleep(0.8)
+    ui.sleep(0.8)
     return True
 
 
-def find_and_click_dashboard(dashboard_config: dict, img_dir: str) -> bool:
+def resolve_image(img_dir: str, name: str, templates: Optional[dict] = None) -> str:
+    """Templates sincronizados pelo worker (`_templates`, nome -> caminho) têm prioridade sobre img_dir."""
+    return (templates or {}).get(name) or os.path.join(img_dir, name)
+
+
+def find_and_click_dashboard(dashboard_config: dict, img_dir: str, templates: Optional[dict] = None) -> bool:
     """
     Dentro da tela de Planilhas:
       1) tenta achar pelo search_image com scroll
       2) se não achar, tenta OCR pelo search_text
     """
+    ui = get_driver()
     search_text = dashboard_config.get("search_text")
     search_image = dashboard_config.get("search_image")
 
     # 1) por imagem
     if search_image:
-        img_path = os.path.join(img_dir, search_image)
+        img_path = resolve_image(img_dir, search_image, templates)
         log(f"[DASH] procurando dashboard via imagem: {img_path}")
         if os.path.exists(img_path):
-            screen_width, screen_height = pyautogui.size()
+            screen_width, screen_height = ui.size()
             center_x = screen_width // 2
             center_y = int(screen_height * 0.6)
 
@@ -335,17 +348,17 @@ def find_and_click_dashboard(dashboard_config: dict, img_dir: str) -> bool:
                     log(f"[DASH] dashboard encontrado por imagem: {search_image}")
                     return True
 
-                pyautogui.moveTo(center_x, center_y, duration=0.1)
-                pyautogui.scroll(-500)
+                ui.move_to(center_x, center_y, duration=0.1)
+                ui.scroll(-500)
                 log(f"[DASH] scroll realizado na área da grade em ({center_x}, {center_y})")
-                time.sleep(0.8)
+                ui.sleep(0.8)
         else:
             log(f"[DASH] imagem não encontrada em disco: {img_path}")
 
     # 2) por texto (OCR)
     if search_text:
         log(f"[DASH] tentando localizar dashboard via OCR pelo texto: '{search_text}'")
-        screen_width, screen_height = pyautogui.size()
+        screen_width, screen_height = ui.size()
         center_x = screen_width // 2
         center_y = int(screen_height * 0.6)
 
@@ -356,10 +369,10 @@ def find_and_click_dashboard(dashboard_config: dict, img_dir: str) -> bool:
                 log(f"[DASH/OCR] dashboard '{search_text}' selecionado via OCR")
                 return True
 
-            pyautogui.moveTo(center_x, center_y, duration=0.1)
-            pyautogui.scroll(-500)
+            ui.move_to(center_x, center_y, duration=0.1)
+            ui.scroll(-500)
             log(f"[DASH/OCR] scroll realizado na área da grade em ({center_x}, {center_y})")
-            time.sleep(0.8)
+            ui.sleep(0.8)
 
     log(f"[DASH] Não foi possível encontrar dashboard: {search_text}")
     return False
@@ -389,8 +402,9 @@ def execute_dashboard_and_capture(
       - ajuste simplificado de periodicidade
       - screenshot região / full
     """
-    pyautogui.press("right")
-    time.sleep(0.2)
+    ui = get_driver()
+    ui.press("right")
+    ui.sleep(0.2)
 
     btn_exec = os.path.join(img_dir, "btn_executar_rel.png")
     if os.path.exists(btn_exec):
@@ -403,29 +417,32 @@ def execute_dashboard_and_capture(
         if clicked:
             log("[EXEC] Clicado em btn_executar_rel.png para executar relatório")
         else:
-            pyautogui.press("X")
+            ui.press("X")
             log("[EXEC] btn_executar_rel.png não encontrado - pressionado X como fallback")
     else:
-        pyautogui.press("X")
+        ui.press("X")
         log("[EXEC] btn_executar_rel.png ausente - pressionado X para executar (fallback)")
 
-    time.sleep(10.0)
+    ui.sleep(10.0)
 
     log(f"[EXEC] Ajustando periodicidade para '{periodicidade}' (fluxo keyboard antigo)")
-    pyautogui.keyDown("alt")
-    pyautogui.press("down")
-    time.sleep(5)
-    pyautogui.press("down")
-    time.sleep(5)
+    ui.key_down("alt")
+    ui.press("down")
+    ui.sleep(5)
+    ui.press("down")
+    ui.sleep(5)
     log("[EXEC] Mês selecionado (fluxo simplificado)")
-    pyautogui.press("left")
-    pyautogui.keyUp("alt")
-    time.sleep(2.5)
-    pyautogui.press("enter")
+    ui.press("left")
+    ui.key_up("alt")
+    ui.sleep(2.5)
+    ui.press("enter")
     log("[EXEC] Pressionado Enter para atualizar relatório (finalizar)")
-    time.sleep(4.0)
+    ui.sleep(4.0)
 
     os.makedirs(screenshot_dir, exist_ok=True)
+    capture_fmt = imaging.CaptureFormat.from_config(
+        {**(cfg.get("captura") or {}), **(dashboard_config.get("captura") or {})}
+    )
 
     region = dashboard_config.get("screenshot_region")
     if not region:
@@ -435,7 +452,8 @@ def execute_dashboard_and_capture(
         log("[EXEC] Nenhuma região definida; usando screenshot completo.")
         full = save_full_screenshot(
             screenshot_dir,
-            name_prefix=f"dashboard_{dashboard_name}_full"
+            name_prefix=f"dashboard_{dashboard_name}_full",
+            fmt=capture_fmt,
         )
         log("[EXEC] Full screenshot salvo em " + full)
         return full
@@ -443,23 +461,95 @@ def execute_dashboard_and_capture(
         path = take_region_screenshot(
             region,
             screenshot_dir,
-            name_prefix=f"Dashboard_{dashboard_name}"
+            name_prefix=f"Dashboard_{dashboard_name}",
+            fmt=capture_fmt,
         )
         log("[EXEC] Screenshot (região) salvo em " + path)
         return path
 
 
+# =====================================================================
+# DETECÇÃO DE MUDANÇA (hash perceptual)
+# =====================================================================
+
+CAPTURE_INDEX_NAME = ".capturas_index.json"
+
+def change_detection_settings(cfg: dict, dashboard_config: dict, payload: dict) -> dict:
+    opts = {"ativo": False, "distancia_maxima": 4, "algoritmo": "phash"}
+    opts.update(cfg.get("deteccao_mudanca") or {})
+    opts.update(dashboard_config.get("deteccao_mudanca") or {})
+    if "pular_se_inalterado" in payload:
+        opts["ativo"] = bool(payload["pular_se_inalterado"])
+    if "distancia_maxima" in payload:
+        opts["distancia_maxima"] = int(payload["distancia_maxima"])
+    return opts
+
+def check_capture_changed(screenshot_path: str, screenshot_dir: str, key: str, opts: dict) -> dict:
+    """Compara a captura com a última enviada da mesma chave.
+
+    Não grava nada: a captura só entra no índice depois de enviada (ver `marker` e
+    phash.record_sent), senão um envio que falhou faria as próximas execuções pularem.
+    """
+    index_path = os.path.join(screenshot_dir, CAPTURE_INDEX_NAME)
+    algorithm = opts.get("algoritmo", "phash")
+    value = phash.image_hash(imaging.wait(screenshot_path), algorithm)
+    previous = phash.CaptureIndex(index_path).latest(key, algorithm)
+    distance = phash.hamming(value, int(previous["hash"], 16)) if previous else None
+    unchanged = distance is not None and distance <= int(opts.get("distancia_maxima", 4))
+    log(f"[DIFF] {key}: distância={distance} inalterado={unchanged}")
+    return {
+        "unchanged": unchanged,
+        "distance": distance,
+        "previous": previous.get("file") if previous else None,
+        "previous_at": previous.get("at") if previous else None,
+        "marker": phash.sent_marker(index_path, key, value, algorithm, os.path.basename(screenshot_path)),
+    }
+
+def discard_capture(screenshot_path: str) -> None:
+    for path in (screenshot_path, imaging.thumbnail_path(screenshot_path)):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
 # =====================================================================
 # WHATSAPP
 # =====================================================================
 
-def send_whatsapp_report(screenshot_path: str, numeros: list, mensagem: str):
+WHATSAPP_CHANNELS = {"api": "cloud_api", "clipboard": "clipboard"}
+
+def default_whatsapp_channel() -> str:
+    return "api" if os.getenv("WHATSAPP_PHONE_NUMBER_ID") else "clipboard"
+
+def build_delivery(canal: str, numeros: list, mensagem: str, payload: dict, dashboard_config: dict) -> Optional[dict]:
+    """Monta o pedido de entrega devolvido no resultado (ver app.services.delivery.delivery_groups)."""
+    if canal not in WHATSAPP_CHANNELS:
+        raise ValueError(f"canal_whatsapp inválido: {canal!r}")
+    grupos = payload.get("grupos_whatsapp", dashboard_config.get("grupos_whatsapp")) or {}
+    if grupos and "numeros_whatsapp" not in payload:
+        lista = [{"nome": nome, "destinatarios": nums} for nome, nums in grupos.items() if nums]
+    else:
+        lista = [{"nome": "padrao", "destinatarios": numeros}] if numeros else []
+    if not lista:
+        return None
+    return {
+        "canal": "whatsapp",
+        "canal_backend": WHATSAPP_CHANNELS[canal],
+        "mensagem": mensagem,
+        "grupos": lista,
+    }
+
+def send_whatsapp_report(screenshot_path: str, numeros: list, mensagem: str) -> bool:
+    """Envia pelo WhatsApp Web aqui mesmo; True só se todos os números receberam."""
+    ui = get_driver()
     try:
         from modules.comercial.dashboard.whatsapp import send_whatsapp_via_clipboard
     except Exception as e:
         log(f"Módulo whatsapp não encontrado: {e}")
-        return
+        return False
 
+    sent = 0
     for num in numeros:
         try:
             result_path = (
@@ -476,9 +566,11 @@ def send_whatsapp_report(screenshot_path: str, numeros: list, mensagem: str):
                 logger=log,
             )
             log(f"Envio WhatsApp para {num} -> {ok}")
-            time.sleep(1.2)
+            sent += 1 if ok else 0
+            ui.sleep(1.2)
         except Exception as e:
             log(f"Erro envio WhatsApp para {num}: {e}")
+    return sent == len(numeros)
 
 
 # =====================================================================
@@ -486,6 +578,7 @@ def send_whatsapp_report(screenshot_path: str, numeros: list, mensagem: str):
 # =====================================================================
 
 def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
+    ui = get_driver()
     log("=== INICIANDO AUTOMAÇÃO V2 (antiga até Planilhas, nova depois) ===")
 
     if payload is None:
@@ -499,6 +592,8 @@ def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
         return {
             "ok": False,
             "error": err,
+            "error_code": "missing_dashboard_name",
+            "retryable": False,
             "message": "É necessário informar o nome do dashboard",
         }
 
@@ -509,6 +604,8 @@ def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
         return {
             "ok": False,
             "error": "Dashboard não configurado",
+            "error_code": "dashboard_not_configured",
+            "retryable": False,
             "message": err,
         }
 
@@ -523,13 +620,15 @@ def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
         cfg.get("destino_screenshots", "screenshots")
     )
 
-    username, password = get_credentials(cfg)
+    username, password = get_credentials(cfg, payload.get("_secrets"))
     if not username or not password:
-        msg = "Usuário/senha não configurados (config.json ou keyring)."
+        msg = "Usuário/senha não configurados (segredos, config.json ou keyring)."
         log(msg)
         return {
             "ok": False,
             "error": "Credenciais não configuradas",
+            "error_code": "missing_credentials",
+            "retryable": False,
             "message": msg,
         }
 
@@ -549,12 +648,14 @@ def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
             if not opened:
                 log("Falha ao abrir app; continuando se já estiver aberto manualmente.")
 
-        time.sleep(cfg.get("timeout_open", 6))
+        ui.sleep(cfg.get("timeout_open", 6))
 
         if not do_login_keyboard(username, password, cfg, img_dir):
             return {
                 "ok": False,
                 "error": "Falha no login",
+                "error_code": "login_failed",
+                "retryable": True,
                 "message": "Não foi possível fazer login no sistema",
             }
 
@@ -563,14 +664,18 @@ def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
             return {
                 "ok": False,
                 "error": "Falha na navegação (Planilhas)",
+                "error_code": "navigation_failed",
+                "retryable": True,
                 "message": "Não foi possível chegar na tela de Planilhas",
             }
 
         # 2) lógica NOVA: localizar dashboard na grade
-        if not find_and_click_dashboard(dashboard_config, img_dir):
+        if not find_and_click_dashboard(dashboard_config, img_dir, payload.get("_templates")):
             return {
                 "ok": False,
                 "error": "Falha na navegação",
+                "error_code": "dashboard_not_found",
+                "retryable": True,
                 "message": f"Não foi possível localizar o dashboard '{dashboard_name}' na grade",
             }
 
@@ -587,18 +692,58 @@ def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
             ano,
         )
 
-        if enviar_wh and numeros_wh:
-            send_whatsapp_report(screenshot_path, numeros_wh, mensagem)
-
+        diff_opts = change_detection_settings(cfg, dashboard_config, payload)
+        marker = None
+        if diff_opts.get("ativo") and not payload.get("forcar_envio"):
+            key = ":".join(str(v) for v in (dashboard_name, periodicidade, ano, mes, dia) if v is not None)
+            change = check_capture_changed(screenshot_path, screenshot_dir, key, diff_opts)
+            marker = change["marker"]
+            if change["unchanged"]:
+                discard_capture(screenshot_path)
+                log("=== DASHBOARD INALTERADO: envio e armazenamento ignorados ===")
+                return {
+                    "ok": True,
+                    "unchanged": True,
+                    "message": f"Dashboard {dashboard_config.get('display_name')} sem mudanças desde a última captura",
+                    "dashboard": dashboard_name,
+                    "periodicidade": periodicidade,
+                    "distance": change["distance"],
+                    "previous_capture": change["previous"],
+                    "previous_at": change["previous_at"],
+                    "whatsapp_enviado": False,
+                }
+
+        # O run termina com a captura: o backend cria uma entrega por grupo na fila `deliveries`
+        # e o desktop fica livre para o próximo dashboard. "inline" mantém o envio antigo aqui.
+        canal_wh = payload.get("canal_whatsapp", cfg.get("canal_whatsapp", default_whatsapp_channel()))
+        # a captura só entra no índice de mudanças depois de enviada: aqui no envio inline,
+        # ou pelo backend quando a entrega da fila termina 'sent'
+        entrega = None
+        enviado = False
+        if enviar_wh and canal_wh == "inline":
+            if numeros_wh:
+                enviado = send_whatsapp_report(screenshot_path, numeros_wh, mensagem)
+                if enviado:
+                    phash.record_sent(marker)
+        elif enviar_wh:
+            entrega = build_delivery(canal_wh, numeros_wh, mensagem, payload, dashboard_config)
+            if entrega and marker:
+                entrega["registro_envio"] = marker
+
+        # o arquivo precisa estar no disco antes de o backend recolher os artefatos
+        imaging.wait(screenshot_path)
         log("=== AUTOMAÇÃO V2 CONCLUÍDA COM SUCESSO ===")
 
+        thumb = imaging.thumbnail_path(screenshot_path)
         return {
             "ok": True,
             "message": f"Dashboard {dashboard_config.get('display_name')} gerado com sucesso",
             "screenshot": screenshot_path,
+            **({"thumbnail": thumb} if os.path.exists(thumb) else {}),
+            **({"entrega": entrega} if entrega else {}),
             "dashboard": dashboard_name,
             "periodicidade": periodicidade,
-            "whatsapp_enviado": enviar_wh,
+            "whatsapp_enviado": enviado,
         }
 
     except Exception as e:
@@ -608,6 +753,8 @@ def run(payload: Dict[str, Any] = None) -> Dict[str, Any]:
         return {
             "ok": False,
             "error": str(e),
+            "error_type": type(e).__name__,
+            "error_code": "unexpected_error",
             "message": "Erro durante execução da automação",
         }
 
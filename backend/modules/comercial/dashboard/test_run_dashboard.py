@@ -9,6 +9,8 @@ if BACKEND_DIR not in sys.path:
     sys.path.insert(0, BACKEND_DIR)
 
 from modules.comercial.dashboard.run_dashboard_v2 import run
+from modules.common.drivers import set_driver
+from modules.common.simulator import ReplayDriver, dashboard_recording
 
 
 def main():
@@ -20,6 +22,10 @@ def main():
         "enviar_whatsapp": False,
     }
 
+    # --simulado: roda contra a gravação sintética em vez do DELPHOS.BI real
+    if "--simulado" in sys.argv:
+        set_driver(ReplayDriver(dashboard_recording(os.path.join(CURRENT_DIR, "images"))))
+
     print("=== TESTE LOCAL ===")
     print("Payload enviado:", payload)
 
@@ -1,65 +1,124 @@
-import os, time, cv2, numpy as np
-import pyautogui
-from datetime import datetime
+import os
+from modules.common.drivers import get_driver, to_bgr
+from modules.common.lazy import lazy_import
+from modules.common import imaging, timing
 
-pyautogui.FAILSAFE = True
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
 
-def _screenshot_bgr():
-    scr = pyautogui.screenshot()
-    arr = np.array(scr)
-    return cv2.cvtColor(arr, cv2.COLOR_RGB2BGR)
+_templates = {}
+_pyramids = {}
 
-def multiscale_locate(template_path, screen=None, scales=None, method=cv2.TM_CCOEFF_NORMED):
-    tpl = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
+def _load_template(template_path):
+    try:
+        mtime = os.path.getmtime(template_path)
+    except OSError:
+        return None
+    cached = _templates.get(template_path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    tpl = _load_decoded(template_path, mtime)
+    if tpl is None:
+        tpl = cv2.imread(template_path, cv2.IMREAD_COLOR)
+    if tpl is not None:
+        _templates[template_path] = (mtime, tpl)
+    return tpl
+
+def _load_decoded(template_path, mtime):
+    # uploads gravam a matriz BGR já decodificada ao lado da imagem (<imagem>.npy)
+    decoded = template_path + ".npy"
+    try:
+        if os.path.getmtime(decoded) < mtime:
+            return None
+        return np.load(decoded, allow_pickle=False)
+    except (OSError, ValueError):
+        return None
+
+def _screenshot_bgr(region=None):
+    with timing.step("capture"):
+        return to_bgr(get_driver().capture(region))
+
+def multiscale_locate(template_path, screen=None, scales=None, method=None):
+    if method is None:
+        method = cv2.TM_CCOEFF_NORMED
+    tpl = _load_template(template_path)
     if tpl is None:
         return None
     if screen is None:
         screen = _screenshot_bgr()
+    else:
+        screen = to_bgr(screen)
     if scales is None:
         scales = np.linspace(0.8, 1.25, 12)
-    h0, w0 = tpl.shape[:2]
     best = {"score": -1.0, "loc": None, "w": 0, "h": 0, "scale": None}
+    with timing.step("locate.multiscale"):
+        _multiscale_search(_pyramid(template_path, tpl, scales), screen, method, best)
+    return best
+
+def _pyramid(template_path, tpl, scales):
+    """Template redimensionado para cada escala; reaproveitado enquanto o arquivo não mudar."""
+    key = (template_path, _templates.get(template_path, (None,))[0], tuple(round(float(s), 4) for s in scales))
+    cached = _pyramids.get(key)
+    if cached is not None:
+        return cached
+    h0, w0 = tpl.shape[:2]
+    levels = []
     for s in scales:
         nw = int(w0 * s)
         nh = int(h0 * s)
-        if nw < 8 or nh < 8 or nw > screen.shape[1] or nh > screen.shape[0]:
+        if nw < 8 or nh < 8:
+            continue
+        try:
+            levels.append((float(s), cv2.resize(tpl, (nw, nh), interpolation=cv2.INTER_AREA)))
+        except Exception:
+            continue
+    for old in [k for k in _pyramids if k[0] == template_path]:
+        del _pyramids[old]
+    _pyramids[key] = levels
+    return levels
+
+def _multiscale_search(levels, screen, method, best):
+    for s, tpl_r in levels:
+        nh, nw = tpl_r.shape[:2]
+        if nw > screen.shape[1] or nh > screen.shape[0]:
             continue
         try:
-            tpl_r = cv2.resize(tpl, (nw, nh), interpolation=cv2.INTER_AREA)
             res = cv2.matchTemplate(screen, tpl_r, method)
             _, maxv, _, maxloc = cv2.minMaxLoc(res)
         except Exception:
             continue
         if maxv > best["score"]:
-            best.update({"score": float(maxv), "loc": maxloc, "w": nw, "h": nh, "scale": float(s)})
-    return best
+            best.update({"score": float(maxv), "loc": maxloc, "w": nw, "h": nh, "scale": s})
 
 def locate_image_on_screen(template_path, confidence=0.7, timeout=10, interval=0.5):
     if not os.path.exists(template_path):
         print(f"[DEBUG locate_image_on_screen] Template não existe: {template_path}")
         return None
+    tpl = _load_template(template_path)
+    if tpl is None:
+        print(f"[DEBUG locate_image_on_screen] Template ilegível: {template_path}")
+        return None
 
-    start = time.time()
+    driver = get_driver()
+    h, w = tpl.shape[:2]
+    start = driver.now()
 
-    while time.time() - start < timeout:
-        box = None
+    while (driver.now() - start).total_seconds() < timeout:
         try:
-            box = pyautogui.locateOnScreen(template_path, confidence=confidence)
+            screen = _screenshot_bgr()
+            if screen.shape[0] >= h and screen.shape[1] >= w:
+                with timing.step("locate"):
+                    res = cv2.matchTemplate(screen, tpl, cv2.TM_CCOEFF_NORMED)
+                    _, maxv, _, maxloc = cv2.minMaxLoc(res)
+                if maxv >= confidence:
+                    x, y = maxloc[0] + w // 2, maxloc[1] + h // 2
+                    print(f"[DEBUG locate_image_on_screen] MATCH {template_path} pos=({x},{y}) score={maxv:.2f}")
+                    return (x, y)
         except Exception as e:
-            print(f"[DEBUG locate_image_on_screen] Erro com confidence para {template_path}: {repr(e)}")
-            try:
-                box = pyautogui.locateOnScreen(template_path)
-                print(f"[DEBUG locate_image_on_screen] Fallback SEM confidence usado para {template_path}")
-            except Exception as e2:
-                print(f"[DEBUG locate_image_on_screen] Erro também sem confidence para {template_path}: {repr(e2)}")
-                return None
-
-        if box:
-            x, y = pyautogui.center(box)
-            print(f"[DEBUG locate_image_on_screen] MATCH {template_path} pos=({x},{y}) box={box}")
-            return (x, y)
+            print(f"[DEBUG locate_image_on_screen] Erro ao procurar {template_path}: {repr(e)}")
+            return None
 
-        time.sleep(interval)
+        driver.sleep(interval)
 
     print(f"[DEBUG locate_image_on_screen] Nenhum match encontrado para {template_path}")
     return None
@@ -75,46 +134,37 @@ def click_image(template_path, confidence=0.7, timeout=12, interval=0.6, clicks=
         print(f"[DEBUG click_image] Não encontrou {template_path} com confidence={confidence}")
         return False
 
+    driver = get_driver()
     x, y = pos
-    pyautogui.moveTo(x, y, duration=0.25)
-    pyautogui.click(clicks=clicks, button=button)
-    time.sleep(0.2)
+    driver.move_to(x, y, duration=0.25)
+    driver.click(clicks=clicks, button=button)
+    driver.sleep(0.2)
     return True
 
 def focus_window_by_title(title, timeout=8):
-    try:
-        import pygetwindow as gw
-    except Exception:
-        return True
-    start = time.time()
-    while time.time() - start < timeout:
-        wins = gw.getWindowsWithTitle(title)
-        if wins:
-            w = wins[0]
-            try:
-                w.activate()
-            except Exception:
-                try:
-                    w.minimize(); time.sleep(0.15); w.restore()
-                    w.activate()
-                except Exception:
-                    pass
-            return True
-        time.sleep(0.5)
-    return False
-
-def take_region_screenshot(region, dest_folder, name_prefix="relatorio"):
-    os.makedirs(dest_folder, exist_ok=True)
-    x,y,w,h = region
-    img = pyautogui.screenshot(region=(x,y,w,h))
-    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    path = os.path.join(dest_folder, f"{name_prefix}_{ts}.png")
-    img.save(path)
-    return path
+    return get_driver().focus_window(title, timeout=timeout)
 
-def save_full_screenshot(dest_folder, name_prefix="full"):
-    os.makedirs(dest_folder, exist_ok=True)
-    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    path = os.path.join(dest_folder, f"{name_prefix}_{ts}.png")
-    pyautogui.screenshot(path)
+def _save_capture(region, dest_folder, name_prefix, fmt, wait):
+    driver = get_driver()
+    fmt = fmt or imaging.CaptureFormat.from_env()
+    with timing.step("capture"):
+        frame = to_bgr(driver.capture(tuple(region) if region else None))
+    if not frame.flags.owndata:
+        frame = frame.copy()
+    ts = driver.now().strftime("%Y-%m-%d_%H-%M-%S")
+    path = os.path.join(dest_folder, f"{name_prefix}_{ts}{fmt.extension}")
+    n = 1
+    while os.path.exists(path) or imaging.is_pending(path):
+        n += 1
+        path = os.path.join(dest_folder, f"{name_prefix}_{ts}-{n}{fmt.extension}")
+    future = imaging.save_async(frame, path, fmt)
+    if wait:
+        future.result()
     return path
+
+def take_region_screenshot(region, dest_folder, name_prefix="relatorio", fmt=None, wait=False):
+    """Captura a região e devolve o caminho; a gravação segue em segundo plano (ver imaging.wait)."""
+    return _save_capture(region, dest_folder, name_prefix, fmt, wait)
+
+def save_full_screenshot(dest_folder, name_prefix="full", fmt=None, wait=False):
+    return _save_capture(None, dest_folder, name_prefix, fmt, wait)
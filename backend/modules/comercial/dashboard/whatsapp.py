@@ -1,10 +1,14 @@
-import os, time, io, webbrowser
-from PIL import Image
-import pyautogui
-import win32clipboard
-import win32con
+import os, io, webbrowser
+from modules.common import imaging
+from modules.common.drivers import get_driver
+from modules.common.lazy import lazy_import
+
+Image = lazy_import("PIL.Image")
+win32clipboard = lazy_import("win32clipboard")
+win32con = lazy_import("win32con")
 
 def _image_to_clipboard(image_path):
+    imaging.wait(image_path)
     if not os.path.exists(image_path):
         raise FileNotFoundError(image_path)
     img = Image.open(image_path)
@@ -21,8 +25,9 @@ def _image_to_clipboard(image_path):
         win32clipboard.CloseClipboard()
 
 def send_whatsapp_via_clipboard(phone, image_path, caption=None,wait_for_ready=8, focus_click_coord=None,logger=print):
+    ui = get_driver()
     try:
-        if not os.path.exists(image_path):
+        if not imaging.is_pending(image_path) and not os.path.exists(image_path):
             logger(f"[whcb] Arquivo não encontrado: {image_path}")
             return False
         url = f"https://web.whatsapp.com/send?phone={phone}&text="
@@ -30,9 +35,9 @@ def send_whatsapp_via_clipboard(phone, image_path, caption=None,wait_for_ready=8
         logger(f"[whcb] Abrindo {url}")
         waited = 0.0
         interval = 0.5
-        time.sleep(1.0)
+        ui.sleep(1.0)
         while waited < wait_for_ready:
-            time.sleep(interval)
+            ui.sleep(interval)
             waited += interval
         logger(f"[whcb] Esperou {waited:.1f}s para carregar a página")
         try:
@@ -40,31 +45,31 @@ def send_whatsapp_via_clipboard(phone, image_path, caption=None,wait_for_ready=8
         except Exception as e:
             logger(f"[whcb] Falha copiar imagem para clipboard: {e}")
             return False
-        time.sleep(0.25)
+        ui.sleep(0.25)
         if focus_click_coord:
             try:
-                pyautogui.click(focus_click_coord[0], focus_click_coord[1])
-                time.sleep(0.15)
+                ui.click(focus_click_coord[0], focus_click_coord[1])
+                ui.sleep(0.15)
             except Exception as e:
                 logger(f"[whcb] Falha click focus coord: {e}")
         else:
-            w, h = pyautogui.size()
-            pyautogui.click(w // 2, h - 120)
-            time.sleep(0.12)
+            w, h = ui.size()
+            ui.click(w // 2, h - 120)
+            ui.sleep(0.12)
         try:
-            pyautogui.hotkey('ctrl', 'v')
+            ui.hotkey('ctrl', 'v')
         except Exception as e:
             logger(f"[whcb] Falha ao executar Ctrl+V: {e}")
             return False
         if caption:
-            time.sleep(0.9)
+            ui.sleep(0.9)
             try:
-                pyautogui.typewrite(str(caption), interval=0.02)
+                ui.type_text(str(caption), interval=0.02)
             except Exception:
                 pass
-        time.sleep(1.2)
+        ui.sleep(1.2)
         try:
-            pyautogui.press('enter')
+            ui.press('enter')
         except Exception as e:
             logger(f"[whcb] Falha ao pressionar Enter: {e}")
             return False
@@ -0,0 +1,49 @@
+import os
+import sys
+import threading
+from typing import Optional
+
+from modules.common.drivers.base import UIDriver, crop, to_bgr
+
+# Seleção do driver: HUB_UI_DRIVER=pyautogui|x11|fake. Sem a variável, X11 no Linux com
+# DISPLAY definido e pyautogui nos demais casos.
+DRIVER_ENV = "HUB_UI_DRIVER"
+
+_driver: Optional[UIDriver] = None
+_lock = threading.Lock()
+
+
+def create_driver(name: Optional[str] = None) -> UIDriver:
+    name = (name or os.getenv(DRIVER_ENV) or "").strip().lower()
+    if not name:
+        name = "x11" if sys.platform.startswith("linux") and os.getenv("DISPLAY") else "pyautogui"
+    if name == "x11":
+        from modules.common.drivers.x11 import X11Driver
+        return X11Driver()
+    if name == "fake":
+        from modules.common.drivers.fake import FakeDriver
+        return FakeDriver()
+    if name == "pyautogui":
+        from modules.common.drivers.pyautogui_driver import PyAutoGUIDriver
+        return PyAutoGUIDriver()
+    raise ValueError(f"Driver de UI desconhecido: {name!r}")
+
+
+def get_driver() -> UIDriver:
+    global _driver
+    if _driver is None:
+        with _lock:
+            if _driver is None:
+                _driver = create_driver()
+    return _driver
+
+
+def set_driver(driver: Optional[UIDriver]) -> Optional[UIDriver]:
+    """Troca o driver global (testes/simulação). Retorna o anterior."""
+    global _driver
+    with _lock:
+        previous, _driver = _driver, driver
+    return previous
+
+
+__all__ = ["UIDriver", "create_driver", "get_driver", "set_driver", "crop", "to_bgr"]
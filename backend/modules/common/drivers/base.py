@@ -0,0 +1,96 @@
+import os
+import time
+from datetime import datetime
+from typing import Optional, Sequence, Tuple
+
+from modules.common import timing
+from modules.common.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+Region = Tuple[int, int, int, int]
+
+
+class UIDriver:
+    """Interface de entrada/captura usada pelas automações de desktop.
+
+    `capture()` devolve um array numpy no layout BGR ou BGRA (o que a implementação
+    tiver sem cópia); quem consome deve tratar os dois, ver `to_bgr`.
+    """
+
+    name = "base"
+
+    # --- captura -----------------------------------------------------------------
+    def capture(self, region: Optional[Region] = None):
+        raise NotImplementedError
+
+    def size(self) -> Tuple[int, int]:
+        raise NotImplementedError
+
+    def save_capture(self, path: str, region: Optional[Region] = None) -> str:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if not cv2.imwrite(path, to_bgr(self.capture(region))):
+            raise OSError(f"Falha ao gravar captura em {path}")
+        return path
+
+    # --- mouse -------------------------------------------------------------------
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        raise NotImplementedError
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, button: str = "left") -> None:
+        raise NotImplementedError
+
+    def scroll(self, amount: int, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        raise NotImplementedError
+
+    # --- teclado -----------------------------------------------------------------
+    def key_down(self, key: str) -> None:
+        raise NotImplementedError
+
+    def key_up(self, key: str) -> None:
+        raise NotImplementedError
+
+    def press(self, key: str) -> None:
+        self.key_down(key)
+        self.key_up(key)
+
+    def hotkey(self, *keys: str) -> None:
+        for k in keys:
+            self.key_down(k)
+        for k in reversed(keys):
+            self.key_up(k)
+
+    def type_text(self, text: str, interval: float = 0.0) -> None:
+        for ch in text:
+            self.press(ch)
+            if interval:
+                self.sleep(interval)
+
+    # --- janelas -----------------------------------------------------------------
+    def focus_window(self, title: str, timeout: float = 8) -> bool:
+        raise NotImplementedError
+
+    # --- tempo -------------------------------------------------------------------
+    def sleep(self, seconds: float) -> None:
+        timing.add("wait", seconds)
+        time.sleep(seconds)
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def close(self) -> None:
+        pass
+
+
+def to_bgr(frame):
+    """Converte uma captura BGRA para BGR; BGR é devolvido como está."""
+    if frame.ndim == 3 and frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame
+
+
+def crop(frame, region: Optional[Sequence[int]]):
+    if not region:
+        return frame
+    x, y, w, h = (int(v) for v in region)
+    return frame[y:y + h, x:x + w]
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from typing import Any, Iterable, List, Optional, Tuple
+
+from modules.common import timing
+from modules.common.drivers.base import Region, UIDriver, crop
+from modules.common.lazy import lazy_import
+
+np = lazy_import("numpy")
+
+
+class FakeDriver(UIDriver):
+    """Tela em memória para testes: registra os eventos e não espera de verdade.
+
+    `screen` é um array BGR; `sleep` só avança um relógio virtual.
+    """
+
+    name = "fake"
+
+    def __init__(self, width: int = 1920, height: int = 1080, windows: Iterable[str] = (), screen=None):
+        self.screen = screen if screen is not None else np.zeros((height, width, 3), dtype=np.uint8)
+        self.windows: List[str] = list(windows)
+        self.focused: Optional[str] = None
+        self.cursor: Tuple[int, int] = (0, 0)
+        self.events: List[Tuple[str, Any]] = []
+        self.clock = datetime(2024, 1, 1, 8, 0, 0)
+
+    # --- tela --------------------------------------------------------------------
+    def paste(self, image, x: int, y: int) -> None:
+        """Desenha `image` (BGR) na posição (x, y) da tela falsa."""
+        h, w = image.shape[:2]
+        self.screen[y:y + h, x:x + w] = image[:, :, :3] if image.ndim == 3 else image[:, :, None]
+
+    def capture(self, region: Optional[Region] = None):
+        self.events.append(("capture", tuple(region) if region else None))
+        return crop(self.screen, region).copy()
+
+    def size(self) -> Tuple[int, int]:
+        h, w = self.screen.shape[:2]
+        return int(w), int(h)
+
+    # --- entrada -----------------------------------------------------------------
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        self.cursor = (int(x), int(y))
+        self.events.append(("move", self.cursor))
+        if duration:
+            self.sleep(duration)
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, button: str = "left") -> None:
+        if x is not None and y is not None:
+            self.cursor = (int(x), int(y))
+        self.events.append(("click", (self.cursor, clicks, button)))
+
+    def scroll(self, amount: int, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        if x is not None and y is not None:
+            self.cursor = (int(x), int(y))
+        self.events.append(("scroll", (self.cursor, int(amount))))
+
+    def key_down(self, key: str) -> None:
+        self.events.append(("key_down", key))
+
+    def key_up(self, key: str) -> None:
+        self.events.append(("key_up", key))
+
+    def press(self, key: str) -> None:
+        self.events.append(("press", key))
+
+    def type_text(self, text: str, interval: float = 0.0) -> None:
+        self.events.append(("type", text))
+        if interval:
+            self.sleep(interval * len(text))
+
+    def focus_window(self, title: str, timeout: float = 8) -> bool:
+        wanted = title.lower()
+        for w in self.windows:
+            if wanted in w.lower():
+                self.focused = w
+                self.events.append(("focus", w))
+                return True
+        self.sleep(timeout)
+        return False
+
+    # --- tempo -------------------------------------------------------------------
+    def sleep(self, seconds: float) -> None:
+        timing.add("wait", seconds)
+        self.clock += timedelta(seconds=seconds)
+
+    def now(self) -> datetime:
+        return self.clock
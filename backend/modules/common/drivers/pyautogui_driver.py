@@ -0,0 +1,70 @@
+import time
+from typing import Optional, Tuple
+
+from modules.common.drivers.base import Region, UIDriver
+from modules.common.lazy import lazy_import, lazy_pyautogui
+
+pyautogui = lazy_pyautogui()
+np = lazy_import("numpy")
+cv2 = lazy_import("cv2")
+
+
+class PyAutoGUIDriver(UIDriver):
+    """Driver padrão no Windows: pyautogui para entrada/captura e pygetwindow para janelas."""
+
+    name = "pyautogui"
+
+    def capture(self, region: Optional[Region] = None):
+        img = pyautogui.screenshot(region=tuple(region) if region else None)
+        return cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+
+    def size(self) -> Tuple[int, int]:
+        w, h = pyautogui.size()
+        return int(w), int(h)
+
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        pyautogui.moveTo(x, y, duration=duration)
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, button: str = "left") -> None:
+        pyautogui.click(x=x, y=y, clicks=clicks, button=button)
+
+    def scroll(self, amount: int, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        pyautogui.scroll(amount, x=x, y=y)
+
+    def key_down(self, key: str) -> None:
+        pyautogui.keyDown(key)
+
+    def key_up(self, key: str) -> None:
+        pyautogui.keyUp(key)
+
+    def press(self, key: str) -> None:
+        pyautogui.press(key)
+
+    def hotkey(self, *keys: str) -> None:
+        pyautogui.hotkey(*keys)
+
+    def type_text(self, text: str, interval: float = 0.0) -> None:
+        pyautogui.typewrite(text, interval=interval)
+
+    def focus_window(self, title: str, timeout: float = 8) -> bool:
+        try:
+            import pygetwindow as gw
+        except Exception:
+            # Sem pygetwindow não há como focar; mantém o comportamento antigo de seguir em frente.
+            return True
+        start = time.time()
+        while time.time() - start < timeout:
+            wins = gw.getWindowsWithTitle(title)
+            if wins:
+                w = wins[0]
+                try:
+                    w.activate()
+                except Exception:
+                    try:
+                        w.minimize(); time.sleep(0.15); w.restore()
+                        w.activate()
+                    except Exception:
+                        pass
+                return True
+            time.sleep(0.5)
+        return False
@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from modules.common.drivers.base import Region, UIDriver
+from modules.common.lazy import lazy_import
+
+np = lazy_import("numpy")
+mss = lazy_import("mss")
+
+# Nomes de tecla no estilo pyautogui -> keysym do X11
+_KEYSYMS: Dict[str, str] = {
+    "enter": "Return",
+    "return": "Return",
+    "tab": "Tab",
+    "esc": "Escape",
+    "escape": "Escape",
+    "backspace": "BackSpace",
+    "delete": "Delete",
+    "del": "Delete",
+    "space": "space",
+    " ": "space",
+    "up": "Up",
+    "down": "Down",
+    "left": "Left",
+    "right": "Right",
+    "home": "Home",
+    "end": "End",
+    "pageup": "Prior",
+    "pagedown": "Next",
+    "insert": "Insert",
+    "alt": "Alt_L",
+    "altleft": "Alt_L",
+    "altright": "Alt_R",
+    "ctrl": "Control_L",
+    "ctrlleft": "Control_L",
+    "ctrlright": "Control_R",
+    "shift": "Shift_L",
+    "shiftleft": "Shift_L",
+    "shiftright": "Shift_R",
+    "win": "Super_L",
+    "winleft": "Super_L",
+    "\n": "Return",
+    "\t": "Tab",
+}
+_BUTTONS = {"left": 1, "middle": 2, "right": 3}
+
+
+class X11Driver(UIDriver):
+    """Driver para Linux/X11 (inclusive Xvfb headless).
+
+    Captura via mss, que usa XShmGetImage (MIT-SHM) quando disponível: o frame BGRA
+    é exposto como um array numpy sobre o buffer do mss, sem passar por PIL.
+    Entrada via extensão XTest e foco de janela via EWMH (_NET_ACTIVE_WINDOW).
+    """
+
+    name = "x11"
+
+    def __init__(self, display: Optional[str] = None):
+        self.display_name = display or os.getenv("DISPLAY")
+        self._local = threading.local()
+        self._display = None
+
+    # --- conexões ----------------------------------------------------------------
+    def _sct(self):
+        # mss não é thread-safe: uma instância por thread.
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            sct = mss.mss(display=self.display_name) if self.display_name else mss.mss()
+            self._local.sct = sct
+        return sct
+
+    def _x(self):
+        if self._display is None:
+            from Xlib import display
+            self._display = display.Display(self.display_name)
+        return self._display
+
+    # --- captura -----------------------------------------------------------------
+    def capture(self, region: Optional[Region] = None):
+        sct = self._sct()
+        if region:
+            x, y, w, h = (int(v) for v in region)
+            area = {"left": x, "top": y, "width": w, "height": h}
+        else:
+            area = sct.monitors[0]
+        shot = sct.grab(area)
+        return np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+
+    def size(self) -> Tuple[int, int]:
+        mon = self._sct().monitors[0]
+        return int(mon["width"]), int(mon["height"])
+
+    # --- mouse -------------------------------------------------------------------
+    def _fake(self, event_type, detail=0, **kw) -> None:
+        from Xlib.ext import xtest
+        d = self._x()
+        xtest.fake_input(d, event_type, detail, **kw)
+        d.sync()
+
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        from Xlib import X
+        self._fake(X.MotionNotify, x=int(x), y=int(y))
+        if duration:
+            self.sleep(duration)
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, button: str = "left") -> None:
+        from Xlib import X
+        if x is not None and y is not None:
+            self.move_to(x, y)
+        detail = _BUTTONS.get(button, 1)
+        for _ in range(max(1, clicks)):
+            self._fake(X.ButtonPress, detail)
+            self._fake(X.ButtonRelease, detail)
+
+    def scroll(self, amount: int, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        from Xlib import X
+        if x is not None and y is not None:
+            self.move_to(x, y)
+        # Botões 4/5 = roda para cima/baixo. pyautogui usa "cliques" de 100 no Windows.
+        detail = 4 if amount > 0 else 5
+        for _ in range(max(1, abs(int(amount)) // 100 or 1)):
+            self._fake(X.ButtonPress, detail)
+            self._fake(X.ButtonRelease, detail)
+
+    # --- teclado -----------------------------------------------------------------
+    def _keycode(self, key: str) -> Tuple[int, bool]:
+        from Xlib import XK
+        d = self._x()
+        name = _KEYSYMS.get(key.lower() if len(key) > 1 else key, key)
+        keysym = XK.string_to_keysym(name)
+        if keysym == 0 and len(key) == 1:
+            keysym = ord(key)
+        if keysym == 0 and len(name) > 1:
+            keysym = XK.string_to_keysym(name.capitalize())
+        keycode = d.keysym_to_keycode(keysym)
+        if not keycode:
+            raise ValueError(f"Tecla não mapeada no X11: {key!r}")
+        # Se o keysym só existe no nível com Shift (ex.: 'A', '!'), precisa segurar Shift.
+        shift = len(key) == 1 and d.keycode_to_keysym(keycode, 0) != keysym
+        return keycode, shift
+
+    def key_down(self, key: str) -> None:
+        from Xlib import X
+        keycode, _ = self._keycode(key)
+        self._fake(X.KeyPress, keycode)
+
+    def key_up(self, key: str) -> None:
+        from Xlib import X
+        keycode, _ = self._keycode(key)
+        self._fake(X.KeyRelease, keycode)
+
+    def press(self, key: str) -> None:
+        from Xlib import X
+        keycode, shift = self._keycode(key)
+        if shift:
+            shift_code, _ = self._keycode("shift")
+            self._fake(X.KeyPress, shift_code)
+        self._fake(X.KeyPress, keycode)
+        self._fake(X.KeyRelease, keycode)
+        if shift:
+            self._fake(X.KeyRelease, shift_code)
+
+    # --- janelas -----------------------------------------------------------------
+    def _window_title(self, win) -> str:
+        d = self._x()
+        for atom_name in ("_NET_WM_NAME", "WM_NAME"):
+            prop = win.get_full_property(d.intern_atom(atom_name), 0)
+            if prop and prop.value:
+                value = prop.value
+                return value.decode("utf-8", "replace") if isinstance(value, bytes) else str(value)
+        return ""
+
+    def _find_window(self, title: str):
+        d = self._x()
+        root = d.screen().root
+        prop = root.get_full_property(d.intern_atom("_NET_CLIENT_LIST"), 0)
+        wanted = title.lower()
+        for wid in (prop.value if prop else []):
+            win = d.create_resource_object("window", wid)
+            try:
+                if wanted in self._window_title(win).lower():
+                    return win
+            except Exception:
+                continue
+        return None
+
+    def focus_window(self, title: str, timeout: float = 8) -> bool:
+        from Xlib import X
+        from Xlib.protocol import event
+        d = self._x()
+        root = d.screen().root
+        start = time.time()
+        while time.time() - start < timeout:
+            win = self._find_window(title)
+            if win is not None:
+                active = d.intern_atom("_NET_ACTIVE_WINDOW")
+                ev = event.ClientMessage(window=win, client_type=active, data=(32, [2, X.CurrentTime, 0, 0, 0]))
+                root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
+                win.set_input_focus(X.RevertToParent, X.CurrentTime)
+                d.sync()
+                return True
+            self.sleep(0.5)
+        return False
+
+    def close(self) -> None:
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
+        if self._display is not None:
+            self._display.close()
+            self._display = None
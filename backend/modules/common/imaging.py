@@ -0,0 +1,175 @@
+import atexit
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional
+
+from modules.common import timing
+from modules.common.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+
+# Formato padrão das capturas. HUB_CAPTURE_FORMAT=png|webp|jpeg; qualidade vale para webp/jpeg,
+# HUB_PNG_COMPRESSION (0-9) para png. HUB_CAPTURE_THUMB > 0 gera também uma miniatura com esse
+# lado máximo em pixels.
+_EXTENSIONS = {"png": ".png", "webp": ".webp", "jpeg": ".jpg", "jpg": ".jpg"}
+
+
+@dataclass(frozen=True)
+class CaptureFormat:
+    fmt: str = "png"
+    quality: int = 85
+    png_compression: int = 1
+    thumbnail: int = 0
+
+    @property
+    def extension(self) -> str:
+        return _EXTENSIONS[self.fmt]
+
+    def params(self):
+        if self.fmt == "png":
+            return [cv2.IMWRITE_PNG_COMPRESSION, int(self.png_compression)]
+        if self.fmt == "webp":
+            return [cv2.IMWRITE_WEBP_QUALITY, int(self.quality)]
+        return [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)]
+
+    def validated(self) -> "CaptureFormat":
+        if self.fmt not in _EXTENSIONS:
+            raise ValueError(
+                f"Formato de captura desconhecido: {self.fmt!r} (use {', '.join(sorted(_EXTENSIONS))})"
+            )
+        return self
+
+    @classmethod
+    def from_env(cls) -> "CaptureFormat":
+        return cls(
+            fmt=os.getenv("HUB_CAPTURE_FORMAT", "png").strip().lower(),
+            quality=int(os.getenv("HUB_CAPTURE_QUALITY", "85")),
+            png_compression=int(os.getenv("HUB_PNG_COMPRESSION", "1")),
+            thumbnail=int(os.getenv("HUB_CAPTURE_THUMB", "0")),
+        ).validated()
+
+    @classmethod
+    def from_config(cls, cfg: Optional[Dict[str, Any]]) -> "CaptureFormat":
+        """Sobrepõe o padrão do ambiente com o bloco `captura` do config.json."""
+        base = cls.from_env()
+        if not cfg:
+            return base
+        fmt = replace(
+            base,
+            fmt=str(cfg.get("formato", base.fmt)).lower(),
+            quality=int(cfg.get("qualidade", base.quality)),
+            png_compression=int(cfg.get("compressao_png", base.png_compression)),
+            thumbnail=int(cfg.get("miniatura", base.thumbnail)),
+        )
+        return fmt.validated()
+
+
+def encode(frame, fmt: Optional[CaptureFormat] = None) -> bytes:
+    fmt = fmt or CaptureFormat.from_env()
+    ok, buf = cv2.imencode(fmt.extension, frame, fmt.params())
+    if not ok:
+        raise OSError(f"Falha ao codificar captura como {fmt.fmt}")
+    return buf.tobytes()
+
+
+def thumbnail_path(path: str) -> str:
+    base, ext = os.path.splitext(path)
+    return f"{base}_thumb{ext}"
+
+
+def _make_thumbnail(frame, max_side: int):
+    h, w = frame.shape[:2]
+    scale = max_side / float(max(h, w))
+    if scale >= 1:
+        return frame
+    return cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def _write(path: str, data: bytes) -> None:
+    tmp = path + ".part"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _encode_and_write(frame, path: str, fmt: CaptureFormat) -> str:
+    with timing.step("encode"):
+        _write(path, encode(frame, fmt))
+        if fmt.thumbnail:
+            _write(thumbnail_path(path), encode(_make_thumbnail(frame, fmt.thumbnail), fmt))
+    return path
+
+
+# --- codificação em segundo plano ----------------------------------------------------------
+# O cv2 solta o GIL durante o imencode, então threads bastam para tirar a compressão do caminho
+# da automação. Quem vai ler o arquivo chama `wait(path)` antes.
+
+_pool: Optional[ThreadPoolExecutor] = None
+_pending: Dict[str, Future] = {}
+_lock = threading.Lock()
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                workers = int(os.getenv("HUB_ENCODE_WORKERS", "2"))
+                _pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="encode")
+    return _pool
+
+
+def save_async(frame, path: str, fmt: Optional[CaptureFormat] = None) -> Future:
+    """Agenda a gravação de `frame` (BGR) em `path` e volta na hora.
+
+    O frame precisa ser do chamador: capturas que são views de buffers do driver devem ser
+    copiadas antes (ver `ui_helpers`).
+    """
+    fmt = fmt or CaptureFormat.from_env()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    future = _executor().submit(_encode_and_write, frame, path, fmt)
+    key = os.path.abspath(path)
+    with _lock:
+        _pending[key] = future
+    future.add_done_callback(lambda f, k=key: _forget(k, f))
+    return future
+
+
+def _forget(key: str, future: Future) -> None:
+    # gravação que falhou continua registrada: `wait(path)` e `flush()` repropagam o erro em vez
+    # de devolver um caminho que nunca foi escrito (até uma nova gravação no mesmo caminho)
+    if future.cancelled() or future.exception() is not None:
+        return
+    with _lock:
+        if _pending.get(key) is future:
+            del _pending[key]
+
+
+def is_pending(path: str) -> bool:
+    with _lock:
+        return os.path.abspath(path) in _pending
+
+
+def wait(path: str, timeout: Optional[float] = None) -> str:
+    """Bloqueia até `path` estar gravado (se houver codificação pendente) e devolve o caminho."""
+    with _lock:
+        future = _pending.get(os.path.abspath(path))
+    if future is not None:
+        future.result(timeout=timeout)
+    return path
+
+
+def flush(timeout: Optional[float] = None) -> None:
+    """Espera todas as gravações pendentes; erros de codificação são propagados."""
+    with _lock:
+        futures = list(_pending.values())
+    for f in futures:
+        f.result(timeout=timeout)
+
+
+@atexit.register
+def _drain() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=True)
@@ -0,0 +1,71 @@
+import importlib
+import importlib.util
+import threading
+from typing import Any, Callable, Optional
+
+
+class LazyModule:
+    """Proxy de módulo: o import real só acontece no primeiro acesso a um atributo.
+
+    Permite declarar dependências pesadas (cv2, pyautogui, pytesseract...) no topo do
+    arquivo sem pagar o custo de import quando o módulo é apenas indexado ou validado.
+    """
+
+    def __init__(self, name: str, on_load: Optional[Callable[[Any], None]] = None):
+        self.__dict__["_name"] = name
+        self.__dict__["_on_load"] = on_load
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    def _load(self):
+        mod = self.__dict__["_module"]
+        if mod is not None:
+            return mod
+        with self.__dict__["_lock"]:
+            mod = self.__dict__["_module"]
+            if mod is None:
+                mod = importlib.import_module(self.__dict__["_name"])
+                on_load = self.__dict__["_on_load"]
+                if on_load is not None:
+                    on_load(mod)
+                self.__dict__["_module"] = mod
+        return mod
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value) -> None:
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "carregado" if self.__dict__["_module"] is not None else "não carregado"
+        return f"<LazyModule {self.__dict__['_name']} ({state})>"
+
+    @property
+    def loaded(self) -> bool:
+        return self.__dict__["_module"] is not None
+
+    @property
+    def available(self) -> bool:
+        """Indica se o módulo está instalado, sem importá-lo."""
+        if self.__dict__["_module"] is not None:
+            return True
+        try:
+            return importlib.util.find_spec(self.__dict__["_name"]) is not None
+        except (ImportError, ValueError):
+            return False
+
+
+def lazy_import(name: str, on_load: Optional[Callable[[Any], None]] = None) -> LazyModule:
+    return LazyModule(name, on_load=on_load)
+
+
+def _configure_pyautogui(mod) -> None:
+    mod.FAILSAFE = True
+
+
+def lazy_pyautogui() -> LazyModule:
+    return lazy_import("pyautogui", on_load=_configure_pyautogui)
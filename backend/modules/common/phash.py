@@ -0,0 +1,120 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from modules.common.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+# Hashes perceptuais de 64 bits para saber se uma captura mudou em relação às anteriores.
+# Distância de Hamming até ~4 costuma ser a mesma tela (ruído de render/antialias); mudança
+# real de número num dashboard já passa disso.
+ALGORITHMS = ("phash", "dhash")
+
+
+def _gray(image):
+    if isinstance(image, str):
+        # IMREAD_REDUCED_* decodifica já em 1/4 do tamanho; o hash é de 32x32 de qualquer forma.
+        img = cv2.imread(image, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+        if img is None:
+            raise OSError(f"Não foi possível ler a imagem {image}")
+        return img
+    if image.ndim == 3:
+        code = cv2.COLOR_BGRA2GRAY if image.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return cv2.cvtColor(image, code)
+    return image
+
+
+def _bits_to_int(bits) -> int:
+    value = 0
+    for b in bits.flatten():
+        value = (value << 1) | int(bool(b))
+    return value
+
+
+def dhash(image, size: int = 8) -> int:
+    small = cv2.resize(_gray(image), (size + 1, size), interpolation=cv2.INTER_AREA)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(image, size: int = 8) -> int:
+    small = cv2.resize(_gray(image), (size * 4, size * 4), interpolation=cv2.INTER_AREA)
+    coeffs = cv2.dct(np.float32(small))[:size, :size]
+    # ignora o termo DC, que só carrega o brilho médio
+    median = np.median(coeffs.flatten()[1:])
+    return _bits_to_int(coeffs > median)
+
+
+def image_hash(image, algorithm: str = "phash") -> int:
+    if algorithm not in ALGORITHMS:
+        raise ValueError(f"Algoritmo de hash desconhecido: {algorithm!r}")
+    return phash(image) if algorithm == "phash" else dhash(image)
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class CaptureIndex:
+    """Últimos hashes por chave (ex.: dashboard + período), persistidos num JSON ao lado das capturas.
+
+    Quem usa para pular envios repetidos só deve gravar (`add`) depois que o envio deu certo e
+    comparar com `latest`: o que importa é o que os destinatários receberam por último.
+    """
+
+    def __init__(self, path: str, keep: int = 20):
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, List[Dict[str, Any]]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self, data: Dict[str, List[Dict[str, Any]]]) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".part"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def latest(self, key: str, algorithm: str = "phash") -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._load().get(key, [])
+        for entry in reversed(entries):
+            if entry.get("algorithm", "phash") == algorithm:
+                return entry
+        return None
+
+    def add(self, key: str, value: int, algorithm: str = "phash", **meta: Any) -> None:
+        entry = {"hash": f"{value:016x}", "algorithm": algorithm, "at": datetime.now().isoformat(timespec="seconds"), **meta}
+        with self._lock:
+            data = self._load()
+            entries = data.setdefault(key, [])
+            if entries and entries[-1].get("hash") == entry["hash"] and entries[-1].get("algorithm") == algorithm:
+                # mesma captura registrada de novo (ex.: uma entrega por grupo): só atualiza
+                entries[-1] = entry
+            else:
+                entries.append(entry)
+            del entries[:-self.keep]
+            self._save(data)
+
+
+def sent_marker(index_path: str, key: str, value: int, algorithm: str = "phash", file: Optional[str] = None) -> Dict[str, Any]:
+    """Dados para gravar a captura no índice depois do envio (serializável: vai no resultado do run)."""
+    return {"indice": index_path, "chave": key, "hash": f"{value:016x}", "algoritmo": algorithm, "arquivo": file}
+
+
+def record_sent(marker: Optional[Dict[str, Any]]) -> None:
+    if not marker:
+        return
+    CaptureIndex(marker["indice"]).add(
+        marker["chave"], int(marker["hash"], 16), marker.get("algoritmo", "phash"), file=marker.get("arquivo"),
+    )
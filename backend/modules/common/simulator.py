@@ -0,0 +1,341 @@
+"""Gravação e replay de telas para testar/medir automações de desktop sem o aplicativo real.
+
+Uma gravação é um diretório com `recording.json` e um PNG por estado de tela:
+
+    {
+      "size": [1920, 1080],
+      "windows": ["DELPHOS.BI Principal"],
+      "initial": "login",
+      "states": {"login": {"frame": "login.png"}, ...},
+      "transitions": [
+        {"from": "login", "on": {"type": "press", "key": "enter"}, "to": "principal", "delay": 1.5},
+        {"from": "lista", "on": {"type": "click", "region": [x, y, w, h]}, "to": "detalhe"},
+        {"from": "carregando", "on": {"type": "wait"}, "to": "pronto", "delay": 3}
+      ]
+    }
+
+`delay` é o tempo (virtual) que a tela leva para mudar depois do evento, o que permite
+medir as esperas da automação.
+"""
+import hashlib
+import json
+import os
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from modules.common.drivers.base import Region, UIDriver, crop, to_bgr
+from modules.common.drivers.fake import FakeDriver
+from modules.common.lazy import lazy_import
+
+cv2 = lazy_import("cv2")
+np = lazy_import("numpy")
+
+RECORDING_FILE = "recording.json"
+
+
+def load_recording(path: str) -> Dict[str, Any]:
+    with open(os.path.join(path, RECORDING_FILE), "r", encoding="utf-8") as f:
+        rec = json.load(f)
+    rec["_dir"] = path
+    return rec
+
+
+def _matches(on: Dict[str, Any], event: Dict[str, Any]) -> bool:
+    if on.get("type") != event.get("type"):
+        return False
+    for key, expected in on.items():
+        if key in ("type", "region"):
+            continue
+        actual = event.get(key)
+        if isinstance(expected, str) and isinstance(actual, str):
+            if expected.lower() != actual.lower():
+                return False
+        elif expected != actual:
+            return False
+    region = on.get("region")
+    if region:
+        x, y, w, h = region
+        cx, cy = event.get("pos") or (-1, -1)
+        if not (x <= cx < x + w and y <= cy < y + h):
+            return False
+    return True
+
+
+class ReplayDriver(FakeDriver):
+    """Driver que responde às entradas trocando o frame conforme a gravação."""
+
+    name = "replay"
+
+    def __init__(self, recording: Dict[str, Any]):
+        width, height = recording.get("size") or (1920, 1080)
+        super().__init__(width=width, height=height, windows=recording.get("windows") or ())
+        self.recording = recording
+        self.state = recording["initial"]
+        self.history: List[str] = [self.state]
+        self._frames: Dict[str, Any] = {}
+        self._pending: Optional[Tuple[str, Any]] = None
+        self._entered_at = self.clock
+        self._by_state: Dict[str, List[Dict[str, Any]]] = {}
+        for t in recording.get("transitions") or []:
+            self._by_state.setdefault(t["from"], []).append(t)
+
+    @classmethod
+    def from_dir(cls, path: str) -> "ReplayDriver":
+        return cls(load_recording(path))
+
+    def _frame(self, state: str):
+        frame = self._frames.get(state)
+        if frame is None:
+            spec = self.recording["states"][state]
+            frame = spec.get("_image")
+            if frame is None:
+                frame = cv2.imread(os.path.join(self.recording["_dir"], spec["frame"]), cv2.IMREAD_COLOR)
+                if frame is None:
+                    raise FileNotFoundError(f"Frame do estado '{state}' não encontrado")
+            self._frames[state] = frame
+        return frame
+
+    def _enter(self, state: str) -> None:
+        self.state = state
+        self.history.append(state)
+        self._entered_at = self.clock
+        self._pending = None
+
+    def _advance(self) -> None:
+        # Aplica mudanças de tela cujo atraso já passou no relógio virtual.
+        while True:
+            if self._pending is not None:
+                target, ready_at = self._pending
+                if self.clock < ready_at:
+                    return
+                self._enter(target)
+                continue
+            timed = next((t for t in self._by_state.get(self.state, []) if t["on"].get("type") == "wait"), None)
+            if timed is None:
+                return
+            ready_at = self._entered_at + timedelta(seconds=float(timed.get("delay", 0)))
+            if self.clock < ready_at:
+                return
+            self._enter(timed["to"])
+
+    def _on_event(self, event: Dict[str, Any]) -> None:
+        self._advance()
+        if self._pending is not None:
+            return
+        for t in self._by_state.get(self.state, []):
+            if _matches(t["on"], event):
+                delay = float(t.get("delay", 0))
+                if delay:
+                    self._pending = (t["to"], self.clock + timedelta(seconds=delay))
+                else:
+                    self._enter(t["to"])
+                return
+
+    # --- tela --------------------------------------------------------------------
+    def capture(self, region: Optional[Region] = None):
+        self._advance()
+        self.events.append(("capture", tuple(region) if region else None))
+        return crop(self._frame(self.state), region)
+
+    def size(self) -> Tuple[int, int]:
+        h, w = self._frame(self.state).shape[:2]
+        return int(w), int(h)
+
+    # --- entrada -----------------------------------------------------------------
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, button: str = "left") -> None:
+        super().click(x, y, clicks=clicks, button=button)
+        self._on_event({"type": "click", "pos": self.cursor, "button": button})
+
+    def scroll(self, amount: int, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        super().scroll(amount, x, y)
+        self._on_event({"type": "scroll", "pos": self.cursor, "direction": "down" if amount < 0 else "up"})
+
+    def press(self, key: str) -> None:
+        super().press(key)
+        self._on_event({"type": "press", "key": key})
+
+    def hotkey(self, *keys: str) -> None:
+        self.events.append(("hotkey", keys))
+        self._on_event({"type": "hotkey", "keys": "+".join(keys)})
+
+    def type_text(self, text: str, interval: float = 0.0) -> None:
+        super().type_text(text, interval=interval)
+        self._on_event({"type": "type", "text": text})
+
+
+class RecordingDriver(UIDriver):
+    """Envolve um driver real e grava cada tela distinta e o evento que levou a ela."""
+
+    name = "recording"
+
+    def __init__(self, inner: UIDriver, out_dir: str):
+        self.inner = inner
+        self.out_dir = out_dir
+        os.makedirs(out_dir, exist_ok=True)
+        self.states: Dict[str, Dict[str, Any]] = {}
+        self.transitions: List[Dict[str, Any]] = []
+        self.windows: List[str] = []
+        self._state: Optional[str] = None
+        self._digest: Optional[str] = None
+        self._last_event: Optional[Tuple[Dict[str, Any], Any]] = None
+        self._changed_at = None
+        self._cursor: Optional[Tuple[int, int]] = None
+        self._size: Optional[Tuple[int, int]] = None
+
+    def _record_event(self, event: Dict[str, Any]) -> None:
+        self._last_event = (event, self.inner.now())
+
+    def capture(self, region: Optional[Region] = None):
+        frame = to_bgr(self.inner.capture())
+        digest = hashlib.sha1(frame.tobytes()).hexdigest()
+        if digest != self._digest:
+            name = f"s{len(self.states):03d}"
+            cv2.imwrite(os.path.join(self.out_dir, f"{name}.png"), frame)
+            self.states[name] = {"frame": f"{name}.png"}
+            if self._state is not None:
+                if self._last_event is not None:
+                    event, at = self._last_event
+                    delay = max(0.0, (self.inner.now() - at).total_seconds())
+                else:
+                    event, delay = {"type": "wait"}, max(0.0, (self.inner.now() - self._changed_at).total_seconds())
+                on = {k: v for k, v in event.items() if k != "pos"}
+                if event.get("pos") is not None:
+                    cx, cy = event["pos"]
+                    on["region"] = [cx - 5, cy - 5, 10, 10]
+                self.transitions.append({"from": self._state, "on": on, "to": name, "delay": round(delay, 3)})
+            self._state, self._digest = name, digest
+            self._changed_at = self.inner.now()
+            self._last_event = None
+            self._size = (frame.shape[1], frame.shape[0])
+        return crop(frame, region)
+
+    def size(self) -> Tuple[int, int]:
+        return self.inner.size()
+
+    def move_to(self, x: int, y: int, duration: float = 0.0) -> None:
+        self.inner.move_to(x, y, duration=duration)
+        self._cursor = (int(x), int(y))
+
+    def click(self, x: Optional[int] = None, y: Optional[int] = None, clicks: int = 1, button: str = "left") -> None:
+        self.inner.click(x, y, clicks=clicks, button=button)
+        pos = (int(x), int(y)) if x is not None and y is not None else self._cursor
+        self._record_event({"type": "click", "pos": pos, "button": button})
+
+    def scroll(self, amount: int, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        self.inner.scroll(amount, x, y)
+        self._record_event({"type": "scroll", "direction": "down" if amount < 0 else "up"})
+
+    def key_down(self, key: str) -> None:
+        self.inner.key_down(key)
+
+    def key_up(self, key: str) -> None:
+        self.inner.key_up(key)
+
+    def press(self, key: str) -> None:
+        self.inner.press(key)
+        self._record_event({"type": "press", "key": key})
+
+    def hotkey(self, *keys: str) -> None:
+        self.inner.hotkey(*keys)
+        self._record_event({"type": "hotkey", "keys": "+".join(keys)})
+
+    def type_text(self, text: str, interval: float = 0.0) -> None:
+        self.inner.type_text(text, interval=interval)
+        # Não grava o texto digitado: pode ser uma senha.
+        self._record_event({"type": "type"})
+
+    def focus_window(self, title: str, timeout: float = 8) -> bool:
+        ok = self.inner.focus_window(title, timeout=timeout)
+        if ok and title not in self.windows:
+            self.windows.append(title)
+        return ok
+
+    def sleep(self, seconds: float) -> None:
+        self.inner.sleep(seconds)
+
+    def now(self):
+        return self.inner.now()
+
+    def save(self) -> str:
+        if not self.states:
+            raise RuntimeError("Nenhuma tela capturada; nada para salvar")
+        rec = {
+            "size": list(self._size or self.inner.size()),
+            "windows": self.windows,
+            "initial": "s000",
+            "states": self.states,
+            "transitions": self.transitions,
+        }
+        path = os.path.join(self.out_dir, RECORDING_FILE)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(rec, f, ensure_ascii=False, indent=2)
+        return path
+
+
+# --- gravação sintética do fluxo do dashboard comercial ------------------------------
+
+def _canvas(size: Tuple[int, int], color: int = 40):
+    w, h = size
+    return np.full((h, w, 3), color, dtype=np.uint8)
+
+
+def _paste(frame, image, x: int, y: int):
+    h, w = image.shape[:2]
+    h = min(h, frame.shape[0] - y)
+    w = min(w, frame.shape[1] - x)
+    frame[y:y + h, x:x + w] = image[:h, :w, :3]
+    return frame
+
+
+def dashboard_recording(images_dir: str, dashboard_image: str = "comercial_2024_2025.png",
+                        size: Tuple[int, int] = (1920, 1080)) -> Dict[str, Any]:
+    """Monta em memória uma gravação do fluxo login → F11 → Planilhas → dashboard → relatório
+    a partir das imagens de referência do módulo (sem precisar do DELPHOS.BI)."""
+
+    def img(name):
+        im = cv2.imread(os.path.join(images_dir, name), cv2.IMREAD_COLOR)
+        if im is None:
+            raise FileNotFoundError(os.path.join(images_dir, name))
+        return im
+
+    dash = img(dashboard_image)
+    menus = [img(n) for n in ("menu_cadastros.png", "menu_parametros_sistema.png")]
+
+    login = _canvas(size, 90)
+    principal = _canvas(size)
+    x = 10
+    for m in menus:
+        _paste(principal, m, x, 5)
+        x += m.shape[1] + 10
+    parametros = _paste(principal.copy(), img("menu_planilhas.png"), 10, 60)
+    planilhas = _paste(_canvas(size, 230), img("menu_geradores_deshboards.png"), 10, 5)
+    grid_y = 150
+    planilhas_dash = _paste(planilhas.copy(), dash, 2, grid_y)
+    relatorio = _paste(_canvas(size, 255), dash, 2, 40)
+    dash_region = [2, grid_y, min(dash.shape[1], size[0] - 2), min(dash.shape[0], size[1] - grid_y)]
+
+    states = {
+        "login": {"_image": login},
+        "principal": {"_image": principal},
+        "parametros": {"_image": parametros},
+        "planilhas": {"_image": planilhas},
+        "planilhas_dashboard": {"_image": planilhas_dash},
+        "dashboard_selecionado": {"_image": planilhas_dash},
+        "relatorio": {"_image": relatorio},
+    }
+    transitions = [
+        {"from": "login", "on": {"type": "press", "key": "enter"}, "to": "principal", "delay": 2.0},
+        {"from": "principal", "on": {"type": "press", "key": "f11"}, "to": "parametros", "delay": 1.0},
+        {"from": "parametros", "on": {"type": "press", "key": "enter"}, "to": "planilhas", "delay": 1.5},
+        {"from": "planilhas", "on": {"type": "scroll", "direction": "down"}, "to": "planilhas_dashboard", "delay": 0.3},
+        {"from": "planilhas_dashboard", "on": {"type": "click", "region": dash_region}, "to": "dashboard_selecionado"},
+        {"from": "dashboard_selecionado", "on": {"type": "press", "key": "X"}, "to": "relatorio", "delay": 8.0},
+    ]
+    return {
+        "size": list(size),
+        "windows": ["Acesso - DELPHOS.BI", "DELPHOS.BI Principal"],
+        "initial": "login",
+        "states": states,
+        "transitions": transitions,
+        "_dir": images_dir,
+    }
@@ -0,0 +1,64 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+
+class StepRecorder:
+    """Acumula a duração de cada etapa (locate, ocr, wait...) de uma execução."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.samples.setdefault(name, []).append(float(seconds))
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        out: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            items = {k: sorted(v) for k, v in self.samples.items()}
+        for name, values in items.items():
+            n = len(values)
+            out[name] = {
+                "count": n,
+                "total_ms": sum(values) * 1000,
+                "mean_ms": sum(values) / n * 1000,
+                "p50_ms": values[n // 2] * 1000,
+                "p95_ms": values[min(n - 1, int(n * 0.95))] * 1000,
+                "max_ms": values[-1] * 1000,
+            }
+        return out
+
+
+_active: Optional[StepRecorder] = None
+
+
+def add(name: str, seconds: float) -> None:
+    recorder = _active
+    if recorder is not None:
+        recorder.add(name, seconds)
+
+
+@contextmanager
+def step(name: str):
+    if _active is None:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        add(name, time.perf_counter() - t0)
+
+
+@contextmanager
+def recording(recorder: Optional[StepRecorder] = None):
+    global _active
+    previous = _active
+    _active = recorder or StepRecorder()
+    try:
+        yield _active
+    finally:
+        _active = previous
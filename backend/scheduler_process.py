@@ -5,6 +5,10 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 from app.db import database, crud
 from app.services.queue import queue
+from app.services.concurrency import can_dispatch
+from app.services.dedup import submit_run
+from app.services import artifacts, run_archive
+from app.core.config import settings
 
 log = logging.getLogger("scheduler")
 
@@ -31,7 +35,21 @@ for handler in logging.getLogger().handlers:
 
 def _poll_schedules_loop():
     log.info("Iniciando o loop de polling do scheduler...")
+    last_maintenance = 0.0
+    last_retention = 0.0
     while True:
+        if time.monotonic() - last_retention >= settings.RUN_RETENTION_INTERVAL_SEC:
+            last_retention = time.monotonic()
+            try:
+                run_archive.run_retention()
+            except Exception as e:
+                log.error(f"Erro na retenção do histórico de runs: {e}", exc_info=True)
+        if time.monotonic() - last_maintenance >= settings.ARTIFACT_GC_INTERVAL_SEC:
+            last_maintenance = time.monotonic()
+            try:
+                artifacts.run_maintenance()
+            except Exception as e:
+                log.error(f"Erro na manutenção de artefatos: {e}", exc_info=True)
         db: Session = database.SessionLocal()
         try:
             schedules = crud.get_due_schedules(db)
@@ -39,15 +57,21 @@ def _poll_schedules_loop():
                 log.info(f"Encontrados {len(schedules)} agendamentos para executar.")
             for schedule in schedules:
                 try:
+                    if not can_dispatch(db, schedule.automation_id):
+                        log.info(f"Agendamento {schedule.id} adiado: automação {schedule.automation_id} já está no limite de execuções simultâneas")
+                        crud.update_schedule_next_run(db, schedule.id)
+                        continue
                     log.info(f"Enfileirando job para o agendamento {schedule.id} (automação {schedule.automation_id})")
-                    run = crud.create_run(
+                    run, created = submit_run(
                         db,
                         automation_id=schedule.automation_id,
                         user_id=schedule.owner_id if schedule.owner_type == 'user' else None,
-                        status="queued",
-                        payload=schedule.payload or {},
+                        payload=getattr(schedule, "payload", None) or {},
                     )
-                    queue.enqueue("app.worker.process_run", {"run_id": str(run.id), "user_id": str(run.user_id)})
+                    if created:
+                        queue.enqueue("app.worker.process_run", {"run_id": str(run.id), "user_id": str(run.user_id)})
+                    else:
+                        log.info(f"Agendamento {schedule.id}: run idêntico {run.id} ainda pendente; nada enfileirado")
                     crud.update_schedule_next_run(db, schedule.id)
                 except Exception as e:
                     log.error(f"Erro ao processar agendamento {schedule.id}: {e}", exc_info=True)
@@ -0,0 +1,41 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+import pytest
+from app.core.config import settings
+from app.services import artifacts
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    root = tmp_path / "store"
+    monkeypatch.setattr(settings, "ARTIFACTS_ROOT", str(root))
+    return root
+
+def _write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+def test_put_file_dedups_identical_content(tmp_path, store):
+    data = os.urandom(200_000)
+    sha1, size1 = artifacts.put_file(_write(tmp_path / "a.png", data))
+    sha2, size2 = artifacts.put_file(_write(tmp_path / "b.png", data))
+    assert sha1 == sha2 and size1 == size2 == len(data)
+    blobs = [f for _, _, files in os.walk(store) for f in files]
+    assert blobs == [sha1]
+    with open(artifacts.blob_path(sha1), "rb") as f:
+        assert f.read() == data
+
+def test_parse_range():
+    assert artifacts.parse_range(None, 100) is None
+    assert artifacts.parse_range("bytes=0-9", 100) == (0, 9)
+    assert artifacts.parse_range("bytes=90-", 100) == (90, 99)
+    assert artifacts.parse_range("bytes=-10", 100) == (90, 99)
+    assert artifacts.parse_range("bytes=50-500", 100) == (50, 99)
+    with pytest.raises(ValueError):
+        artifacts.parse_range("bytes=100-", 100)
+
+def test_iter_file_slices(tmp_path):
+    data = bytes(range(256)) * 1024
+    path = _write(tmp_path / "blob", data)
+    assert b"".join(artifacts.iter_file(path)) == data
+    assert b"".join(artifacts.iter_file(path, 1000, 70_000)) == data[1000:70_001]
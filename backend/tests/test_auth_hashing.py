@@ -0,0 +1,73 @@
+import sys
+import os
+import asyncio
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from passlib.context import CryptContext
+from app.core import password_pool, security
+from app.services import rate_limit
+
+def test_verify_and_update_rehashes_weaker_rounds():
+    old = CryptContext(schemes=["bcrypt_sha256"], bcrypt_sha256__rounds=4).hash("segredo")
+    ok, new_hash = security.verify_and_update("segredo", old)
+    assert ok and new_hash and new_hash != old
+    assert security.verify_password("segredo", new_hash)
+    assert security.verify_and_update("segredo", new_hash) == (True, None)
+
+def test_verify_and_update_rejects_wrong_password_and_missing_user():
+    stored = security.hash_password("segredo")
+    assert security.verify_and_update("outra", stored) == (False, None)
+    assert security.verify_and_update("segredo", None) == (False, None)
+
+def test_pool_verifies_off_the_event_loop():
+    stored = security.hash_password("segredo")
+    try:
+        ok, new_hash = asyncio.run(password_pool.verify_and_update("segredo", stored))
+    finally:
+        password_pool.shutdown()
+    assert ok and new_hash is None
+
+def test_login_bucket_blocks_after_burst_on_any_key():
+    fakeredis = pytest.importorskip("fakeredis")
+    conn = fakeredis.FakeRedis()
+    keys = rate_limit.login_keys("10.0.0.1", "Ana@Empresa.com")
+    assert keys[1].endswith("ana@empresa.com")
+    for _ in range(3):
+        assert rate_limit.take(keys, 1 / 60.0, 3, conn=conn) == (True, 0)
+    allowed, retry_after = rate_limit.take(keys, 1 / 60.0, 3, conn=conn)
+    assert not allowed and 0 < retry_after <= 60
+    # outro IP tentando o mesmo e-mail também é barrado
+    assert not rate_limit.take(rate_limit.login_keys("10.0.0.2", "ana@empresa.com"), 1 / 60.0, 3, conn=conn)[0]
+
+def test_rate_limit_fails_open_when_redis_is_down():
+    class Broken:
+        def register_script(self, _):
+            raise ConnectionError("redis fora")
+    assert rate_limit.take(["k"], 1.0, 1, conn=Broken()) == (True, 0)
+
+def test_register_hashes_through_the_bounded_pool(monkeypatch):
+    import types
+    from fastapi import HTTPException
+    from app.api.routes import auth
+    created = []
+    monkeypatch.setattr(auth.crud, "get_user_by_email", lambda db, email: None)
+    monkeypatch.setattr(
+        auth.crud, "create_user",
+        lambda db, name, email, pwd, role: created.append((email, pwd, role)) or types.SimpleNamespace(id="u1"),
+    )
+    data = auth.RegisterIn(name="Ana", email="Ana@Empresa.com", password="segredo", role="admin")
+
+    async def busy(_):
+        raise password_pool.HashingBusy()
+
+    monkeypatch.setattr(password_pool, "hash_password", busy)
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(auth.register(data, db=None))
+    assert exc.value.status_code == 503 and not created
+
+    async def fake_hash(plain):
+        return f"hash:{plain}"
+
+    monkeypatch.setattr(password_pool, "hash_password", fake_hash)
+    assert asyncio.run(auth.register(data, db=None)) == {"ok": True, "user_id": "u1"}
+    assert created == [("ana@empresa.com", "hash:segredo", "admin")]
@@ -0,0 +1,56 @@
+import sys
+import os
+import types
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.core import automation_loader as al
+
+def _fake_module(monkeypatch):
+    mod = types.ModuleType("fake_automation")
+    calls = []
+
+    def no_args():
+        calls.append("no_args")
+        return {"ok": True}
+
+    def with_payload(payload):
+        return payload
+
+    def with_kwargs(**payload):
+        return payload
+
+    def with_ctx(ctx, dashboard=None):
+        return ctx, dashboard
+
+    async def async_payload(payload):
+        return {"async": payload}
+
+    def keyword_only(*, dashboard, _secrets=None):
+        return dashboard, _secrets
+
+    for fn in (no_args, with_payload, with_kwargs, with_ctx, async_payload, keyword_only):
+        setattr(mod, fn.__name__, fn)
+    monkeypatch.setitem(sys.modules, mod.__name__, mod)
+    return mod, calls
+
+def test_conventions(monkeypatch):
+    _, calls = _fake_module(monkeypatch)
+    assert al.call_automation("fake_automation", "no_args", {"x": 1}) == {"ok": True}
+    assert calls == ["no_args"]
+    assert al.call_automation("fake_automation", "with_payload", {"x": 1}) == {"x": 1}
+    assert al.call_automation("fake_automation", "with_kwargs", {"x": 1}) == {"x": 1}
+    assert al.call_automation("fake_automation", "with_ctx", {"dashboard": "a"}, {"db": None}) == ({"db": None}, "a")
+    assert al.call_automation("fake_automation", "async_payload", {"x": 1}) == {"async": {"x": 1}}
+
+def test_dispatch_is_cached_per_module(monkeypatch):
+    _fake_module(monkeypatch)
+    first = al.get_dispatch("fake_automation:with_payload")
+    assert al.get_dispatch("fake_automation", "with_payload") is first
+    _fake_module(monkeypatch)
+    assert al.get_dispatch("fake_automation", "with_payload") is not first
+
+def test_keyword_only_function_skips_undeclared_injected_keys(monkeypatch):
+    _fake_module(monkeypatch)
+    payload = {"dashboard": "a", "_workspace": "/tmp/ws", "_secrets": {"TOKEN": "x"}, "_user_id": "1"}
+    assert al.call_automation("fake_automation", "keyword_only", payload) == ("a", {"TOKEN": "x"})
+    # com **kwargs tudo continua chegando
+    assert al.call_automation("fake_automation", "with_kwargs", payload) == payload
@@ -0,0 +1,108 @@
+import sys
+import os
+import time
+import types
+import uuid
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+fakeredis = pytest.importorskip("fakeredis")
+from app.services import concurrency
+
+@pytest.fixture
+def redis(monkeypatch):
+    conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(concurrency, "redis_conn", conn)
+    monkeypatch.setattr(concurrency, "_acquire_script", conn.register_script(concurrency._ACQUIRE_LUA))
+    monkeypatch.setattr(concurrency, "_renew_script", conn.register_script(concurrency._RENEW_LUA))
+    return conn
+
+def _automation(max_concurrent=None, resource=None):
+    return types.SimpleNamespace(
+        id=uuid.uuid4(),
+        module_path="modules.inexistente",
+        func_name="run",
+        max_concurrent=max_concurrent,
+        exclusive_resource=resource,
+    )
+
+def test_acquire_respects_limit_and_release_frees_slot(redis):
+    auto = _automation(max_concurrent=2)
+    first = concurrency.try_acquire(auto, "r1")
+    second = concurrency.try_acquire(auto, "r2")
+    assert first and second
+    assert concurrency.try_acquire(auto, "r3") is None
+    first.release()
+    third = concurrency.try_acquire(auto, "r3")
+    assert third is not None
+    second.release()
+    third.release()
+    assert redis.zcard(concurrency._automation_key(auto.id)) == 0
+
+def test_acquire_is_all_or_nothing_across_keys(redis):
+    desktop = concurrency.try_acquire_resource("desktop", "outro")
+    auto = _automation(max_concurrent=5, resource="desktop")
+    assert concurrency.try_acquire(auto, "r1") is None
+    # o slot da automação não pode ter ficado ocupado pela tentativa que falhou
+    assert redis.zcard(concurrency._automation_key(auto.id)) == 0
+    desktop.release()
+    lease = concurrency.try_acquire(auto, "r1")
+    assert lease is not None
+    lease.release()
+
+def test_same_token_reacquires_its_own_slot(redis):
+    auto = _automation(resource="desktop")
+    lease = concurrency.try_acquire(auto, "r1")
+    again = concurrency.try_acquire(auto, "r1")
+    assert lease and again
+    lease.release()
+
+def test_expired_lease_of_dead_worker_is_reclaimed(redis):
+    key = concurrency._resource_key("desktop")
+    now = time.time()
+    # worker que morreu: lease vencido e sem heartbeat
+    assert concurrency._acquire_script(keys=[key], args=[now - 100, now - 1, 10, "morto", 1]) == 1
+    lease = concurrency.try_acquire_resource("desktop", "vivo")
+    assert lease is not None
+    assert redis.zscore(key, "morto") is None
+    lease.release()
+
+def test_heartbeat_renews_only_owned_leases(redis):
+    key = concurrency._resource_key("desktop")
+    lease = concurrency.try_acquire_resource("desktop", "r1")
+    before = redis.zscore(key, "r1")
+    renewed = concurrency._renew_script(keys=[key], args=[before + 30, 60, "r1"])
+    assert int(renewed) == 1 and redis.zscore(key, "r1") == before + 30
+    assert int(concurrency._renew_script(keys=[key], args=[before + 30, 60, "estranho"])) == 0
+    assert redis.zscore(key, "estranho") is None
+    lease.release()
+
+def test_automation_without_limits_gets_empty_lease(redis):
+    lease = concurrency.try_acquire(_automation(), "r1")
+    assert lease is not None and lease.keys == []
+    lease.release()
+
+def test_can_dispatch_skips_when_at_limit(monkeypatch):
+    auto = _automation(max_concurrent=2)
+    active = {"n": 2}
+    monkeypatch.setattr(concurrency.crud, "get_automation_by_id", lambda db, aid: auto)
+    monkeypatch.setattr(concurrency.crud, "count_active_runs", lambda db, aid: active["n"])
+    assert concurrency.can_dispatch(None, auto.id) is False
+    active["n"] = 1
+    assert concurrency.can_dispatch(None, auto.id) is True
+    auto.max_concurrent = None
+    active["n"] = 99
+    assert concurrency.can_dispatch(None, auto.id) is True
+    monkeypatch.setattr(concurrency.crud, "get_automation_by_id", lambda db, aid: None)
+    assert concurrency.can_dispatch(None, auto.id) is True
+
+def test_defer_run_gives_up_after_max_deferrals(monkeypatch):
+    from app import worker
+    from app.services import queue as queue_mod
+    enqueued = []
+    monkeypatch.setattr(queue_mod, "queue", types.SimpleNamespace(enqueue_in=lambda delay, fn, payload: enqueued.append(payload)))
+    monkeypatch.setattr(worker.settings, "CONCURRENCY_MAX_DEFERRALS", 2)
+    assert worker._defer_run({"run_id": "r1"}) is True
+    assert worker._defer_run(enqueued[-1]) is True and enqueued[-1]["deferrals"] == 2
+    assert worker._defer_run(enqueued[-1]) is False and len(enqueued) == 2
+    monkeypatch.setattr(worker.settings, "CONCURRENCY_MAX_DEFERRALS", 0)
+    assert worker._defer_run({"run_id": "r1", "deferrals": 500}) is True
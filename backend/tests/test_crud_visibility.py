@@ -0,0 +1,124 @@
+import sys
+import os
+import uuid
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sqlalchemy import create_engine
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+from app.db import crud, models
+
+# o SQLite não tem JSONB; para estes testes basta guardar como JSON
+@compiles(JSONB, "sqlite")
+def _jsonb_as_json(type_, compiler, **kw):
+    return "JSON"
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    for model in (models.User, models.Sector, models.SectorMember, models.Automation, models.Schedule):
+        model.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def _user(db, name, role="operator"):
+    user = models.User(name=name, email=f"{name}@empresa.com", password="x", role=role)
+    db.add(user)
+    db.flush()
+    return user
+
+def _sector(db, name, members=()):
+    sector = models.Sector(name=name)
+    db.add(sector)
+    db.flush()
+    for user, role in members:
+        db.add(models.SectorMember(sector_id=sector.id, user_id=user.id, role=role))
+    return sector
+
+def _automation(db, name, owner_type, owner_id):
+    auto = models.Automation(
+        name=name, module_path="modules.x", func_name="run", owner_type=owner_type, owner_id=owner_id,
+        default_payload={}, config_schema={},
+    )
+    db.add(auto)
+    db.flush()
+    return auto
+
+@pytest.fixture
+def org(db):
+    people = {name: _user(db, name) for name in ("gerente", "operador", "estranho")}
+    people["admin"] = _user(db, "admin", role="admin")
+    vendas = _sector(db, "Vendas", [(people["gerente"], "manager"), (people["operador"], "operator")])
+    compras = _sector(db, "Compras", [(people["gerente"], "operator")])
+    _sector(db, "RH")
+    autos = {
+        "vendas": _automation(db, "vendas", "sector", vendas.id),
+        "compras": _automation(db, "compras", "sector", compras.id),
+        "do_operador": _automation(db, "do_operador", "user", people["operador"].id),
+        "do_estranho": _automation(db, "do_estranho", "user", people["estranho"].id),
+    }
+    db.commit()
+    return people, autos
+
+def _names(rows):
+    return {a.name for a in rows}
+
+def test_list_automations_for_user_visibility(db, org):
+    people, _ = org
+    assert _names(crud.list_automations_for_user(db, people["admin"].id)) == {"vendas", "compras", "do_operador", "do_estranho"}
+    # manager em algum setor vê as automações de todos os setores de que participa
+    assert _names(crud.list_automations_for_user(db, people["gerente"].id)) == {"vendas", "compras"}
+    # membro sem ser manager vê só as próprias
+    assert _names(crud.list_automations_for_user(db, people["operador"].id)) == {"do_operador"}
+    assert _names(crud.list_automations_for_user(db, people["estranho"].id)) == {"do_estranho"}
+    assert crud.list_automations_for_user(db, "nao-e-uuid") == []
+
+def test_list_automations_for_user_loads_sector_in_the_same_query(db, org):
+    people, _ = org
+    rows = crud.list_automations_for_user(db, people["admin"].id)
+    db.expunge_all()
+    # com a sessão vazia, um lazy load falharia; o setor já veio no SELECT
+    sectors = {a.name: (a.sector.name if a.sector else None) for a in rows}
+    assert sectors == {"vendas": "Vendas", "compras": "Compras", "do_operador": None, "do_estranho": None}
+
+def _schedules(db, autos, per_automation=3):
+    for auto in autos.values():
+        for _ in range(per_automation):
+            db.add(models.Schedule(
+                automation_id=auto.id, owner_type=auto.owner_type, owner_id=auto.owner_id, type="interval",
+                interval_seconds=60,
+            ))
+    db.commit()
+
+def _schedule_names(rows):
+    return sorted(name for _, name, _, _ in rows)
+
+def test_list_schedules_for_user_permissions(db, org):
+    people, autos = org
+    _schedules(db, autos, per_automation=1)
+    assert _schedule_names(crud.list_schedules_for_user(db, people["admin"].id, is_admin=True)) == [
+        "compras", "do_estranho", "do_operador", "vendas",
+    ]
+    # aqui vale só o setor em que ele é manager, como nas rotas de escrita
+    assert _schedule_names(crud.list_schedules_for_user(db, people["gerente"].id)) == ["vendas"]
+    assert _schedule_names(crud.list_schedules_for_user(db, people["operador"].id)) == ["do_operador"]
+    assert _schedule_names(crud.list_schedules_for_user(db, people["estranho"].id)) == ["do_estranho"]
+    only = crud.list_schedules_for_user(db, people["admin"].id, is_admin=True, automation_id=autos["vendas"].id)
+    assert _schedule_names(only) == ["vendas"]
+    schedule, name, owner_type, owner_id = only[0]
+    assert schedule.automation_id == autos["vendas"].id and owner_type == "sector" and owner_id == autos["vendas"].owner_id
+
+def test_list_schedules_for_user_paginates_without_overlap(db, org):
+    people, autos = org
+    _schedules(db, autos, per_automation=3)
+    pages = [
+        crud.list_schedules_for_user(db, people["admin"].id, is_admin=True, limit=5, offset=offset)
+        for offset in (0, 5, 10)
+    ]
+    assert [len(p) for p in pages] == [5, 5, 2]
+    ids = [s.id for page in pages for s, _, _, _ in page]
+    assert len(set(ids)) == 12
+    # o filtro de permissão vem antes da paginação: o gerente só tem os 3 de "vendas"
+    assert len(crud.list_schedules_for_user(db, people["gerente"].id, limit=2, offset=2)) == 1
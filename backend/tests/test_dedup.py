@@ -0,0 +1,43 @@
+import sys
+import os
+import types
+import uuid
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+fakeredis = pytest.importorskip("fakeredis")
+from app.services import dedup
+
+@pytest.fixture
+def runs(monkeypatch):
+    conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(dedup, "redis_conn", conn)
+    monkeypatch.setattr(dedup, "_release_script", conn.register_script(dedup._RELEASE_LUA))
+    store = {}
+
+    def create_run(db, automation_id, user_id, status, payload):
+        run = types.SimpleNamespace(id=uuid.uuid4(), automation_id=automation_id, user_id=user_id, status=status, payload=payload)
+        store[str(run.id)] = run
+        return run
+
+    monkeypatch.setattr(dedup.crud, "create_run", create_run)
+    monkeypatch.setattr(dedup.crud, "get_run", lambda db, run_id: store.get(str(run_id)))
+    return store
+
+def test_same_user_and_payload_attaches_to_pending_run(runs):
+    auto, user = uuid.uuid4(), uuid.uuid4()
+    first, created = dedup.submit_run(None, automation_id=auto, user_id=user, payload={"a": 1})
+    again, created_again = dedup.submit_run(None, automation_id=auto, user_id=user, payload={"a": 1, "_x": 2})
+    assert created and not created_again and again is first
+
+def test_other_user_never_attaches_to_someone_elses_run(runs):
+    auto = uuid.uuid4()
+    mine, _ = dedup.submit_run(None, automation_id=auto, user_id=uuid.uuid4(), payload={"a": 1})
+    theirs, created = dedup.submit_run(None, automation_id=auto, user_id=uuid.uuid4(), payload={"a": 1})
+    assert created and theirs is not mine
+
+def test_release_frees_the_key_for_a_new_run(runs):
+    auto, user = uuid.uuid4(), uuid.uuid4()
+    first, _ = dedup.submit_run(None, automation_id=auto, user_id=user, payload={})
+    dedup.release(auto, user, {}, first.id)
+    second, created = dedup.submit_run(None, automation_id=auto, user_id=user, payload={})
+    assert created and second is not first
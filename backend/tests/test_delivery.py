@@ -0,0 +1,128 @@
+import sys
+import os
+import time
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services import delivery
+from app.services.retry import RetryPolicy
+from whatsapp_stub import WhatsAppStub
+
+@pytest.fixture
+def stub():
+    with WhatsAppStub(latency=0.05) as s:
+        yield s
+
+def _backend(stub, concurrency=4):
+    return delivery.CloudAPIBackend(base_url=stub.url, phone_number_id="123", token="t", max_concurrency=concurrency)
+
+def test_batch_uploads_media_once_and_sends_concurrently(stub, tmp_path):
+    image = tmp_path / "dash.png"
+    image.write_bytes(b"\x89PNG" + os.urandom(2048))
+    numbers = [f"+55 41 9{i:04d}-0000" for i in range(20)]
+    backend = _backend(stub)
+    t0 = time.perf_counter()
+    results = delivery.send_batch(backend, numbers, "Relatório", str(image), rate_per_sec=0)
+    elapsed = time.perf_counter() - t0
+    backend.close()
+    assert all(r["ok"] for r in results) and len(results) == 20
+    assert len(stub.uploads) == 1 and stub.uploads[0]["size"] > 2048
+    media_ids = {m["image"]["id"] for m in stub.messages}
+    assert media_ids == {stub.uploads[0]["id"]}
+    assert {m["to"] for m in stub.messages} == {delivery.normalize_recipient(n) for n in numbers}
+    assert elapsed < 20 * 0.05
+
+def test_throttled_recipient_is_retried_and_bad_one_fails(stub):
+    stub.throttle["5541900000001"] = 2
+    backend = _backend(stub)
+    sleeps = []
+    results = delivery.send_batch(
+        backend,
+        ["5541900000001", "5541900000002", "abc"],
+        "oi",
+        policy=RetryPolicy(max_attempts=3, backoff_sec=0.01, jitter=0),
+        rate_per_sec=0,
+        sleep=sleeps.append,
+    )
+    backend.close()
+    by_number = {r["recipient"]: r for r in results}
+    assert by_number["5541900000001"]["ok"] and by_number["5541900000001"]["attempts"] == 3
+    assert by_number["5541900000002"]["attempts"] == 1
+    assert len(results) == 2  # "abc" normaliza para vazio e é descartado
+    assert sleeps == [0.0, 0.0]
+
+def test_token_bucket_spaces_requests():
+    now = [0.0]
+    bucket = delivery.TokenBucket(rate=2, capacity=1, clock=lambda: now[0])
+    bucket.acquire()
+    assert bucket._tokens == 0
+    now[0] += 0.5
+    bucket.acquire()
+    assert bucket._tokens == 0
+
+def test_delivery_groups_from_result():
+    result = {"ok": True, "screenshot": "/x/a.png", "entrega": {"destinatarios": ["1"], "mensagem": "m"}}
+    assert delivery.delivery_groups(result) == [{
+        "group_name": None, "channel": "whatsapp", "backend": None,
+        "recipients": ["1"], "message": "m", "media_path": "/x/a.png",
+        "media_name": "a.png", "media_type": "image/png", "sent_marker": None,
+    }]
+    result["entrega"] = {
+        "canal_backend": "clipboard",
+        "mensagem": "m",
+        "grupos": [{"nome": "a", "destinatarios": ["1", "2"]}, {"nome": "b", "destinatarios": []}, {"nome": "c", "destinatarios": ["3"], "mensagem": "x"}],
+    }
+    groups = delivery.delivery_groups(result)
+    assert [(g["group_name"], g["message"], g["backend"]) for g in groups] == [("a", "m", "clipboard"), ("c", "x", "clipboard")]
+    assert delivery.delivery_groups({"ok": True}) == []
+
+def test_ingested_media_keeps_its_name_and_type(stub, tmp_path):
+    # depois de ingest_result o screenshot aponta para o blob, sem extensão
+    sha = "ab" * 32
+    blob = tmp_path / sha
+    blob.write_bytes(b"RIFF0000WEBP" + os.urandom(512))
+    result = {
+        "ok": True,
+        "screenshot": str(blob),
+        "artifacts": [{"name": "screenshot.webp", "sha256": sha, "content_type": "image/webp"}],
+        "entrega": {"destinatarios": ["5541900000001"]},
+    }
+    [group] = delivery.delivery_groups(result)
+    assert (group["media_name"], group["media_type"]) == ("screenshot.webp", "image/webp")
+    backend = _backend(stub)
+    results = delivery.send_batch(
+        backend, group["recipients"], None, group["media_path"],
+        media_name=group["media_name"], media_type=group["media_type"], rate_per_sec=0,
+    )
+    backend.close()
+    assert results[0]["ok"]
+    assert stub.uploads[0]["filename"] == "screenshot.webp" and stub.uploads[0]["content_type"] == "image/webp"
+
+class _OneShotBackend(delivery.DeliveryBackend):
+    name = "fake"
+
+    def __init__(self, fail):
+        self.fail = fail
+
+    def send(self, recipient, message, media=None):
+        if self.fail:
+            raise delivery.DeliveryError("recusado")
+        return {}
+
+@pytest.mark.parametrize("fail", [False, True])
+def test_capture_marker_is_recorded_only_after_a_sent_delivery(monkeypatch, fail):
+    import types
+    from app.db import crud, database
+    row = types.SimpleNamespace(
+        id="d1", run_id="r1", backend="fake", status="queued", attempts=0, recipients=["5541900000001"],
+        message=None, media_path=None, media_name=None, media_type=None,
+        sent_marker={"chave": "dash"}, results=None, error=None, started_at=None, finished_at=None,
+    )
+    recorded = []
+    monkeypatch.setattr(crud, "get_delivery", lambda db, delivery_id: row)
+    monkeypatch.setattr(database, "SessionLocal", lambda: types.SimpleNamespace(commit=lambda: None, close=lambda: None))
+    monkeypatch.setattr(delivery, "get_backend", lambda name: _OneShotBackend(fail))
+    from modules.common import phash
+    monkeypatch.setattr(phash, "record_sent", recorded.append)
+    delivery.process_delivery({"delivery_id": "d1"})
+    assert row.status == ("failed" if fail else "sent")
+    assert recorded == ([] if fail else [{"chave": "dash"}])
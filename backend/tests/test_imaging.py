@@ -0,0 +1,57 @@
+import sys
+import os
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from modules.common import imaging
+
+def _frame():
+    rng = np.random.default_rng(3)
+    return rng.integers(0, 255, size=(300, 500, 3), dtype=np.uint8)
+
+def test_png_roundtrip_is_lossless(tmp_path):
+    frame = _frame()
+    path = str(tmp_path / "cap.png")
+    imaging.save_async(frame, path, imaging.CaptureFormat(fmt="png", png_compression=1))
+    assert np.array_equal(cv2.imread(imaging.wait(path)), frame)
+    assert not imaging.is_pending(path)
+
+def test_webp_with_thumbnail(tmp_path):
+    fmt = imaging.CaptureFormat.from_config({"formato": "webp", "qualidade": 60, "miniatura": 100})
+    assert fmt.extension == ".webp"
+    path = str(tmp_path / f"cap{fmt.extension}")
+    imaging.save_async(_frame(), path, fmt).result()
+    assert cv2.imread(path).shape == (300, 500, 3)
+    assert cv2.imread(imaging.thumbnail_path(path)).shape == (60, 100, 3)
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        imaging.CaptureFormat.from_config({"formato": "bmp"})
+
+def test_flush_waits_for_every_pending_write(tmp_path):
+    paths = [str(tmp_path / f"{i}.jpg") for i in range(4)]
+    for p in paths:
+        imaging.save_async(_frame(), p, imaging.CaptureFormat(fmt="jpeg"))
+    imaging.flush()
+    assert all(os.path.exists(p) for p in paths)
+
+def test_invalid_env_format_is_rejected(monkeypatch):
+    monkeypatch.setenv("HUB_CAPTURE_FORMAT", "tiff")
+    with pytest.raises(ValueError, match="tiff"):
+        imaging.CaptureFormat.from_env()
+
+def test_failed_write_is_reported_by_wait(tmp_path):
+    path = str(tmp_path / "quebrada.png")
+    future = imaging.save_async(None, path, imaging.CaptureFormat(fmt="png"))
+    with pytest.raises(Exception):
+        future.result()
+    assert imaging.is_pending(path)
+    with pytest.raises(Exception):
+        imaging.wait(path)
+    assert not os.path.exists(path)
+    # uma nova gravação no mesmo caminho substitui a que falhou
+    imaging.save_async(_frame(), path, imaging.CaptureFormat(fmt="png"))
+    assert os.path.exists(imaging.wait(path))
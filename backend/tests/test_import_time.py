@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Dependências das automações de desktop que não podem ser carregadas pela API/worker no import.
+HEAVY_MODULES = {"cv2", "numpy", "pyautogui", "pytesseract", "win32clipboard", "keyring"}
+
+# Orçamento (s) do import a frio; generoso para não oscilar em máquinas lentas.
+BUDGETS = {
+    "app.worker": 5.0,
+    "app.api.routes.automations": 5.0,
+    "modules.comercial.dashboard.run_dashboard_v2": 1.0,
+    "modules.comercial.dashboard.run_comercial": 1.0,
+    "modules.comercial.dashboard.whatsapp": 1.0,
+}
+
+def _importtime(module: str):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert proc.returncode == 0, proc.stderr[-2000:]
+    imported = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        imported[name.strip()] = int(cumulative) / 1_000_000
+    return imported
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_cold_import_is_lean(module):
+    imported = _importtime(module)
+    heavy = sorted(HEAVY_MODULES & {name.split(".")[0] for name in imported})
+    assert not heavy, f"{module} importa dependências pesadas: {heavy}"
+    assert imported[module] < BUDGETS[module], f"{module} levou {imported[module]:.2f}s para importar"
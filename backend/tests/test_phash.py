@@ -0,0 +1,58 @@
+import sys
+import os
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from modules.common import phash
+
+def _dashboard(value):
+    img = np.full((500, 900, 3), 240, dtype=np.uint8)
+    cv2.rectangle(img, (50, 50), (850, 120), (90, 60, 30), -1)
+    cv2.rectangle(img, (80, 450 - value), (200, 450), (40, 160, 40), -1)
+    cv2.putText(img, f"Total: {value}", (300, 300), cv2.FONT_HERSHEY_SIMPLEX, 3, (0, 0, 0), 6)
+    return img
+
+@pytest.mark.parametrize("algorithm", phash.ALGORITHMS)
+def test_noise_is_close_and_changes_are_far(algorithm):
+    base = _dashboard(120)
+    noisy = np.clip(base.astype(np.int16) + np.random.default_rng(1).integers(-3, 4, base.shape), 0, 255).astype(np.uint8)
+    h = phash.image_hash(base, algorithm)
+    assert phash.hamming(h, phash.image_hash(noisy, algorithm)) <= 4
+    assert phash.hamming(h, phash.image_hash(_dashboard(330), algorithm)) > 4
+
+def test_index_keeps_latest_entries_per_key(tmp_path):
+    index = phash.CaptureIndex(str(tmp_path / "idx.json"), keep=3)
+    for v in range(5):
+        index.add("dash:mensal", 1 << v, file=f"{v}.png")
+    assert index.latest("dash:mensal")["file"] == "4.png"
+    assert [e["file"] for e in index._load()["dash:mensal"]] == ["2.png", "3.png", "4.png"]
+    assert index.latest("dash:mensal", "dhash") is None
+    assert index.latest("outro") is None
+
+def _check(tmp_path, name, value):
+    from modules.comercial.dashboard import run_dashboard_v2 as dash
+    path = str(tmp_path / f"{name}.png")
+    cv2.imwrite(path, _dashboard(value))
+    return dash.check_capture_changed(path, str(tmp_path), "dash:mensal", {"distancia_maxima": 4})
+
+def test_change_is_measured_against_the_last_sent_capture(tmp_path):
+    a1 = _check(tmp_path, "a1", 120)
+    assert not a1["unchanged"] and a1["distance"] is None
+    phash.record_sent(a1["marker"])
+    b = _check(tmp_path, "b", 330)
+    assert not b["unchanged"]
+    phash.record_sent(b["marker"])
+    # A -> B -> A: os destinatários viram B por último, então A volta a ser novidade
+    a2 = _check(tmp_path, "a2", 120)
+    assert not a2["unchanged"] and a2["previous"] == "b.png"
+    phash.record_sent(a2["marker"])
+    assert _check(tmp_path, "a3", 120)["unchanged"]
+
+def test_capture_whose_send_failed_is_not_skipped_next_time(tmp_path):
+    first = _check(tmp_path, "a1", 120)
+    # envio falhou: nada é registrado
+    retry = _check(tmp_path, "a2", 120)
+    assert not first["unchanged"] and not retry["unchanged"]
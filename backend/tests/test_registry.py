@@ -0,0 +1,62 @@
+import sys
+import os
+import json
+import types
+import uuid
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api.deps import get_current_user
+from app.api.routes import automations
+from app.core import registry
+
+@pytest.fixture
+def modules_root(tmp_path, monkeypatch):
+    pkg = tmp_path / "fake_hub_modules" / "vendas"
+    pkg.mkdir(parents=True)
+    (pkg.parent / "__init__.py").write_text("")
+    (pkg / "__init__.py").write_text("")
+    (pkg / "relatorio.py").write_text("raise RuntimeError('não deveria ser importado na descoberta')\n")
+    (pkg / "manifest.json").write_text(json.dumps({"automations": [
+        {"name": "vendas.relatorio", "module": "relatorio", "description": "Relatório",
+         "resources": {"max_concurrent": 2}, "config_schema": {"type": "object"}},
+        {"name": "sem_modulo"},
+    ]}))
+    (tmp_path / "fake_loose_automation.py").write_text("def run(payload):\n    return payload\n\nNAO_CALLABLE = 1\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(registry.settings, "MODULES_ROOT", str(pkg.parent))
+    monkeypatch.setattr(registry, "_scan_entry_points", lambda: [])
+    registry.discover(refresh=True)
+    yield pkg.parent
+    for name in [m for m in sys.modules if m.startswith(("fake_hub_modules", "fake_loose_automation"))]:
+        sys.modules.pop(name, None)
+    # o próximo uso redescobre com a configuração real
+    registry._discovered = False
+
+def test_discovery_reads_manifests_without_importing(modules_root):
+    specs = {s.name: s for s in registry.all_specs()}
+    assert list(specs) == ["vendas.relatorio"]
+    spec = specs["vendas.relatorio"]
+    assert spec.target == "fake_hub_modules.vendas.relatorio:run"
+    assert spec.resources == {"max_concurrent": 2}
+    assert registry.find("fake_hub_modules.vendas.relatorio", "run") is spec
+    assert "fake_hub_modules.vendas.relatorio" not in sys.modules
+
+def test_validate_target(modules_root):
+    assert registry.validate_target("fake_hub_modules.vendas.relatorio", "run") is None
+    assert registry.validate_target("shell:echo", "") is None
+    assert registry.validate_target("fake_loose_automation", "run") is None
+    assert "não encontrado" in registry.validate_target("fake_modulo_que_nao_existe", "run")
+    assert "fake_loose_automation.inexistente" in registry.validate_target("fake_loose_automation", "inexistente")
+    assert registry.validate_target("fake_loose_automation", "NAO_CALLABLE") is not None
+
+def test_catalog_endpoint_lists_specs(modules_root):
+    app = FastAPI()
+    app.include_router(automations.router)
+    app.dependency_overrides[get_current_user] = lambda: types.SimpleNamespace(id=uuid.uuid4())
+    resp = TestClient(app).get("/automations/catalog")
+    assert resp.status_code == 200
+    [item] = resp.json()
+    assert item["name"] == "vendas.relatorio" and item["func_name"] == "run"
+    assert item["config_schema"] == {"type": "object"} and item["resources"] == {"max_concurrent": 2}
@@ -0,0 +1,62 @@
+import sys
+import os
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+fakeredis = pytest.importorskip("fakeredis")
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.services import response_cache
+
+@pytest.fixture
+def setup():
+    conn = fakeredis.FakeRedis()
+    rows = [{"id": 1, "name": "Comercial"}]
+    calls = []
+    app = FastAPI()
+
+    @app.get("/items")
+    def items(request: Request, limit: int = 10):
+        def build():
+            calls.append(limit)
+            return rows[:limit]
+        return response_cache.cached_json(request, "items", build, variant=str(limit), conn=conn)
+
+    return TestClient(app), conn, rows, calls
+
+def test_serves_cached_bytes_and_304(setup):
+    client, conn, rows, calls = setup
+    first = client.get("/items")
+    assert first.json() == rows and first.headers["etag"]
+    again = client.get("/items")
+    assert again.json() == rows and calls == [10]
+    not_modified = client.get("/items", headers={"If-None-Match": first.headers["etag"]})
+    assert not_modified.status_code == 304 and calls == [10]
+
+def test_bump_changes_etag_and_rebuilds(setup):
+    client, conn, rows, calls = setup
+    etag = client.get("/items").headers["etag"]
+    rows.append({"id": 2, "name": "Financeiro"})
+    response_cache.bump("items", conn=conn)
+    fresh = client.get("/items", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and len(fresh.json()) == 2
+    assert fresh.headers["etag"] != etag and calls == [10, 10]
+
+def test_variants_are_cached_separately(setup):
+    client, conn, rows, calls = setup
+    rows.append({"id": 2, "name": "Financeiro"})
+    assert len(client.get("/items?limit=1").json()) == 1
+    assert len(client.get("/items?limit=10").json()) == 2
+    assert calls == [1, 10]
+
+def test_without_redis_responds_uncached():
+    class Down:
+        def get(self, *a):
+            raise ConnectionError("redis fora")
+    app = FastAPI()
+
+    @app.get("/x")
+    def x(request: Request):
+        return response_cache.cached_json(request, "x", lambda: {"ok": True}, conn=Down())
+
+    resp = TestClient(app).get("/x")
+    assert resp.json() == {"ok": True} and "etag" not in resp.headers
@@ -0,0 +1,95 @@
+import sys
+import os
+import types
+import uuid
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+fakeredis = pytest.importorskip("fakeredis")
+from app.services import result_cache, runner
+
+@pytest.fixture
+def conn(monkeypatch):
+    conn = fakeredis.FakeRedis()
+    monkeypatch.setattr(result_cache, "redis_conn", conn)
+    return conn
+
+def _automation(**extra):
+    base = dict(
+        id=uuid.uuid4(), owner_type="sector", owner_id=uuid.uuid4(), module_path="modules.inexistente",
+        func_name="run", default_payload={"pagina": 1}, cache_ttl_sec=60, cache_key_fields=None,
+    )
+    base.update(extra)
+    return types.SimpleNamespace(**base)
+
+def test_store_then_lookup_marks_cache_hit(conn):
+    auto = _automation()
+    result_cache.store(auto, {"q": "x"}, "run-1", {"ok": True, "total": 3})
+    hit = result_cache.lookup(auto, {"q": "x"})
+    assert hit["total"] == 3 and hit["cache_hit"] is True and hit["cached_from_run"] == "run-1"
+    assert result_cache.lookup(auto, {"q": "y"}) is None
+    assert 0 < conn.ttl(result_cache.cache_key(auto, {"q": "x"})) <= 60
+
+def test_underscore_keys_do_not_split_the_key(conn):
+    auto = _automation()
+    result_cache.store(auto, {"q": "x", "_workspace": "/tmp/a", "_user_id": "1"}, "run-1", {"ok": True})
+    assert result_cache.lookup(auto, {"q": "x", "_workspace": "/tmp/b"}) is not None
+    assert result_cache.cache_key(auto, {"q": "x", "_trace": 1}) == result_cache.cache_key(auto, {"q": "x"})
+
+def test_failures_hits_and_disabled_automations_are_not_stored(conn):
+    auto = _automation()
+    result_cache.store(auto, {}, "run-1", {"ok": False})
+    result_cache.store(auto, {}, "run-2", {"ok": True, "cache_hit": True})
+    assert result_cache.lookup(auto, {}) is None
+    off = _automation(cache_ttl_sec=0)
+    result_cache.store(off, {}, "run-3", {"ok": True})
+    assert conn.dbsize() == 0
+
+def test_missing_artifact_invalidates_entry(conn, tmp_path):
+    auto = _automation()
+    shot = tmp_path / "tela.png"
+    shot.write_bytes(b"x")
+    result_cache.store(auto, {}, "run-1", {"ok": True, "screenshot": str(shot)})
+    assert result_cache.lookup(auto, {}) is not None
+    shot.unlink()
+    assert result_cache.lookup(auto, {}) is None
+
+def test_cache_hit_skips_execution_and_delivery(conn, monkeypatch):
+    auto = _automation()
+    result_cache.store(auto, {"q": "x"}, "run-1", {"ok": True, "total": 3})
+    finals = []
+    monkeypatch.setattr(runner.crud, "set_run_status_running", lambda db, run_id: None)
+    monkeypatch.setattr(runner.crud, "set_run_status_final", lambda db, run_id, status, result: finals.append((status, result)))
+    monkeypatch.setattr(runner.artifacts, "link_cached", lambda db, source, run_id, result: result)
+
+    def boom(*args, **kwargs):
+        raise AssertionError("não deveria ser chamado em cache hit")
+
+    monkeypatch.setattr(runner.delivery, "fan_out", boom)
+    monkeypatch.setattr(runner, "run_supervised", boom)
+    monkeypatch.setattr(runner, "_call_inline", boom)
+    monkeypatch.setattr(runner.secret_cache, "secrets_for_run", lambda db, automation, user_id: {})
+    assert runner.execute_run(None, "run-2", auto, None, {"q": "x"}) is True
+    assert finals[0][0] == "success" and finals[0][1]["cache_hit"] is True
+
+def test_users_with_own_secrets_do_not_share_results(conn, monkeypatch):
+    from app.services import secret_cache
+    auto = _automation()
+    alice, bob, carol = (str(uuid.uuid4()) for _ in range(3))
+    personal = {("user", alice): {"TOKEN": "da-alice"}, ("user", bob): {"TOKEN": "do-bob"}}
+    monkeypatch.setattr(
+        secret_cache.crud, "get_secrets_for_owners",
+        lambda db, owners: {k: v for o in owners for k, v in personal.get(tuple(o), {}).items()},
+    )
+    secret_cache.invalidate()
+    try:
+        scope_a = secret_cache.cache_scope(None, auto, alice)
+        scope_b = secret_cache.cache_scope(None, auto, bob)
+        assert scope_a == f"user:{alice}" and scope_b == f"user:{bob}"
+        # sem segredos próprios, só valem os do dono: o resultado é o mesmo para todos
+        assert secret_cache.cache_scope(None, auto, carol) is None
+        result_cache.store(auto, {"q": "x"}, "run-a", {"ok": True, "conta": "alice"}, scope_a)
+        assert result_cache.lookup(auto, {"q": "x"}, scope_b) is None
+        assert result_cache.lookup(auto, {"q": "x"}) is None
+        assert result_cache.lookup(auto, {"q": "x"}, scope_a)["conta"] == "alice"
+    finally:
+        secret_cache.invalidate()
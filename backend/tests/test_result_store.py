@@ -0,0 +1,88 @@
+import sys
+import os
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.core.config import settings
+from app.services import result_store
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "RESULT_BLOB_ROOT", str(tmp_path))
+    monkeypatch.setattr(settings, "RESULT_INLINE_MAX_KB", 4)
+    monkeypatch.setattr(settings, "RESULT_PREVIEW_CHARS", 100)
+    return tmp_path
+
+def _chatty():
+    return {
+        "ok": False,
+        "exit_code": 1,
+        "error_code": "timeout",
+        "retryable": True,
+        "stdout": "linha de log\n" * 5000 + "FIM",
+        "payload_result": {"rows": list(range(3000))},
+    }
+
+def test_small_results_stay_inline(store):
+    result = {"ok": True, "stdout": "pouco"}
+    assert result_store.compact(result) is result
+    assert os.listdir(store) == []
+
+def test_large_result_is_externalised_and_loaded_back(store):
+    full = _chatty()
+    row = result_store.compact(full)
+    assert len(result_store._dumps(row)) < 4 * 1024
+    assert row["ok"] is False and row["error_code"] == "timeout" and row["retryable"] is True
+    assert row["stdout"].endswith("FIM") and len(row["stdout"]) == 100
+    assert "payload_result" not in row
+    ext = row[result_store.EXTERNAL_KEY]
+    assert set(ext["truncated"]) == {"stdout", "payload_result"}
+    assert ext["compressed_size"] < ext["size"]
+    assert result_store.load(row) == full
+    # compactar de novo não regrava nem aninha
+    assert result_store.compact(row) is row
+
+def test_same_content_shares_one_blob(store):
+    a = result_store.compact(_chatty())
+    b = result_store.compact(_chatty())
+    assert a[result_store.EXTERNAL_KEY]["sha256"] == b[result_store.EXTERNAL_KEY]["sha256"]
+    assert sum(len(files) for _, _, files in os.walk(store)) == 1
+
+def test_missing_blob_falls_back_to_compact_row(store):
+    row = result_store.compact(_chatty())
+    os.unlink(result_store.blob_path(row[result_store.EXTERNAL_KEY]["sha256"]))
+    assert result_store.load(row) is row
+
+def test_many_small_keys_still_respect_the_limit(store):
+    full = {"ok": True, "exit_code": 0, **{f"campo_{i}": "x" * 200 for i in range(2000)}}
+    row = result_store.compact(full)
+    assert len(result_store._dumps(row)) <= 4 * 1024
+    assert row["ok"] is True and row["exit_code"] == 0
+    assert row[result_store.EXTERNAL_KEY]["truncated"] == "*"
+    assert result_store.load(row) == full
+
+def test_unreferenced_blobs_are_collected(store, monkeypatch):
+    import uuid
+    from sqlalchemy import create_engine
+    from sqlalchemy.dialects.postgresql import JSONB
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.orm import sessionmaker
+    from app.db import models
+
+    @compiles(JSONB, "sqlite")
+    def _jsonb_as_json(type_, compiler, **kw):
+        return "JSON"
+
+    engine = create_engine("sqlite://")
+    models.Run.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    kept = result_store.compact(_chatty())
+    dropped = result_store.compact({**_chatty(), "exit_code": 2})
+    db.add(models.Run(id=uuid.uuid4(), automation_id=uuid.uuid4(), status="failed", result=kept))
+    db.commit()
+
+    assert result_store.collect_orphans(db) == (0, 0)  # dentro da carência
+    monkeypatch.setattr(result_store, "_ORPHAN_GRACE_SEC", -1)
+    removed, freed = result_store.collect_orphans(db)
+    assert removed == 1 and freed > 0
+    assert result_store.load(kept) == _chatty()
+    assert not os.path.exists(result_store.blob_path(dropped[result_store.EXTERNAL_KEY]["sha256"]))
@@ -0,0 +1,48 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services.retry import RetryPolicy
+
+def test_no_policy_when_empty():
+    assert RetryPolicy.from_dict(None) is None
+    assert RetryPolicy.from_dict({}) is None
+
+def test_classification():
+    policy = RetryPolicy.from_dict({
+        "max_attempts": 3,
+        "retry_on": ["TimeoutError"],
+        "retry_codes": ["dashboard_not_found"],
+    })
+    assert policy.is_retryable({"ok": False, "retryable": True})
+    assert policy.is_retryable({"ok": False, "error_type": "TimeoutError"})
+    assert policy.is_retryable({"ok": False, "error_code": "dashboard_not_found"})
+    assert not policy.is_retryable({"ok": False, "error_code": "dashboard_not_found", "retryable": False})
+    assert not policy.is_retryable({"ok": False, "error_type": "KeyError"})
+    assert not policy.is_retryable({"ok": True})
+
+def test_attempt_limit():
+    policy = RetryPolicy.from_dict({"max_attempts": 2})
+    failed = {"ok": False, "retryable": True}
+    assert policy.should_retry(1, failed)
+    assert not policy.should_retry(2, failed)
+
+def test_exponential_backoff_is_capped():
+    policy = RetryPolicy.from_dict({
+        "max_attempts": 10,
+        "backoff_sec": 10,
+        "backoff_factor": 2,
+        "max_backoff_sec": 50,
+        "jitter": 0,
+    })
+    assert [policy.delay_for(a) for a in (1, 2, 3, 4)] == [10, 20, 40, 50]
+
+def test_jitter_bounds():
+    policy = RetryPolicy.from_dict({"max_attempts": 2, "backoff_sec": 100, "jitter": 0.2})
+    for _ in range(50):
+        assert 80 <= policy.delay_for(1) <= 120
+
+def test_api_and_stored_policy_share_the_default_attempts():
+    from app.api.routes.automations import RetryPolicyIn
+    stored = {"retry_codes": ["dashboard_not_found"]}
+    from_api = RetryPolicy.from_dict(RetryPolicyIn(**stored).model_dump())
+    assert RetryPolicy.from_dict(stored).max_attempts == from_api.max_attempts > 1
@@ -0,0 +1,150 @@
+import sys
+import os
+import gzip
+import uuid
+from datetime import date, datetime, timezone
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services import run_archive
+
+def test_month_arithmetic_and_names():
+    assert run_archive.add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert run_archive.add_months(date(2025, 1, 1), -1) == date(2024, 12, 1)
+    assert run_archive.month_start(datetime(2025, 7, 31, 23, 59, tzinfo=timezone.utc)) == date(2025, 7, 1)
+    assert run_archive.partition_name(date(2025, 7, 1)) == "runs_p202507"
+    assert run_archive.archive_path(date(2025, 7, 1), "/arq").endswith("runs-2025-07.jsonl.gz")
+
+def test_archive_roundtrip_keeps_full_record(tmp_path):
+    ids = [str(uuid.uuid4()) for _ in range(50)]
+    rows = [
+        {
+            "id": rid,
+            "status": "success",
+            "created_at": datetime(2025, 1, 1, i % 24, tzinfo=timezone.utc),
+            "result": {"ok": True, "stdout": "relatório " * 20, "n": i},
+        }
+        for i, rid in enumerate(ids)
+    ]
+    path = str(tmp_path / "runs-2025-01.jsonl.gz")
+    assert run_archive.write_archive(iter(rows), path) == 50
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        assert sum(1 for _ in fh) == 50
+
+    record = run_archive.read_archived(path, ids[37])
+    assert record["result"]["n"] == 37 and record["created_at"].startswith("2025-01-01")
+    assert run_archive.read_archived(path, uuid.uuid4()) is None
+    assert run_archive.read_archived(str(tmp_path / "sumiu.jsonl.gz"), ids[0]) is None
+
+def test_failed_export_leaves_no_partial_file(tmp_path):
+    def rows():
+        yield {"id": "1"}
+        raise RuntimeError("conexão caiu")
+    path = str(tmp_path / "runs-2025-02.jsonl.gz")
+    try:
+        run_archive.write_archive(rows(), path)
+    except RuntimeError:
+        pass
+    assert os.listdir(tmp_path) == []
+
+class _FakeSession:
+    """Responde às consultas de ensure_partitions sem Postgres, registrando os meses pedidos."""
+
+    def __init__(self, default_months):
+        self.default_months = default_months
+        self.ensured = []
+        self.commits = 0
+
+    def execute(self, stmt, params=None):
+        sql = str(stmt)
+        if "to_regclass" in sql:
+            value = "runs_default" if self.default_months is not None else None
+            return _Result([value])
+        if "FROM runs_default" in sql:
+            return _Result(self.default_months)
+        self.ensured.append(params["m"])
+        return _Result([run_archive.partition_name(params["m"])])
+
+    def commit(self):
+        self.commits += 1
+
+class _Result:
+    def __init__(self, values):
+        self.values = list(values)
+
+    def scalar(self):
+        return self.values[0]
+
+    def scalars(self):
+        return iter(self.values)
+
+def test_ensure_partitions_also_covers_months_stuck_in_default():
+    db = _FakeSession([date(2025, 3, 1), date(2025, 6, 1)])
+    names = run_archive.ensure_partitions(db, ahead=1, today=datetime(2025, 6, 15, tzinfo=timezone.utc))
+    assert db.ensured == [date(2025, 3, 1), date(2025, 6, 1), date(2025, 7, 1)]
+    assert names == ["runs_p202503", "runs_p202506", "runs_p202507"] and db.commits == 1
+
+def test_ensure_partitions_without_default_partition():
+    db = _FakeSession(None)
+    run_archive.ensure_partitions(db, ahead=2, today=datetime(2025, 11, 2, tzinfo=timezone.utc))
+    assert db.ensured == [date(2025, 11, 1), date(2025, 12, 1), date(2026, 1, 1)]
+
+def test_retention_cutoff_is_the_oldest_live_month():
+    now = datetime(2026, 2, 10, tzinfo=timezone.utc)
+    assert run_archive.retention_cutoff(3, now) == datetime(2025, 11, 1, tzinfo=timezone.utc)
+    assert run_archive.retention_cutoff(0, now) is None
+
+def test_archived_run_returns_the_full_result(tmp_path, monkeypatch):
+    import types
+    from app.core.config import settings
+    from app.services import result_store
+    monkeypatch.setattr(settings, "RESULT_BLOB_ROOT", str(tmp_path / "blobs"))
+    monkeypatch.setattr(settings, "RESULT_INLINE_MAX_KB", 1)
+    rid = uuid.uuid4()
+    full = {"ok": True, "stdout": "linha\n" * 2000}
+    path = str(tmp_path / "runs-2025-01.jsonl.gz")
+    run_archive.write_archive(iter([{"id": str(rid), "result": result_store.compact(full)}]), path)
+    entry = types.SimpleNamespace(id=rid, archive_file=path)
+    db = types.SimpleNamespace(get=lambda model, key: entry if key == rid else None)
+
+    record = run_archive.get_archived_run(db, rid)
+    assert record["result"] == full and record["archived"] is True
+    assert record["result_external"]["sha256"]
+    compact = run_archive.get_archived_run(db, rid, full=False)
+    assert result_store.is_external(compact["result"])
+
+def test_list_runs_defaults_to_retention_window_and_filters_archive(monkeypatch):
+    import types
+    from app.api.routes import runs as runs_route
+    calls = {}
+
+    def recorder(name):
+        def fake(db, user_id, automation_id, **kw):
+            calls[name] = kw
+            return []
+        return fake
+
+    monkeypatch.setattr(runs_route.crud, "list_runs_for_user", recorder("live"))
+    monkeypatch.setattr(runs_route.crud, "list_archived_runs_for_user", recorder("archived"))
+    monkeypatch.setattr(runs_route.run_archive, "retention_cutoff", lambda: datetime(2025, 9, 1, tzinfo=timezone.utc))
+    user = types.SimpleNamespace(id=uuid.uuid4())
+
+    runs_route.list_runs(None, None, None, True, db=None, current=user)
+    assert calls["live"]["since"] == datetime(2025, 9, 1, tzinfo=timezone.utc)
+    assert calls["archived"]["since"] is None
+
+    calls.clear()
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    runs_route.list_runs(None, since, None, True, db=None, current=user)
+    assert calls["live"]["since"] == since and calls["archived"]["since"] == since
+
+def test_archive_export_inlines_externalized_results(tmp_path, monkeypatch):
+    import types
+    from app.core.config import settings
+    from app.services import result_store
+    monkeypatch.setattr(settings, "RESULT_BLOB_ROOT", str(tmp_path))
+    monkeypatch.setattr(settings, "RESULT_INLINE_MAX_KB", 1)
+    full = {"ok": True, "stdout": "linha\n" * 2000}
+    row = {"id": uuid.uuid4(), "result": result_store.compact(full)}
+    rows = types.SimpleNamespace(mappings=lambda: [row])
+    db = types.SimpleNamespace(execute=lambda stmt: rows)
+    (exported,) = run_archive._stream_partition(db, "runs_p202501")
+    assert exported["result"] == full and exported["id"] == str(row["id"])
@@ -0,0 +1,78 @@
+import sys
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from cryptography.fernet import Fernet
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.core import security
+from app.db import models
+from app.services import secret_rotation
+
+class _MemoryConn:
+    def __init__(self):
+        self.data = {}
+    def get(self, key):
+        return self.data.get(key)
+    def set(self, key, value):
+        self.data[key] = value
+
+@pytest.fixture
+def db(monkeypatch):
+    old = Fernet.generate_key().decode()
+    monkeypatch.setenv("SECRETS_KEY", old)
+    monkeypatch.delenv("SECRETS_PREVIOUS_KEYS", raising=False)
+    security.reset_key_ring()
+    engine = create_engine("sqlite://")
+    models.Secret.__table__.create(engine)
+    session = Session(engine)
+    for i in range(25):
+        session.add(models.Secret(owner_type="user", owner_id=uuid.uuid4(), key=f"k{i}", value_ciphertext=security.encrypt_secret(f"valor-{i}")))
+    session.add(models.Secret(owner_type="user", owner_id=uuid.uuid4(), key="lixo", value_ciphertext="não-é-token"))
+    session.commit()
+
+    new = Fernet.generate_key().decode()
+    monkeypatch.setenv("SECRETS_KEY", new)
+    monkeypatch.setenv("SECRETS_PREVIOUS_KEYS", old)
+    security.reset_key_ring()
+    session.new_key = new
+    yield session
+    session.close()
+    security.reset_key_ring()
+
+def _plain_under(key, session):
+    f = Fernet(key.encode())
+    return {s.key: f.decrypt(s.value_ciphertext.encode()).decode() for s in session.query(models.Secret) if s.key != "lixo"}
+
+def test_rotates_in_batches_on_process_pool(db):
+    report = secret_rotation.rotate_all(db, batch_size=7, workers=2)
+    assert (report.scanned, report.rotated, report.failed, report.batches) == (26, 25, 1, 4)
+    assert report.done and report.rows_per_sec > 0
+    assert _plain_under(db.new_key, db) == {f"k{i}": f"valor-{i}" for i in range(25)}
+
+    again = secret_rotation.rotate_all(db, batch_size=7, executor=ThreadPoolExecutor(1))
+    assert (again.rotated, again.skipped) == (0, 25)
+
+def test_resumes_from_checkpoint(db, monkeypatch):
+    checkpoint = secret_rotation.RedisCheckpoint(conn=_MemoryConn())
+    real_fetch = secret_rotation._fetch_batch
+    calls = []
+    def flaky_fetch(session, after, limit):
+        calls.append(after)
+        if len(calls) == 3:
+            raise RuntimeError("conexão caiu")
+        return real_fetch(session, after, limit)
+    monkeypatch.setattr(secret_rotation, "_fetch_batch", flaky_fetch)
+    with ThreadPoolExecutor(2) as pool, pytest.raises(RuntimeError):
+        secret_rotation.rotate_all(db, batch_size=10, checkpoint=checkpoint, executor=pool)
+    saved = checkpoint.load()
+    assert saved["scanned"] == 20 and not saved["done"]
+
+    monkeypatch.setattr(secret_rotation, "_fetch_batch", real_fetch)
+    with ThreadPoolExecutor(2) as pool:
+        report = secret_rotation.rotate_all(db, batch_size=10, checkpoint=checkpoint, executor=pool)
+    assert report.done and report.scanned == 26 and report.batches == 3
+    assert report.rotated == 25
+    assert _plain_under(db.new_key, db)["k24"] == "valor-24"
@@ -0,0 +1,94 @@
+import sys
+import os
+import types
+import uuid
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from cryptography.fernet import Fernet
+from app.core import security
+from app.core.config import settings
+from app.services import secret_cache
+
+@pytest.fixture
+def keys(monkeypatch):
+    monkeypatch.delenv("SECRETS_KEY", raising=False)
+    monkeypatch.delenv("SECRETS_PREVIOUS_KEYS", raising=False)
+    security.reset_key_ring()
+    yield monkeypatch
+    security.reset_key_ring()
+
+def test_key_ring_is_built_once(keys):
+    assert security._get_fernet() is security._get_fernet()
+    assert security.decrypt_secret(security.encrypt_secret("abc")) == "abc"
+
+def test_rotation_keeps_old_tokens_readable(keys):
+    old, new = Fernet.generate_key().decode(), Fernet.generate_key().decode()
+    legacy = security.encrypt_secret("derivada")  # sem SECRETS_KEY: chave derivada do SECRET_KEY
+    keys.setenv("SECRETS_KEY", old)
+    security.reset_key_ring()
+    token = security.encrypt_secret("senha")
+
+    keys.setenv("SECRETS_KEY", new)
+    keys.setenv("SECRETS_PREVIOUS_KEYS", old)
+    security.reset_key_ring()
+    assert security.decrypt_secret(token) == "senha"
+    assert security.decrypt_secret(legacy) == "derivada"
+    rotated = security.rotate_secret(token)
+    assert Fernet(new.encode()).decrypt(rotated.encode()) == b"senha"
+
+    keys.setenv("SECRETS_KEY", Fernet.generate_key().decode())
+    keys.delenv("SECRETS_PREVIOUS_KEYS")
+    security.reset_key_ring()
+    with pytest.raises(ValueError):
+        security.decrypt_secret(token)
+
+def test_invalid_key_is_reported(keys):
+    keys.setenv("SECRETS_KEY", "curta")
+    security.reset_key_ring()
+    with pytest.raises(RuntimeError):
+        security.encrypt_secret("x")
+
+def test_secret_cache_ttl_and_invalidation(monkeypatch):
+    calls = []
+    def fake_load(db, owners):
+        calls.append(list(owners))
+        return {"delphos_senha": f"v{len(calls)}"}
+    monkeypatch.setattr(secret_cache.crud, "get_secrets_for_owners", fake_load)
+    monkeypatch.setattr(settings, "SECRETS_CACHE_TTL_SEC", 60)
+    secret_cache.invalidate()
+    sector = uuid.uuid4()
+    user = uuid.uuid4()
+    auto = types.SimpleNamespace(owner_type="sector", owner_id=sector)
+
+    first = secret_cache.secrets_for_run(None, auto, user)
+    assert secret_cache.secrets_for_run(None, auto, user) == first == {"delphos_senha": "v1"}
+    assert calls == [[("sector", str(sector)), ("user", str(user))]]
+
+    first["delphos_senha"] = "alterado"  # cópia: não contamina o cache
+    secret_cache.invalidate("user", user)
+    assert secret_cache.secrets_for_run(None, auto, user) == {"delphos_senha": "v2"}
+    secret_cache.invalidate()
+
+def test_sync_route_injects_secrets_and_scope(monkeypatch):
+    from app.api.routes import runs_sync
+    auto = types.SimpleNamespace(id=uuid.uuid4(), enabled=True, module_path="m", func_name="f")
+    user = types.SimpleNamespace(id=uuid.uuid4())
+    run = types.SimpleNamespace(id=uuid.uuid4())
+    monkeypatch.setattr(runs_sync.crud, "get_automation_by_id_or_name", lambda db, key: auto)
+    monkeypatch.setattr(runs_sync.crud, "user_can_execute_automation", lambda db, uid, a: True)
+    monkeypatch.setattr(runs_sync.crud, "create_run", lambda db, **kw: run)
+    monkeypatch.setattr(runs_sync.crud, "finish_run", lambda db, **kw: None)
+    monkeypatch.setattr(secret_cache, "secrets_for_run", lambda db, a, uid: {"TOKEN": "x"})
+    monkeypatch.setattr(secret_cache, "cache_scope", lambda db, a, uid: f"user:{uid}")
+    monkeypatch.setattr(runs_sync.template_assets, "templates_for_run", lambda db: {"logo": "/t/logo.png"})
+    seen = {}
+
+    def fake_run_sync(**kw):
+        seen.update(kw)
+        return types.SimpleNamespace(ok=True, exit_code=0, stdout="", stderr="", result={}, error=None, cache_hit=False)
+
+    monkeypatch.setattr(runs_sync, "run_sync", fake_run_sync)
+    out = runs_sync.run_automation_sync(runs_sync.RunSyncIn(automation_id=str(auto.id), payload={"a": 1}), db=None, current=user)
+    assert out["ok"] is True
+    assert seen["payload"] == {"a": 1, "_secrets": {"TOKEN": "x"}, "_templates": {"logo": "/t/logo.png"}}
+    assert seen["cache_scope"] == f"user:{user.id}"
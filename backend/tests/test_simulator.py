@@ -0,0 +1,100 @@
+import sys
+import os
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+cv2 = pytest.importorskip("cv2")
+
+from modules.common import timing
+from modules.common.drivers import set_driver
+from modules.common.simulator import RecordingDriver, ReplayDriver, dashboard_recording, load_recording
+from modules.comercial.dashboard import run_dashboard_v2
+
+IMAGES_DIR = os.path.join(os.path.dirname(__file__), "..", "modules", "comercial", "dashboard", "images")
+
+def test_dashboard_flow_on_replay(tmp_path):
+    driver = ReplayDriver(dashboard_recording(IMAGES_DIR))
+    previous = set_driver(driver)
+    try:
+        with timing.recording() as rec:
+            result = run_dashboard_v2.run({
+                "dashboard_name": "comercial_2024_2025",
+                "enviar_whatsapp": False,
+                "_workspace": str(tmp_path),
+            })
+    finally:
+        set_driver(previous)
+    assert result["ok"], result
+    assert driver.history[-1] == "relatorio"
+    assert os.path.exists(result["screenshot"])
+    steps = rec.summary()
+    assert steps["locate"]["count"] >= 1
+    assert steps["wait"]["total_ms"] > 0
+
+def test_recording_roundtrip(tmp_path):
+    source = ReplayDriver(dashboard_recording(IMAGES_DIR))
+    recorder = RecordingDriver(source, str(tmp_path / "rec"))
+    recorder.capture()
+    recorder.press("enter")
+    recorder.sleep(3)
+    recorder.capture()
+    recorder.press("f11")
+    recorder.sleep(2)
+    recorder.capture()
+    recorder.save()
+
+    replay = ReplayDriver(load_recording(str(tmp_path / "rec")))
+    replay.press("enter")
+    replay.sleep(3)
+    replay.press("f11")
+    replay.sleep(2)
+    replay.capture()
+    assert replay.history == ["s000", "s001", "s002"]
+
+def test_unchanged_dashboard_skips_delivery(tmp_path):
+    from modules.common import phash
+    payload = {
+        "dashboard_name": "comercial_2024_2025",
+        "canal_whatsapp": "api",
+        "numeros_whatsapp": ["5541999990000"],
+        "pular_se_inalterado": True,
+        "_workspace": str(tmp_path),
+    }
+
+    def run_once():
+        previous = set_driver(ReplayDriver(dashboard_recording(IMAGES_DIR)))
+        try:
+            return run_dashboard_v2.run(dict(payload))
+        finally:
+            set_driver(previous)
+
+    first = run_once()
+    assert first["ok"] and not first.get("unchanged")
+    # a entrega ainda não foi feita: a mesma tela não pode ser pulada
+    retry = run_once()
+    assert retry["ok"] and not retry.get("unchanged")
+    # o backend registra a captura quando a entrega termina 'sent'
+    phash.record_sent(retry["entrega"]["registro_envio"])
+    second = run_once()
+    assert second["ok"] and second["unchanged"] and second["distance"] == 0
+    assert "screenshot" not in second
+    kept = sorted(f for f in os.listdir(tmp_path) if not f.startswith("."))
+    assert kept == sorted(os.path.basename(r["screenshot"]) for r in (first, retry))
+
+def test_run_returns_delivery_groups_without_touching_whatsapp(tmp_path):
+    driver = ReplayDriver(dashboard_recording(IMAGES_DIR))
+    previous = set_driver(driver)
+    try:
+        result = run_dashboard_v2.run({
+            "dashboard_name": "comercial_2024_2025",
+            "canal_whatsapp": "api",
+            "grupos_whatsapp": {"diretoria": ["5541999990000"], "vendas": ["5541988880000", "5541977770000"]},
+            "_workspace": str(tmp_path),
+        })
+    finally:
+        set_driver(previous)
+    assert result["ok"] and not result["whatsapp_enviado"]
+    entrega = result["entrega"]
+    assert entrega["canal_backend"] == "cloud_api"
+    assert [g["nome"] for g in entrega["grupos"]] == ["diretoria", "vendas"]
+    assert not any(kind == "key_down" and key == "ctrl" for kind, key in driver.events)
@@ -0,0 +1,64 @@
+import sys
+import os
+import textwrap
+import time
+import types
+import uuid
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from fastapi import HTTPException
+from app.core.supervisor import run_supervised
+
+@pytest.fixture
+def slow_module(tmp_path, monkeypatch):
+    # o filho (spawn) herda o sys.path do pai, então o módulo precisa estar num diretório dele
+    (tmp_path / "fake_slow_automation.py").write_text(textwrap.dedent("""
+        import time
+
+        def run(payload):
+            time.sleep(payload.get("sleep", 0))
+            return {"ok": True, "slept": payload.get("sleep", 0)}
+    """))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    return "fake_slow_automation"
+
+def test_returns_value_from_child(slow_module):
+    outcome = run_supervised(slow_module, "run", {"sleep": 0}, timeout_sec=30, poll_interval=0.1)
+    assert outcome.ok and outcome.value == {"ok": True, "slept": 0}
+
+def test_timeout_kills_child(slow_module):
+    started = time.monotonic()
+    outcome = run_supervised(slow_module, "run", {"sleep": 60}, timeout_sec=1, poll_interval=0.1)
+    assert not outcome.ok and outcome.timed_out and outcome.error_type == "TimeoutError"
+    assert time.monotonic() - started < 30
+    assert outcome.error_result()["timed_out"] is True
+
+def test_cancel_check_stops_child(slow_module):
+    asked = {"n": 0}
+
+    def cancel_check():
+        asked["n"] += 1
+        return asked["n"] >= 2
+
+    outcome = run_supervised(slow_module, "run", {"sleep": 60}, timeout_sec=30, cancel_check=cancel_check, poll_interval=0.1)
+    assert not outcome.ok and outcome.cancelled and not outcome.timed_out
+    assert outcome.error_type == "Cancelled"
+
+def test_inline_mode_refuses_to_cancel_running_run(monkeypatch):
+    from app.api.routes import runs
+    run = types.SimpleNamespace(id=uuid.uuid4(), automation_id=uuid.uuid4(), status="running")
+    requested = []
+    monkeypatch.setattr(runs.crud, "get_run", lambda db, run_id: run)
+    monkeypatch.setattr(runs.crud, "get_automation_by_id", lambda db, aid: object())
+    monkeypatch.setattr(runs.crud, "user_can_execute_automation", lambda db, uid, automation: True)
+    monkeypatch.setattr(runs.cancellation, "request_cancel", requested.append)
+    user = types.SimpleNamespace(id=uuid.uuid4())
+
+    monkeypatch.setattr(runs.settings, "RUN_ISOLATION", "inline")
+    with pytest.raises(HTTPException) as exc:
+        runs.cancel_run(run.id, db=None, current=user)
+    assert exc.value.status_code == 409 and not requested
+
+    monkeypatch.setattr(runs.settings, "RUN_ISOLATION", "subprocess")
+    assert runs.cancel_run(run.id, db=None, current=user)["status"] == "cancelling"
+    assert requested == [run.id]
@@ -0,0 +1,91 @@
+import sys
+import os
+import io
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import models
+from app.services import image_uploads, template_assets
+
+PNG_A = b"\x89PNG\r\n\x1a\n" + b"a" * 64
+PNG_B = b"\x89PNG\r\n\x1a\n" + b"b" * 64
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    models.TemplateAsset.__table__.create(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def _upload(tmp_path, content):
+    return image_uploads.save_stream(io.BytesIO(content), tmp_path / "uploads", max_bytes=1 << 20)["path"]
+
+def test_register_versions_by_content(db, tmp_path):
+    a1, created = template_assets.register(db, "grade.png", _upload(tmp_path, PNG_A))
+    assert created and a1.version == 1
+    same, created = template_assets.register(db, "grade.png", _upload(tmp_path, PNG_A))
+    assert not created and same.id == a1.id
+    a2, created = template_assets.register(db, "grade.png", _upload(tmp_path, PNG_B))
+    assert created and a2.version == 2
+    assert template_assets.manifest(db)["grade.png"]["sha256"] == a2.sha256
+
+def test_materialize_downloads_only_changed_assets(db, tmp_path, monkeypatch):
+    cache = str(tmp_path / "cache")
+    template_assets.register(db, "grade.png", _upload(tmp_path, PNG_A))
+    template_assets.register(db, "menu.png", _upload(tmp_path, PNG_B))
+    paths = template_assets.materialize(db, root=cache)
+    assert set(paths) == {"grade.png", "menu.png"}
+    with open(paths["grade.png"], "rb") as fh:
+        assert fh.read() == PNG_A
+
+    fetched = []
+    real = template_assets.crud.get_template_contents
+    monkeypatch.setattr(template_assets.crud, "get_template_contents",
+                        lambda db, shas: fetched.append(sorted(shas)) or real(db, shas))
+    template_assets.materialize(db, root=cache)
+    assert fetched == []
+
+    new, _ = template_assets.register(db, "grade.png", _upload(tmp_path, PNG_A + b"v2"))
+    paths = template_assets.materialize(db, root=cache)
+    assert fetched == [[new.sha256]]
+    assert os.path.basename(paths["grade.png"]).startswith(new.sha256)
+
+def test_dashboard_resolves_synced_template_first(tmp_path):
+    from modules.comercial.dashboard import run_dashboard_v2
+    synced = {"grade.png": str(tmp_path / "abc.png")}
+    assert run_dashboard_v2.resolve_image("imgs", "grade.png", synced) == synced["grade.png"]
+    assert run_dashboard_v2.resolve_image("imgs", "outra.png", synced) == os.path.join("imgs", "outra.png")
+
+def test_multi_upload_removes_versions_when_a_file_fails(tmp_path, monkeypatch):
+    import asyncio
+    import types
+    from sqlalchemy.pool import StaticPool
+    pytest.importorskip("multipart")  # Form/File das rotas de upload exigem python-multipart
+    from app.api.routes import uploads
+    # a rota indexa no threadpool: a conexão sqlite precisa ser compartilhada entre threads
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    models.TemplateAsset.__table__.create(engine)
+    db = sessionmaker(bind=engine)()
+    monkeypatch.setattr(uploads, "DASHBOARD_DIR", tmp_path / "uploads")
+    saved = [image_uploads.save_stream(io.BytesIO(c), tmp_path / "uploads", max_bytes=1 << 20) for c in (PNG_A, PNG_B)]
+
+    async def fake_save(file):
+        return saved[file]
+
+    real = template_assets.register
+
+    def flaky_register(db, name, path, **kw):
+        if name == saved[1]["filename"]:
+            raise RuntimeError("falha no banco")
+        return real(db, name, path, **kw)
+
+    monkeypatch.setattr(uploads, "_save_upload", fake_save)
+    monkeypatch.setattr(uploads.template_assets, "register", flaky_register)
+    user = types.SimpleNamespace(id=None)
+    with pytest.raises(uploads.HTTPException) as exc:
+        asyncio.run(uploads.upload_multiple_dashboard_images(files=[0, 1], db=db, current_user=user))
+    assert exc.value.status_code == 500
+    assert db.query(models.TemplateAsset).count() == 0
+    assert os.listdir(tmp_path / "uploads") == []
@@ -0,0 +1,53 @@
+import sys
+import os
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from modules.common import imaging
+from modules.common.drivers import create_driver, set_driver
+from modules.common.drivers.fake import FakeDriver
+from modules.comercial.dashboard import ui_helpers
+
+@pytest.fixture
+def fake():
+    driver = FakeDriver(width=800, height=600, windows=["DELPHOS.BI Principal"])
+    previous = set_driver(driver)
+    yield driver
+    set_driver(previous)
+
+def _template(tmp_path):
+    rng = np.random.default_rng(7)
+    tpl = rng.integers(0, 255, size=(40, 60, 3), dtype=np.uint8)
+    path = str(tmp_path / "botao.png")
+    cv2.imwrite(path, tpl)
+    return tpl, path
+
+def test_env_selects_driver(monkeypatch):
+    monkeypatch.setenv("HUB_UI_DRIVER", "fake")
+    assert create_driver().name == "fake"
+    monkeypatch.setenv("HUB_UI_DRIVER", "nope")
+    with pytest.raises(ValueError):
+        create_driver()
+
+def test_click_image_on_fake_screen(fake, tmp_path):
+    tpl, path = _template(tmp_path)
+    fake.paste(tpl, 300, 200)
+    assert ui_helpers.click_image(path, confidence=0.9, timeout=1)
+    assert ("click", ((330, 220), 1, "left")) in fake.events
+
+def test_locate_times_out_on_virtual_clock(fake, tmp_path):
+    _, path = _template(tmp_path)
+    start = fake.now()
+    assert ui_helpers.locate_image_on_screen(path, confidence=0.9, timeout=5, interval=0.5) is None
+    assert (fake.now() - start).total_seconds() >= 5
+
+def test_focus_and_region_capture(fake, tmp_path):
+    tpl, _ = _template(tmp_path)
+    fake.paste(tpl, 10, 20)
+    assert ui_helpers.focus_window_by_title("delphos", timeout=1)
+    assert fake.focused == "DELPHOS.BI Principal"
+    path = ui_helpers.take_region_screenshot((10, 20, 60, 40), str(tmp_path / "out"), name_prefix="rel")
+    assert np.array_equal(cv2.imread(imaging.wait(path)), tpl)
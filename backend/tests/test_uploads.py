@@ -0,0 +1,62 @@
+import sys
+import os
+import io
+import pytest
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from app.services import image_uploads
+
+PNG_HEAD = b"\x89PNG\r\n\x1a\n"
+
+def test_sniff_uses_content_not_name():
+    assert image_uploads.sniff_image_type(PNG_HEAD + b"resto") == ".png"
+    assert image_uploads.sniff_image_type(b"\xff\xd8\xff\xe0") == ".jpg"
+    assert image_uploads.sniff_image_type(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == ".webp"
+    assert image_uploads.sniff_image_type(b"<html>") is None
+
+def test_save_stream_enforces_limit_while_copying(tmp_path):
+    src = io.BytesIO(PNG_HEAD + b"\x00" * (image_uploads.CHUNK_SIZE * 3))
+    with pytest.raises(image_uploads.UploadTooLarge):
+        image_uploads.save_stream(src, tmp_path, max_bytes=image_uploads.CHUNK_SIZE * 2)
+    assert os.listdir(tmp_path) == []
+
+def test_save_stream_rejects_non_images(tmp_path):
+    with pytest.raises(image_uploads.NotAnImage):
+        image_uploads.save_stream(io.BytesIO(b"MZ\x90\x00 executavel"), tmp_path, max_bytes=1024)
+    with pytest.raises(image_uploads.NotAnImage):
+        image_uploads.save_stream(io.BytesIO(b""), tmp_path, max_bytes=1024)
+    assert os.listdir(tmp_path) == []
+
+def test_precomputed_template_is_loaded_by_matcher(tmp_path):
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    from modules.comercial.dashboard import ui_helpers
+    img = np.random.RandomState(1).randint(0, 255, (20, 30, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".png", img)
+    saved = image_uploads.save_stream(io.BytesIO(buf.tobytes()), tmp_path, max_bytes=1 << 20)
+    assert saved["ext"] == ".png" and saved["size"] == len(buf)
+    decoded = image_uploads.precompute_template(saved["path"])
+    assert decoded and os.path.exists(decoded)
+    tpl = ui_helpers._load_decoded(str(saved["path"]), os.path.getmtime(saved["path"]))
+    assert tpl is not None and (tpl == img).all()
+    image_uploads.remove(saved["path"])
+    assert os.listdir(tmp_path) == []
+
+def _png_header(width, height):
+    """PNG só com IHDR e IEND: o cabeçalho declara o tamanho, sem nenhum pixel."""
+    import struct
+    import zlib
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    return PNG_HEAD + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)) + chunk(b"IEND", b"")
+
+@pytest.mark.parametrize("size", [(6000, 5000), (100000, 100000)])
+def test_precompute_rejects_huge_images_from_the_header(tmp_path, monkeypatch, size):
+    pytest.importorskip("PIL")
+    saved = image_uploads.save_stream(io.BytesIO(_png_header(*size)), tmp_path, max_bytes=1024)
+    decoded = []
+    monkeypatch.setitem(sys.modules, "cv2", type("cv2", (), {"imread": lambda *a: decoded.append(a)}))
+    with pytest.raises(image_uploads.ImageTooLarge):
+        image_uploads.precompute_template(saved["path"], max_pixels=25_000_000)
+    assert decoded == []
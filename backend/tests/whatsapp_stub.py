@@ -0,0 +1,114 @@
+"""Servidor local que imita a WhatsApp Business Cloud API (upload de mídia e envio de mensagens).
+
+Usado nos testes de entrega e para rodar o worker `deliveries` sem falar com a Meta:
+
+    python tests/whatsapp_stub.py --port 8089
+    WHATSAPP_API_URL=http://127.0.0.1:8089 WHATSAPP_PHONE_NUMBER_ID=123 rq worker deliveries
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _file_part(raw: bytes) -> dict:
+    """Nome e Content-Type da parte `file` do multipart enviado no upload."""
+    m = re.search(rb'name="file"; filename="([^"]*)"\r\nContent-Type: ([^\r]+)', raw)
+    if not m:
+        return {}
+    return {"filename": m.group(1).decode(), "content_type": m.group(2).decode()}
+
+
+class WhatsAppStub:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.uploads = []
+        self.messages = []
+        # quantas respostas 429 devolver antes de aceitar, por destinatário
+        self.throttle = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, body, headers=None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if not self.headers.get("Authorization", "").startswith("Bearer "):
+                    return self._reply(401, {"error": {"message": "token ausente"}})
+                if self.path.endswith("/media"):
+                    media_id = uuid.uuid4().hex
+                    with stub._lock:
+                        stub.uploads.append({"id": media_id, "size": len(raw), **_file_part(raw)})
+                    return self._reply(200, {"id": media_id})
+                if self.path.endswith("/messages"):
+                    body = json.loads(raw or b"{}")
+                    to = body.get("to")
+                    with stub._lock:
+                        pending = stub.throttle.get(to, 0)
+                        if pending:
+                            stub.throttle[to] = pending - 1
+                        else:
+                            stub.messages.append(body)
+                    if pending:
+                        return self._reply(429, {"error": {"message": "rate limit"}}, {"Retry-After": "0"})
+                    if not to or not to.isdigit():
+                        return self._reply(400, {"error": {"message": "destinatário inválido"}})
+                    return self._reply(200, {"messages": [{"id": f"wamid.{uuid.uuid4().hex}"}]})
+                return self._reply(404, {"error": {"message": "rota desconhecida"}})
+
+        return Handler
+
+    def start(self) -> "WhatsAppStub":
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+    stub = WhatsAppStub(port=args.port, latency=args.latency)
+    print(f"Stub da Cloud API em {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        stub.server.server_close()